@@ -0,0 +1,232 @@
+"""Concurrent load test for the dashboard's update callback.
+
+    python -m benchmarks.load --concurrency 8 --requests 2000           # in-process server
+    python -m benchmarks.load --url http://127.0.0.1:8000 --duration 30 # e.g. local gunicorn
+
+Each virtual user behaves like a browser tab. It starts from a random
+filter state and then changes one dropdown at a time. It POSTs
+_dash-update-component with the callback's real output/input/state
+signature (read from /_dash-dependencies) and carries the returned
+panel-hashes store forward. Requests go straight to update with the
+filter-state store the browser would send, so the client-side debounce
+is not part of the measurement. Dropdown options are read from
+/_dash-layout, so the harness works against any deployment of src.app.
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+UPDATE_PATH = "/_dash-update-component"
+FILTER_IDS = ["f-year", "f-region", "f-gender", "f-agebin", "f-company", "f-remote"]
+FILTER_STATE_ID = "filter-state"
+
+
+class InProcessTarget:
+    """Drives src.app.server through Flask test clients (one per thread)."""
+
+    def __init__(self):
+        from src.app import server
+        self.server = server
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, "client"):
+            self._local.client = self.server.test_client()
+        return self._local.client
+
+    def get_json(self, path):
+        return json.loads(self._client().get(path).data)
+
+    def post(self, path, body) -> tuple[int, bytes]:
+        r = self._client().post(path, json=body)
+        return r.status_code, r.data
+
+
+class HttpTarget:
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    def get_json(self, path):
+        with urllib.request.urlopen(self.base_url + path) as r:
+            return json.loads(r.read())
+
+    def post(self, path, body) -> tuple[int, bytes]:
+        req = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(req) as r:
+                return r.status, r.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+def _dropdown_options(layout) -> dict[str, list]:
+    found = {}
+
+    def walk(node):
+        if isinstance(node, dict):
+            props = node.get("props", {})
+            if props.get("id") in FILTER_IDS:
+                opts = props.get("options") or []
+                found[props["id"]] = [o["value"] if isinstance(o, dict) else o for o in opts]
+            for v in props.values():
+                walk(v)
+        elif isinstance(node, list):
+            for v in node:
+                walk(v)
+
+    walk(layout)
+    return found
+
+
+def _update_dependency(deps) -> dict:
+    for d in deps:
+        if [i["id"] for i in d["inputs"]] == [FILTER_STATE_ID] and not d.get("clientside_function"):
+            return d
+    raise RuntimeError("update callback not found in /_dash-dependencies")
+
+
+def _outputs(dep) -> list[dict]:
+    # "..a.children...b.data.." -> [{"id": "a", "property": "children"}, ...]
+    parts = dep["output"].strip(".").split("...")
+    return [dict(zip(("id", "property"), p.rsplit(".", 1))) for p in parts]
+
+
+def _random_value(fid, options, rng):
+    if fid == "f-year":
+        return rng.choice(options)
+    if fid == "f-region":
+        # most sessions look at North America, like the default view
+        if "North America" in options and rng.random() < 0.5:
+            return ["North America"]
+        return rng.sample(options, rng.randint(1, min(3, len(options))))
+    r = rng.random()
+    if r < 0.35:
+        return list(options)
+    if r < 0.6:
+        return None
+    return rng.sample(options, rng.randint(1, len(options)))
+
+
+class VirtualUser:
+    def __init__(self, options, dep, rng):
+        self.options = options
+        self.dep = dep
+        self.outputs = _outputs(dep)
+        self.rng = rng
+        self.values = {fid: _random_value(fid, options[fid], rng) for fid in FILTER_IDS}
+        self.state = {s["id"]: None for s in dep["state"]}
+        self.loaded = False
+
+    def next_body(self) -> dict:
+        if self.loaded:
+            fid = self.rng.choice(FILTER_IDS)
+            self.values[fid] = _random_value(fid, self.options[fid], self.rng)
+        self.loaded = True  # the first request is the initial page load
+        filter_state = {"values": [self.values[fid] for fid in FILTER_IDS]}
+        return {
+            "output": self.dep["output"],
+            "outputs": self.outputs,
+            "inputs": [{"id": FILTER_STATE_ID, "property": "data", "value": filter_state}],
+            "state": [{**s, "value": self.state[s["id"]]} for s in self.dep["state"]],
+            "changedPropIds": [f"{FILTER_STATE_ID}.data"],
+        }
+
+    def absorb(self, payload: bytes) -> None:
+        response = json.loads(payload).get("response", {})
+        for s in self.dep["state"]:
+            if s["id"] in response:
+                self.state[s["id"]] = response[s["id"]][s["property"]]
+
+
+def _pct(sorted_vals, q):
+    if not sorted_vals:
+        return float("nan")
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+
+def run(target, concurrency: int, requests: int | None, duration: float | None, seed: int) -> dict:
+    options = _dropdown_options(target.get_json("/_dash-layout"))
+    dep = _update_dependency(target.get_json("/_dash-dependencies"))
+
+    latencies, sizes, errors = [], [], [0]
+    lock = threading.Lock()
+    issued = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def more():
+        with lock:
+            if requests is not None and issued[0] >= requests:
+                return False
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            issued[0] += 1
+            return True
+
+    def user_loop(i):
+        user = VirtualUser(options, dep, random.Random(seed + i))
+        while more():
+            body = user.next_body()
+            t0 = time.perf_counter()
+            status, payload = target.post(UPDATE_PATH, body)
+            dt = time.perf_counter() - t0
+            with lock:
+                if status != 200:
+                    errors[0] += 1
+                    continue
+                latencies.append(dt)
+                sizes.append(len(payload))
+            user.absorb(payload)
+
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(user_loop, range(concurrency)))
+    elapsed = time.perf_counter() - t_start
+
+    lat = sorted(latencies)
+    return {
+        "requests": len(lat),
+        "errors": errors[0],
+        "elapsed_s": elapsed,
+        "throughput_rps": len(lat) / elapsed if elapsed else 0.0,
+        "p50_ms": _pct(lat, 0.50) * 1000,
+        "p95_ms": _pct(lat, 0.95) * 1000,
+        "p99_ms": _pct(lat, 0.99) * 1000,
+        "mean_payload_bytes": statistics.fmean(sizes) if sizes else 0.0,
+        "max_payload_bytes": max(sizes) if sizes else 0,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="base URL of a running server (default: in-process)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=None, help="total requests (default 500 unless --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="seconds to run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    requests = args.requests if args.requests or args.duration else 500
+    target = HttpTarget(args.url) if args.url else InProcessTarget()
+    report = run(target, args.concurrency, requests, args.duration, args.seed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"requests     {report['requests']} ({report['errors']} errors) in {report['elapsed_s']:.1f}s")
+    print(f"throughput   {report['throughput_rps']:.1f} req/s at concurrency {args.concurrency}")
+    print(f"latency      p50 {report['p50_ms']:.1f} ms  p95 {report['p95_ms']:.1f} ms  p99 {report['p99_ms']:.1f} ms")
+    print(f"payload      mean {report['mean_payload_bytes'] / 1024:.1f} KiB  max {report['max_payload_bytes'] / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
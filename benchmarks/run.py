@@ -0,0 +1,220 @@
+"""Micro-benchmarks for the cleaning pipeline and the dashboard hot paths.
+
+    python -m benchmarks.run --update              # record baselines on this machine
+    python -m benchmarks.run                       # compare against them
+    python -m benchmarks.run --check               # ... and fail when there are none to compare
+    python -m benchmarks.run --sizes 10000,1000000,50000000
+
+Each case runs on synthetic surveys (src.data.synthesize) of the given sizes.
+The survey is generated, cleaned and encoded chunk by chunk, and the dashboard
+cases run on the memory-mapped column store the app serves, so no size needs
+the whole table in memory; cases that take an in-memory raw frame run on its
+first RAW_SAMPLE_ROWS rows. Wall time is the best of --repeat runs; peak
+memory comes from a separate tracemalloc run so tracing does not inflate the
+timings. The exit code is 1 when a case is slower or uses more memory than
+its baseline by more than --tolerance. Baselines are local
+(benchmarks/baselines.json is not checked in) and record the machine and
+library versions they were taken with; a comparison against baselines from a
+different environment is skipped, unless --check is given, which exits 2
+when this environment has no baseline for a case that ran.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BASELINES = Path(__file__).resolve().parent / "baselines.json"
+# rows of the in-memory raw frame for the cases that take one
+RAW_SAMPLE_ROWS = 1_000_000
+# rows per chunk when generating, cleaning and encoding a survey
+CHUNK_ROWS = 500_000
+# worker counts of the process_parallel_w<N> cases
+PARALLEL_WORKERS = (1, 2, 4)
+
+
+def _cases(raw, frame, files):
+    """Case name -> (rows it handles, function to time)."""
+    from src import app
+    from src.data.process import _map_distinct, normalize_gender, process, process_parallel, process_streaming
+    from src.filter_index import FilterIndex
+
+    filters = (2014, ["North America", "Europe"], None, ["20–29", "30–39"], None, None)
+    index = FilterIndex(frame, app.FILTER_COLUMNS)
+    sel = app.filter_selections(*filters)
+    dff = app.filtered_df(frame, *filters, index=index)
+    rows, sample = len(frame), len(raw)
+    return {
+        # the whole raw CSV, cleaned chunk by chunk into Parquet as process.py --chunksize does
+        "process_streaming": (rows, lambda: process_streaming(CHUNK_ROWS, files["out"], files["raw"])),
+        "process": (sample, lambda: process(raw)),
+        # the same CSV cut into byte ranges that worker processes clean into their own part
+        # files; compare the worker counts with each other to see the scaling on this machine
+        **{f"process_parallel_w{w}": (rows, lambda w=w: process_parallel(w, files["out"], files["raw"], CHUNK_ROWS))
+           for w in PARALLEL_WORKERS},
+        "normalize_gender": (sample, lambda: _map_distinct(raw["Gender"], normalize_gender)),
+        # lookups against the prebuilt index; building it is its own case
+        "filter_index_build": (rows, lambda: FilterIndex(frame, app.FILTER_COLUMNS)),
+        "filter_index_bits": (rows, lambda: index.bits(sel)),
+        "filter_index_rows": (rows, lambda: index.rows(sel)),
+        "filtered_df": (rows, lambda: app.filtered_df(frame, *filters, index=index)),
+        "chart_treatment_by_group": (len(dff), lambda: app.chart_treatment_by_group(dff, "age_bin", "percent")),
+        "chart_interfere_heatmap": (len(dff), lambda: app.chart_interfere_heatmap(dff, "row_percent")),
+        "chart_support_vs_treatment": (len(dff), lambda: app.chart_support_vs_treatment(dff, "benefits")),
+        "kpi_cards": (len(dff), lambda: app.kpi_cards(dff)),
+    }
+
+
+def _prepare(rows: int, seed: int, tmp: Path):
+    """Raw sample, dashboard frame and file paths for a survey of `rows` rows.
+
+    The raw CSV is written chunk by chunk, cleaned into Parquet chunk by chunk
+    and encoded into a column store batch by batch; the frame maps that store,
+    as the app does.
+    """
+    from src.columnar import build_store, open_store
+    from src.config import APP_COLUMNS
+    from src.data.load_raw import iter_raw
+    from src.data.process import process_streaming
+    from src.data.synthesize import write_synthetic
+
+    files = {"raw": tmp / "survey.csv", "parquet": tmp / "cleaned.parquet", "out": tmp / "out" / "cleaned.parquet"}
+    write_synthetic(rows, files["raw"], CHUNK_ROWS, seed)
+    process_streaming(CHUNK_ROWS, files["parquet"], files["raw"])
+    build_store(files["parquet"], tmp / "store", None, APP_COLUMNS)
+    frame = open_store(tmp / "store", APP_COLUMNS)
+    raw = next(iter_raw(min(rows, RAW_SAMPLE_ROWS), files["raw"]))
+    return raw, frame, files
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _peak_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes, repeat: int, seed: int, only=None) -> dict:
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            raw, frame, files = _prepare(size, seed, Path(tmp))
+            for name, (rows, fn) in _cases(raw, frame, files).items():
+                if only and name not in only:
+                    continue
+                seconds = _time(fn, repeat)
+                peak = _peak_mb(fn)
+                results[f"{name}@{size}"] = {
+                    "rows": rows,
+                    "seconds": seconds,
+                    "rows_per_second": rows / seconds if seconds > 0 else None,
+                    "peak_mb": peak,
+                }
+                print(f"{name:<28} {rows:>10,} rows  {seconds * 1000:10.2f} ms  "
+                      f"{rows / seconds / 1e6 if seconds else 0:8.2f} Mrows/s  {peak:8.1f} MB peak")
+    return results
+
+
+def environment() -> dict:
+    """What the timings depend on besides the code: machine, OS and library versions."""
+    import numpy
+    import pandas
+    import pyarrow
+
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "system": platform.system(),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "pyarrow": pyarrow.__version__,
+    }
+
+
+def load_baselines(path: Path) -> dict:
+    if not path.exists():
+        return {"environment": None, "results": {}}
+    data = json.loads(path.read_text())
+    if "results" not in data:
+        # an old flat file without its environment can't be compared against
+        return {"environment": None, "results": data}
+    return data
+
+
+def compare(results: dict, baselines: dict, tolerance: float) -> list[str]:
+    failures = []
+    for key, r in results.items():
+        base = baselines.get(key)
+        if base is None:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            limit = base[metric] * (1 + tolerance)
+            if r[metric] > limit:
+                failures.append(f"{key}: {metric} {r[metric]:.4g} > {limit:.4g} "
+                                f"(baseline {base[metric]:.4g})")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="comma-separated row counts (e.g. 10000,1000000,50000000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", default=None, help="comma-separated case names")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown / memory growth over baseline (0.5 = +50%%)")
+    parser.add_argument("--baselines", type=Path, default=BASELINES)
+    parser.add_argument("--update", action="store_true", help="write results as the new baselines")
+    parser.add_argument("--check", action="store_true",
+                        help="exit 2 when a case that ran has no baseline for this environment")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    only = set(args.only.split(",")) if args.only else None
+    results = run(sizes, args.repeat, args.seed, only)
+
+    baselines = load_baselines(args.baselines)
+    env = environment()
+    if args.update:
+        # baselines from another environment are replaced, not merged with
+        kept = baselines["results"] if baselines["environment"] == env else {}
+        state = {"environment": env, "results": {**kept, **results}}
+        args.baselines.write_text(json.dumps(state, indent=2, sort_keys=True) + "\n")
+        print(f"Wrote baselines: {args.baselines}")
+        return 0
+    if baselines["environment"] != env:
+        print(f"No baselines for this environment in {args.baselines}; not comparing "
+              f"(record them with --update)")
+        return 2 if args.check else 0
+    missing = sorted(set(results) - set(baselines["results"]))
+    if missing and args.check:
+        print(f"No baselines for {', '.join(missing)} in {args.baselines} (record them with --update)")
+        return 2
+
+    failures = compare(results, baselines["results"], args.tolerance)
+    for f in failures:
+        print("REGRESSION", f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+# Gunicorn settings for the dashboard (picked up automatically from the repo root)
+import gc
+import os
+
+# Load src.app once in the master: the DataFrame, filter index, cubes and spec
+# templates are then shared copy-on-write by every worker instead of rebuilt per worker
+preload_app = True
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+
+def when_ready(server):
+    from src.app import CHART_RENDER, _vega_bundle
+
+    # build the vega-embed bundle before forking so workers share it too
+    if CHART_RENDER == "vega":
+        _vega_bundle()
+    # move everything loaded so far out of the GC's reach, so collections in the
+    # workers don't touch (and copy) the shared pages
+    gc.freeze()
@@ -1,10 +1,24 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+import numpy as np
 import pandas as pd
-import traceback
+import pyarrow as pa
+import pyarrow.dataset as ds
+import time
 import altair as alt
-from dash import Dash, html, dcc, Input, Output
+from altair.utils._importers import vl_version_for_vl_convert
+from dash import ClientsideFunction, Dash, html, dcc, no_update, Input, Output, State
+from flask import Response, g, has_request_context, request
 import dash_bootstrap_components as dbc
 
+logger = logging.getLogger(__name__)
+
 # Make Altair safer for larger tables
 alt.data_transformers.disable_max_rows()
 
@@ -13,53 +27,97 @@ alt.data_transformers.disable_max_rows()
 # -----------------------------
 BASE_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = BASE_DIR.parent
-DATA_PATH = PROJECT_ROOT / "data" / "processed" / "cleaned.csv"
+# `python src/app.py` puts src/ on sys.path instead of the repo root
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+from src.bootstrap import LEVEL as CI_LEVEL, rate_intervals, share_intervals
+from src.columnar import open_store, read_codebook, read_parquet_frame
+from src.config import (
+    APP_COLUMNS, CACHE_DIR, DATA_BY_YEAR, DATA_BY_YEAR_METADATA, DATA_METADATA, DATA_PROCESSED, DATA_STORE,
+    FILTER_COLUMNS, JOBS_DIR,
+)
+from src.cube import CountCube, sparse_counts
+from src.data.metadata import data_version, filter_domains, read_metadata
+from src.filter_index import FilterIndex
+from src.metrics import BYTE_BUCKETS, ROW_BUCKETS, TIME_BUCKETS, Metrics, NoopMetrics
+from src.result_cache import ResultCache, normalize_key
+
+# DASH_DATA_LAYOUT=by_year serves the year-partitioned dataset built by
+# `python -m src.data.multiyear` and only loads the years that are asked for
+BY_YEAR = os.environ.get("DASH_DATA_LAYOUT", "file") == "by_year"
+DATA_PATH = DATA_BY_YEAR if BY_YEAR else DATA_PROCESSED
+METADATA_PATH = DATA_BY_YEAR_METADATA if BY_YEAR else DATA_METADATA
+# the column store written next to the Parquet file is memory-mapped when it is
+# current, so all workers share one page-cache copy; DASH_DATA_STORE=off reads Parquet
+USE_STORE = os.environ.get("DASH_DATA_STORE", "auto").lower() not in ("0", "off", "false", "no")
+# every rate carries a 95% percentile bootstrap interval from this many resamples
+BOOTSTRAP_RESAMPLES = int(os.environ.get("DASH_BOOTSTRAP_RESAMPLES", "2000"))
+
+def load_dashboard_data(path: Path = DATA_PATH, year: int | None = None) -> pd.DataFrame:
+    """Read the processed Parquet file, keeping answer columns as categoricals.
+
+    A directory is read as the year-partitioned dataset; with `year` only that
+    partition is scanned.
+    """
+    if not Path(path).exists():
+        builder = "src.data.multiyear" if Path(path) == DATA_BY_YEAR else "src.data.process"
+        raise FileNotFoundError(f"Missing data file: {path}. Run `python -m {builder}` first.")
+    if Path(path).is_dir():
+        dataset = ds.dataset(path, format="parquet", partitioning="hive")
+        columns = [c for c in APP_COLUMNS if c in dataset.schema.names]
+        table = dataset.to_table(columns=columns, filter=None if year is None else ds.field("year") == year)
+        for i, field in enumerate(table.schema):
+            if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+                table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+        return table.to_pandas()
+    if USE_STORE and Path(path) == DATA_PROCESSED and store_is_current(path):
+        return open_store(DATA_STORE, APP_COLUMNS)
+    return read_parquet_frame(path, APP_COLUMNS)
+
+def store_is_current(path: Path = DATA_PROCESSED) -> bool:
+    book = read_codebook(DATA_STORE)
+    return book is not None and book.get("data_version") == data_version(path)
+
+def dataset_years(path: Path = DATA_PATH) -> list[int]:
+    """Years present in a partitioned dataset, from its directory names alone."""
+    return sorted(int(p.name.split("=", 1)[1]) for p in Path(path).glob("year=*")
+                  if p.name.split("=", 1)[1].isdigit())
+
+def load_versioned(path: Path = DATA_PATH, year: int | None = None) -> tuple[pd.DataFrame, str]:
+    """Load the dashboard frame together with the version of the data it holds.
 
-if not DATA_PATH.exists():
-    raise FileNotFoundError(f"Missing data file: {DATA_PATH}. Did you commit data/processed/cleaned.csv?")
-df = pd.read_csv(DATA_PATH)
+    The version is read before and after the load, and the load repeated if the
+    file changed in between, so cached results are never filed under a version
+    other than the one the frame came from.
+    """
+    versioned = Path(path) / f"year={year}" if year is not None else Path(path)
+    while True:
+        version = data_version(versioned)
+        frame = load_dashboard_data(path, year)
+        if data_version(versioned) == version:
+            return frame, version
+
+YEARS = dataset_years() if BY_YEAR else []
+df, DATA_VERSION = load_versioned(year=YEARS[0] if YEARS else None)
+FILTER_INDEX = FilterIndex(df, FILTER_COLUMNS)
 
 # -----------------------------
 # Helpers
 # -----------------------------
-def _ensure_str_series(s: pd.Series) -> pd.Series:
-    return s.astype("string").fillna("<missing>")
-
 def _order_yes_no_unknown(values):
     priority = ["Yes", "No", "Don't know", "Not sure", "<missing>"]
-    vals = list(pd.unique([v for v in values if pd.notna(v)]))
+    vals = list(dict.fromkeys(v for v in values if pd.notna(v)))
     ordered = [v for v in priority if v in vals]
     tail = sorted([v for v in vals if v not in ordered])
     return ordered + tail
 
 def _order_work_interfere(values):
     priority = ["Never", "Rarely", "Sometimes", "Often", "Don't know", "<missing>"]
-    vals = list(pd.unique([v for v in values if pd.notna(v)]))
+    vals = list(dict.fromkeys(v for v in values if pd.notna(v)))
     ordered = [v for v in priority if v in vals]
     tail = sorted([v for v in vals if v not in ordered])
     return ordered + tail
 
-def _order_age_bin(values):
-    vals = [v for v in values if pd.notna(v)]
-    def key(v):
-        try:
-            return int(str(v).split("-")[0].strip())
-        except Exception:
-            return 10**9
-    return sorted(pd.unique(vals), key=key)
-
-def _order_company_size(values):
-    vals = [v for v in values if pd.notna(v)]
-    def key(v):
-        s = str(v).strip()
-        try:
-            if "+" in s:
-                return int(s.replace("+", ""))
-            return int(s.split("-")[0])
-        except Exception:
-            return 10**9
-    return sorted(pd.unique(vals), key=key)
-
 def _no_data_chart(msg="No data for current filters."):
     return (
         alt.Chart(pd.DataFrame({"msg": [msg]}))
@@ -76,20 +134,33 @@ def as_iframe(chart: alt.Chart, height=260):
         style={"width": "100%", "height": f"{height}px", "border": "0"},
     )
 
-def filtered_df(dff, year, region, genders, age_bins, company_sizes, remote_work):
-    if year:
-        dff = dff[dff["year"] == int(year)]
-    if region:
-        dff = dff[dff["region"].isin(region)]
-    if genders:
-        dff = dff[dff["gender"].isin(genders)]
-    if age_bins:
-        dff = dff[dff["age_bin"].isin(age_bins)]
-    if company_sizes:
-        dff = dff[dff["company_size"].isin(company_sizes)]
-    if remote_work:
-        dff = dff[dff["remote_work"].isin(remote_work)]
-    return dff
+def as_vega_spec(chart: alt.Chart, height=260):
+    # only the Vega-Lite spec is sent; the runtime is loaded once from VEGA_BUNDLE_URL
+    view_h = max(120, height - 130)
+    return chart.properties(height=view_h, width="container").to_dict()
+
+def filter_selections(year, region, genders, age_bins, company_sizes, remote_work):
+    # falsy selections mean "no filter" for that column
+    return {
+        "year": [int(year)] if year else None,
+        "region": region,
+        "gender": genders,
+        "age_bin": age_bins,
+        "company_size": company_sizes,
+        "remote_work": remote_work,
+    }
+
+def filtered_df(dff, year, region, genders, age_bins, company_sizes, remote_work, index=None):
+    # the module-level frame has a prebuilt index; any other frame gets a one-off
+    # one unless its own prebuilt `index` is passed
+    if dff is df and BY_YEAR and year:
+        dff, index, *_ = year_data(int(year))
+    elif index is None:
+        index = FILTER_INDEX if dff is df else FilterIndex(dff, FILTER_COLUMNS)
+    rows = index.rows(filter_selections(year, region, genders, age_bins, company_sizes, remote_work))
+    if rows is None:
+        return dff
+    return dff.iloc[rows]
 
 # -----------------------------
 # Charts
@@ -102,48 +173,43 @@ def chart_treatment_by_group(dff: pd.DataFrame, group_by="age_bin", show_as="per
     if g not in dff.columns:
         return _no_data_chart(f"Missing column: {g}")
 
-    tmp = dff.copy()
-    tmp["treatment"] = _ensure_str_series(tmp["treatment"])
-    tmp[g] = _ensure_str_series(tmp[g])
-    tmp["gender"] = _ensure_str_series(tmp["gender"])
+    agg = agg_treatment_by_group({}, g, cubes=row_cubes(dff, extra=[g]))
+    return render_treatment_by_group(agg, g, show_as)
 
-    agg = (
-        tmp.groupby([g, "gender"], dropna=False)
-        .agg(n=("treatment", "size"), treat_yes=("treatment", lambda x: (x == "Yes").sum()))
-        .reset_index()
-    )
-    agg["rate"] = (agg["treat_yes"] / agg["n"]) * 100
+def _treatment_rows(agg: pd.DataFrame) -> pd.DataFrame:
+    # agg: one row per (g, gender) with n and treat_yes
+    lo, hi = rate_intervals(agg["treat_yes"], agg["n"], BOOTSTRAP_RESAMPLES, key="treatment_by_group")
+    return agg.assign(rate=(agg["treat_yes"] / agg["n"]) * 100, rate_lo=lo, rate_hi=hi)
 
-    if g == "age_bin":
-        order = _order_age_bin(tmp[g].unique())
-    elif g == "company_size":
-        order = _order_company_size(tmp[g].unique())
-    else:
-        order = sorted(tmp[g].unique().tolist())
+def _interval_tooltips(field):
+    return [alt.Tooltip(f"{field}_lo:Q", title="95% CI low", format=".1f"),
+            alt.Tooltip(f"{field}_hi:Q", title="95% CI high", format=".1f")]
+
+def _treatment_by_group_chart(agg: pd.DataFrame, g, order, show_as="percent"):
+    agg = _treatment_rows(agg)
+    x = alt.X(f"{g}:N", sort=order, title=g.replace("_", " ").title())
+    color = alt.Color("gender:N", title="Gender")
 
     if show_as == "count":
-        y_field = "treat_yes:Q"
-        y_title = "Treatment (Yes) count"
         tooltip = [alt.Tooltip(g + ":N"), alt.Tooltip("gender:N"),
                    alt.Tooltip("treat_yes:Q"), alt.Tooltip("n:Q")]
+        chart = (
+            alt.Chart(agg)
+            .mark_bar()
+            .encode(x=x, y=alt.Y("treat_yes:Q", title="Treatment (Yes) count"), color=color, tooltip=tooltip)
+        )
     else:
-        y_field = "rate:Q"
         y_title = "Treatment rate (%)"
         tooltip = [alt.Tooltip(g + ":N"), alt.Tooltip("gender:N"),
-                   alt.Tooltip("rate:Q", format=".1f"), alt.Tooltip("n:Q")]
-
-    chart = (
-        alt.Chart(agg)
-        .mark_bar()
-        .encode(
-            x=alt.X(f"{g}:N", sort=order, title=g.replace("_", " ").title()),
-            y=alt.Y(y_field, title=y_title),
-            color=alt.Color("gender:N", title="Gender"),
-            tooltip=tooltip,
+                   alt.Tooltip("rate:Q", format=".1f"), *_interval_tooltips("rate"), alt.Tooltip("n:Q")]
+        # one bar per gender side by side, each with its bootstrap interval
+        base = alt.Chart(agg).encode(x=x, xOffset="gender:N", tooltip=tooltip)
+        chart = alt.layer(
+            base.mark_bar().encode(y=alt.Y("rate:Q", title=y_title), color=color),
+            base.mark_rule(color="black").encode(y=alt.Y("rate_lo:Q", title=y_title), y2="rate_hi:Q"),
         )
-        .properties(title="Treatment by group")
-    )
 
+    chart = chart.properties(title="Treatment by group")
     return chart.configure_title(fontSize=14).configure_axis(labelFontSize=11, titleFontSize=12)
 
 def chart_interfere_heatmap(dff: pd.DataFrame, metric="row_percent"):
@@ -153,18 +219,29 @@ def chart_interfere_heatmap(dff: pd.DataFrame, metric="row_percent"):
     if "work_interfere" not in dff.columns or "treatment" not in dff.columns:
         return _no_data_chart("Missing required columns for Chart 2.")
 
-    tmp = dff.copy()
-    tmp["work_interfere"] = _ensure_str_series(tmp["work_interfere"])
-    tmp["treatment"] = _ensure_str_series(tmp["treatment"])
+    counts = agg_pair_counts({}, "work_interfere", cubes=row_cubes(dff))
+    return render_interfere_heatmap(counts, metric)
 
-    counts = (
-        tmp.groupby(["work_interfere", "treatment"], dropna=False)
-        .size()
-        .reset_index(name="count")
-    )
+def _share_intervals(counts: pd.DataFrame, by, answer="treatment"):
+    # interval of each row's share of its `by` group, all groups in one draw
+    g_codes, groups = pd.factorize(counts[by])
+    a_codes, answers = pd.factorize(counts[answer])
+    table = np.zeros((len(groups), len(answers)), dtype=np.int64)
+    np.add.at(table, (g_codes, a_codes), counts["count"].to_numpy())
+    lo, hi = share_intervals(table, BOOTSTRAP_RESAMPLES, key=f"share:{by}:{answer}")
+    return lo[g_codes, a_codes], hi[g_codes, a_codes]
+
+def _heatmap_rows(counts: pd.DataFrame, metric="row_percent") -> pd.DataFrame:
+    # counts: one row per (work_interfere, treatment) with count
+    if metric == "count":
+        return counts.assign(value=counts["count"])
+    totals = counts.groupby("work_interfere")["count"].transform("sum")
+    lo, hi = _share_intervals(counts, "work_interfere")
+    return counts.assign(value=(counts["count"] / totals) * 100, value_lo=lo, value_hi=hi)
 
+def _interfere_heatmap_chart(counts: pd.DataFrame, metric="row_percent", x_order=None, y_order=None):
+    counts = _heatmap_rows(counts, metric)
     if metric == "count":
-        counts["value"] = counts["count"]
         legend_title = "Count"
         tooltip = [
             alt.Tooltip("work_interfere:N"),
@@ -172,18 +249,19 @@ def chart_interfere_heatmap(dff: pd.DataFrame, metric="row_percent"):
             alt.Tooltip("count:Q"),
         ]
     else:
-        totals = counts.groupby("work_interfere")["count"].transform("sum")
-        counts["value"] = (counts["count"] / totals) * 100
         legend_title = "Row %"
         tooltip = [
             alt.Tooltip("work_interfere:N"),
             alt.Tooltip("treatment:N"),
             alt.Tooltip("value:Q", format=".1f"),
+            *_interval_tooltips("value"),
             alt.Tooltip("count:Q"),
         ]
 
-    x_order = _order_work_interfere(tmp["work_interfere"].unique())
-    y_order = _order_yes_no_unknown(tmp["treatment"].unique())
+    if x_order is None:
+        x_order = _order_work_interfere(counts["work_interfere"].unique())
+    if y_order is None:
+        y_order = _order_yes_no_unknown(counts["treatment"].unique())
 
     chart = (
         alt.Chart(counts)
@@ -206,78 +284,334 @@ def chart_support_vs_treatment(dff: pd.DataFrame, factor="benefits"):
     if factor not in dff.columns or "treatment" not in dff.columns:
         return _no_data_chart(f"Missing required columns for factor: {factor}")
 
-    tmp = dff.copy()
-    tmp[factor] = _ensure_str_series(tmp[factor])
-    tmp["treatment"] = _ensure_str_series(tmp["treatment"])
+    counts = agg_pair_counts({}, factor, cubes=row_cubes(dff, extra=[factor]))
+    return render_support_vs_treatment(counts, factor)
 
-    counts = (
-        tmp.groupby([factor, "treatment"], dropna=False)
-        .size()
-        .reset_index(name="count")
-    )
+def _support_rows(counts: pd.DataFrame, factor="benefits") -> pd.DataFrame:
+    # counts: one row per (factor, treatment) with count
     totals = counts.groupby(factor)["count"].transform("sum")
-    counts["pct"] = (counts["count"] / totals) * 100
+    lo, hi = _share_intervals(counts, factor)
+    return counts.assign(pct=(counts["count"] / totals) * 100, pct_lo=lo, pct_hi=hi)
 
-    x_order = _order_yes_no_unknown(tmp[factor].unique())
-    y_order = _order_yes_no_unknown(tmp["treatment"].unique())
+def _support_vs_treatment_chart(counts: pd.DataFrame, factor="benefits", x_order=None, y_order=None):
+    counts = _support_rows(counts, factor)
+
+    if x_order is None:
+        x_order = _order_yes_no_unknown(counts[factor].unique())
+    if y_order is None:
+        y_order = _order_yes_no_unknown(counts["treatment"].unique())
 
     nice_title = factor.replace("_", " ").title()
+    x = alt.X(f"{factor}:N", sort=x_order, title=nice_title)
+    tooltip = [
+        alt.Tooltip(f"{factor}:N", title=nice_title),
+        alt.Tooltip("treatment:N", title="Treatment"),
+        alt.Tooltip("pct:Q", title="Percent", format=".1f"),
+        *_interval_tooltips("pct"),
+        alt.Tooltip("count:Q", title="Count"),
+    ]
 
-    chart = (
-        alt.Chart(counts)
-        .mark_bar()
-        .encode(
-            x=alt.X(f"{factor}:N", sort=x_order, title=nice_title),
-            y=alt.Y("pct:Q", stack="normalize", title="Share within group"),
-            color=alt.Color("treatment:N", sort=y_order, title="Treatment"),
-            tooltip=[
-                alt.Tooltip(f"{factor}:N", title=nice_title),
-                alt.Tooltip("treatment:N", title="Treatment"),
-                alt.Tooltip("pct:Q", title="Percent", format=".1f"),
-                alt.Tooltip("count:Q", title="Count"),
-            ],
-        )
-        .properties(title=f"{nice_title} vs Treatment (100% stacked)")
+    base = alt.Chart(counts)
+    bars = base.mark_bar().encode(
+        x=x,
+        y=alt.Y("pct:Q", stack="normalize", title="Share within group"),
+        color=alt.Color("treatment:N", sort=y_order, title="Treatment"),
+        # answers stack in descending order, so "Yes" sits on the baseline
+        order=alt.Order("treatment:N", sort="descending"),
+        tooltip=tooltip,
+    )
+    # the interval of the "Yes" share, drawn at the top of its segment
+    interval = (
+        base.transform_filter(alt.datum.treatment == "Yes")
+        .transform_calculate(share_lo="datum.pct_lo / 100", share_hi="datum.pct_hi / 100")
+        .mark_rule(color="black")
+        .encode(x=x, y=alt.Y("share_lo:Q", title="Share within group"), y2="share_hi:Q", tooltip=tooltip)
     )
+    chart = alt.layer(bars, interval).properties(title=f"{nice_title} vs Treatment (100% stacked)")
 
     return chart.configure_title(fontSize=14).configure_axis(labelFontSize=11, titleFontSize=12)
 
+KPI_COLUMNS = ["treatment", "benefits", "family_history"]
+
 def kpi_cards(dff: pd.DataFrame):
-    n = len(dff)
+    return render_kpis(agg_kpis({}, cubes=row_cubes(dff)))
 
-    def pct(col, val="Yes"):
-        if n == 0:
-            return None
-        if col not in dff.columns:
-            return None
-        return (dff[col].astype(str).eq(val).mean()) * 100
+def _kpi_row(n, rates, ci=None):
+    ci = ci or {}
 
     def fmt(x):
         return "N/A" if x is None else f"{x:.1f}%"
 
+    def rate_body(label, col):
+        body = [html.Div(label, className="text-muted"), html.H4(fmt(rates[col]))]
+        if ci.get(col) is not None:
+            lo, hi = ci[col]
+            body.append(html.Small(f"95% CI {lo:.1f}–{hi:.1f}%", className="text-muted",
+                                   title="95% percentile bootstrap interval"))
+        return dbc.CardBody(body)
+
     cards = dbc.Row(
         [
             dbc.Col(dbc.Card(dbc.CardBody([html.Div("N", className="text-muted"), html.H4(f"{n}")]))),
-            dbc.Col(dbc.Card(dbc.CardBody([html.Div("Treatment rate", className="text-muted"), html.H4(fmt(pct("treatment")))]))),
-            dbc.Col(dbc.Card(dbc.CardBody([html.Div("Benefits available", className="text-muted"), html.H4(fmt(pct("benefits")))]))),
-            dbc.Col(dbc.Card(dbc.CardBody([html.Div("Family history", className="text-muted"), html.H4(fmt(pct("family_history")))]))),
+            dbc.Col(dbc.Card(rate_body("Treatment rate", "treatment"))),
+            dbc.Col(dbc.Card(rate_body("Benefits available", "benefits"))),
+            dbc.Col(dbc.Card(rate_body("Family history", "family_history"))),
         ],
         className="g-2",
     )
     return cards
 
+# -----------------------------
+# Aggregation: every panel reads small count tables from a CountCube,
+# either the prebuilt filter cubes or a one-pass cube over given rows
+# -----------------------------
+def build_cubes(frame: pd.DataFrame) -> dict:
+    return {
+        "treatment": CountCube(frame, FILTER_COLUMNS, ["treatment"]),
+        "work_interfere": CountCube(frame, FILTER_COLUMNS, ["work_interfere", "treatment"]),
+        "benefits": CountCube(frame, FILTER_COLUMNS, ["benefits", "treatment"]),
+        "seek_help": CountCube(frame, FILTER_COLUMNS, ["seek_help", "treatment"]),
+        "family_history": CountCube(frame, FILTER_COLUMNS, ["family_history"]),
+    }
+
+CUBES = build_cubes(df)
+
+# by_year: frame, index, cubes and loaded version of the most recently used years;
+# DASH_YEAR_CACHE bounds how many years stay in memory
+@lru_cache(maxsize=int(os.environ.get("DASH_YEAR_CACHE", "2")))
+def year_data(year: int):
+    if YEARS and year == YEARS[0]:
+        return df, FILTER_INDEX, CUBES, DATA_VERSION
+    frame, version = load_versioned(year=year)
+    return frame, FilterIndex(frame, FILTER_COLUMNS), build_cubes(frame), version
+
+# the version of the data a selection is answered from; with by_year, years load lazily,
+# so it is the version of the partition this process read, not the one it started with
+def served_version(sel: dict) -> str:
+    if BY_YEAR and sel.get("year"):
+        return year_data(sel["year"][0])[3]
+    return DATA_VERSION
+
+def cubes_for(sel: dict) -> dict:
+    if BY_YEAR and sel.get("year"):
+        return year_data(sel["year"][0])[2]
+    return CUBES
+PANEL_MEASURES = ["age_bin", "gender", "treatment", "work_interfere", "benefits", "seek_help", "family_history"]
+
+def row_cubes(dff: pd.DataFrame, extra=()):
+    # one bincount over the joint codes of every panel column; all panels
+    # then read their tables from this single cube, so it stands in for each of CUBES
+    cols = [c for c in dict.fromkeys([*extra, *PANEL_MEASURES]) if c in dff.columns]
+    cube = CountCube(dff, [], cols)
+    return {name: cube for name in CUBES}
+
+def agg_treatment_by_group(sel, group_by="age_bin", cubes=None):
+    cube = (cubes or CUBES)["treatment"]
+    g = group_by
+    if g not in cube.dims or "treatment" not in cube.dims:
+        return None
+    t = cube.table(sel, [g, "gender", "treatment"])
+    t["treat_yes"] = t["count"].where(t["treatment"] == "Yes", 0)
+    return (
+        t.groupby([g, "gender"], sort=False)[["count", "treat_yes"]].sum()
+        .rename(columns={"count": "n"})
+        .reset_index()
+    )
+
+def render_treatment_by_group(agg, group_by="age_bin", show_as="percent"):
+    g = group_by
+    if agg is None:
+        return _no_data_chart(f"Missing column: {g}")
+    if len(agg) == 0:
+        return _no_data_chart("No data for Chart 1 (Treatment by group).")
+    # the table comes out in domain order
+    order = list(dict.fromkeys(agg[g]))
+    return _treatment_by_group_chart(agg, g, order, show_as)
+
+def agg_pair_counts(sel, factor, cubes=None):
+    # factor x treatment counts; factor also names the cube
+    cube = (cubes or CUBES)[factor]
+    if factor not in cube.dims or "treatment" not in cube.dims:
+        return None
+    return cube.table(sel, [factor, "treatment"])
+
+def render_interfere_heatmap(counts, metric="row_percent"):
+    if counts is None:
+        return _no_data_chart("Missing required columns for Chart 2.")
+    if len(counts) == 0:
+        return _no_data_chart("No data for Chart 2 (Work interference heatmap).")
+    return _interfere_heatmap_chart(counts, metric)
+
+def render_support_vs_treatment(counts, factor="benefits"):
+    if counts is None:
+        return _no_data_chart(f"Missing required columns for factor: {factor}")
+    if len(counts) == 0:
+        return _no_data_chart(f"No data for Chart (Support: {factor}).")
+    return _support_vs_treatment_chart(counts, factor)
+
+def agg_kpis(sel, cubes=None):
+    cubes = cubes or CUBES
+    n = cubes["treatment"].total(sel)
+
+    def yes(col, val="Yes"):
+        cube = cubes[col]
+        if n == 0 or col not in cube.dims:
+            return None
+        t = cube.table(sel, [col])
+        return int(t.loc[t[col] == val, "count"].sum())
+
+    counts = {c: yes(c) for c in KPI_COLUMNS}
+    shown = [c for c in KPI_COLUMNS if counts[c] is not None]
+    # the three intervals come from one batch of draws
+    lo, hi = rate_intervals([counts[c] for c in shown], [n] * len(shown), BOOTSTRAP_RESAMPLES, key="kpi")
+    ci = {c: [float(a), float(b)] for c, a, b in zip(shown, lo, hi)}
+    return {
+        "n": n,
+        "rates": {c: None if counts[c] is None else counts[c] / n * 100 for c in KPI_COLUMNS},
+        "ci": {c: ci.get(c) for c in KPI_COLUMNS},
+    }
+
+def render_kpis(kpis):
+    return _kpi_row(kpis["n"], kpis["rates"], kpis.get("ci"))
+
 # -----------------------------
 # App
 # -----------------------------
-app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# "vega" sends Vega-Lite specs to the browser and embeds them client-side;
+# "iframe" is the old fully inline HTML per chart
+CHART_RENDER = os.environ.get("DASH_CHART_RENDER", "vega")
+VL_VERSION = vl_version_for_vl_convert()
+VEGA_BUNDLE_URL = f"/_vega/vega-embed-{VL_VERSION}.js"
+
+# DASH_BACKGROUND=1 runs the update callback as a background job in its own
+# process, with jobs and results in JOBS_DIR (shared by all gunicorn workers).
+# The worker only polls, and a new request from the same tab terminates that
+# tab's running job, so a burst of clicks holds at most one job per tab.
+BACKGROUND = os.environ.get("DASH_BACKGROUND", "0").lower() in ("1", "on", "true", "yes")
+# filter changes are coalesced in the browser for this long before update runs
+DEBOUNCE_MS = int(os.environ.get("DASH_DEBOUNCE_MS", "200"))
+# DASH_CLIENT_FILTERING=1 ships one count table with the page and filters in the
+# browser (assets/client_filter.js); needs the default vega chart rendering
+CLIENT_FILTERING = os.environ.get("DASH_CLIENT_FILTERING", "0").lower() in ("1", "on", "true", "yes")
+if CLIENT_FILTERING and CHART_RENDER != "vega":
+    logger.warning("DASH_CLIENT_FILTERING needs DASH_CHART_RENDER=vega; filtering on the server")
+    CLIENT_FILTERING = False
+# by_year serves one partition at a time to keep memory down; a page-wide table of
+# every year would load them all, and the year dropdown would not page it
+if CLIENT_FILTERING and BY_YEAR:
+    logger.warning("DASH_CLIENT_FILTERING does not support DASH_DATA_LAYOUT=by_year; filtering on the server")
+    CLIENT_FILTERING = False
+if BACKGROUND:
+    import diskcache
+    from dash import DiskcacheManager
+    BACKGROUND_MANAGER = DiskcacheManager(
+        diskcache.Cache(os.environ.get("DASH_JOBS_DIR", str(JOBS_DIR))),
+        expire=int(os.environ.get("DASH_JOBS_EXPIRE", "300")),
+    )
+else:
+    BACKGROUND_MANAGER = None
+
+app = Dash(
+    __name__,
+    external_stylesheets=[dbc.themes.BOOTSTRAP],
+    external_scripts=[VEGA_BUNDLE_URL] if CHART_RENDER == "vega" else [],
+    background_callback_manager=BACKGROUND_MANAGER,
+)
+
+def code_fingerprint() -> str:
+    """Hash of the code and settings cached panels depend on besides the data.
+
+    The chart, cube and bootstrap modules and the bootstrap resample count all
+    change the outputs, so a deploy or a new DASH_BOOTSTRAP_RESAMPLES never
+    serves panels built by another version.
+    """
+    h = hashlib.sha1()
+    for source in (Path(__file__), BASE_DIR / "cube.py", BASE_DIR / "bootstrap.py"):
+        h.update(source.read_bytes())
+    h.update(json.dumps([BOOTSTRAP_RESAMPLES, alt.__version__, VL_VERSION]).encode("utf-8"))
+    return h.hexdigest()[:12]
+
+# Callback results, shared across gunicorn workers through CACHE_DIR and filed
+# under the data this process loaded plus the code that renders it;
+# set DASH_CACHE_DIR="" to keep the cache in memory only
+CACHE_VERSION = f"{DATA_VERSION}-{code_fingerprint()}"
+_cache_dir = os.environ.get("DASH_CACHE_DIR", str(CACHE_DIR))
+RESULT_CACHE = ResultCache(
+    CACHE_VERSION,
+    Path(_cache_dir) if _cache_dir else None,
+    max_entries=int(os.environ.get("DASH_CACHE_ENTRIES", "256")),
+    max_disk_bytes=int(os.environ.get("DASH_CACHE_MAX_MB", "64")) * 1024 * 1024,
+)
 server = app.server
 
-years = sorted(df["year"].dropna().unique())
-regions = sorted(df["region"].dropna().unique())
-genders = sorted(df["gender"].dropna().unique())
-age_bins = _order_age_bin(df["age_bin"].dropna().unique())
-company_sizes = _order_company_size(df["company_size"].dropna().unique())
-remote_vals = sorted(df["remote_work"].dropna().unique())
+@lru_cache(maxsize=1)
+def _vega_bundle() -> str:
+    import vl_convert as vlc
+    return vlc.javascript_bundle(vl_version=VL_VERSION)
+
+@server.route(VEGA_BUNDLE_URL)
+def vega_bundle():
+    # versioned URL, so browsers can keep it forever
+    return Response(
+        _vega_bundle(),
+        mimetype="application/javascript",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+# -----------------------------
+# Metrics: per-stage timings on /metrics (Prometheus text format)
+# DASH_METRICS=0 turns them off; DASH_METRICS_SAMPLE_RATE keeps a fraction of requests
+# -----------------------------
+if os.environ.get("DASH_METRICS", "1").lower() in ("0", "off", "false", "no"):
+    METRICS = NoopMetrics()
+else:
+    METRICS = Metrics(float(os.environ.get("DASH_METRICS_SAMPLE_RATE", "1.0")))
+METRICS.histogram("dashboard_stage_seconds", "Time per pipeline stage.", TIME_BUCKETS)
+METRICS.histogram("dashboard_callback_seconds", "Time inside the update callback.", TIME_BUCKETS)
+METRICS.histogram("dashboard_request_seconds", "Time per callback HTTP request.", TIME_BUCKETS)
+METRICS.histogram("dashboard_payload_bytes", "Callback response size.", BYTE_BUCKETS)
+METRICS.histogram("dashboard_filtered_rows", "Respondents matching the filters.", ROW_BUCKETS)
+METRICS.counter("dashboard_panel_cache_total", "Panel result cache lookups.")
+
+@server.before_request
+def _start_timer():
+    if request.path.endswith("/_dash-update-component"):
+        g.metrics_sampled = METRICS.sample()
+        g.request_t0 = time.perf_counter()
+
+@server.after_request
+def _record_request(response):
+    if not getattr(g, "metrics_sampled", False):
+        return response
+    now = time.perf_counter()
+    METRICS.observe("dashboard_request_seconds", now - g.request_t0)
+    METRICS.observe("dashboard_payload_bytes", response.calculate_content_length() or len(response.get_data()))
+    # Dash turns the outputs into JSON between the callback returning and this hook
+    if hasattr(g, "callback_done"):
+        METRICS.observe("dashboard_stage_seconds", now - g.callback_done, stage="serialize")
+    return response
+
+if METRICS.enabled:
+    @server.route("/metrics")
+    def metrics():
+        return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+# dropdown values come from the sidecar written by process.main(); scan only if it is stale
+_meta = read_metadata(DATA_PATH, METADATA_PATH)
+_domains = _meta["domains"] if _meta else filter_domains(df)
+years = YEARS if BY_YEAR else _domains.get("year", [])
+regions = _domains.get("region", [])
+genders = _domains.get("gender", [])
+age_bins = _domains.get("age_bin", [])
+company_sizes = _domains.get("company_size", [])
+remote_vals = _domains.get("remote_work", [])
+
+FILTER_IDS = ["f-year", "f-region", "f-gender", "f-agebin", "f-company", "f-remote"]
+# debounced copy of the filter values: {"values": [...]}
+FILTER_STATE_ID = "filter-state"
+# client-side filtering: the count table and chart templates (see client_payload)
+CLIENT_TABLE_ID = "client-table"
+client_table = dcc.Store(id=CLIENT_TABLE_ID)
 
 filters = dbc.Card(
     dbc.CardBody(
@@ -315,6 +649,29 @@ filters = dbc.Card(
     className="h-100",
 )
 
+CHART_HEIGHT = 300
+CHART_IDS = ["chart-1", "chart-2", "chart-3", "chart-4"]
+
+def chart_slot(cid):
+    return html.Div(
+        [
+            html.Div(id=f"{cid}-view", style={"width": "100%", "height": f"{CHART_HEIGHT}px"}),
+            dcc.Store(id=f"{cid}-spec"),
+        ],
+        id=cid,
+        style={"minHeight": "0"},
+    )
+
+def chart_output(cid):
+    if CHART_RENDER == "vega":
+        return Output(f"{cid}-spec", "data")
+    return Output(f"{cid}-view", "children")
+
+def render_chart(chart):
+    if CHART_RENDER == "vega":
+        return as_vega_spec(chart, height=CHART_HEIGHT)
+    return as_iframe(chart, height=CHART_HEIGHT)
+
 legend = dbc.Card(
     dbc.CardBody(
         [
@@ -383,12 +740,15 @@ app.layout = dbc.Container(
                     html.Div(
                         [
                             html.Div(id="kpi-area", style={"flex": "0 0 auto"}),
+                            dcc.Store(id="panel-hashes"),
+                            dcc.Store(id=FILTER_STATE_ID),
+                            client_table,
                             html.Div(
                                 [
-                                    html.Div(id="chart-1", style={"minHeight": "0"}),
-                                    html.Div(id="chart-2", style={"minHeight": "0"}),
-                                    html.Div(id="chart-3", style={"minHeight": "0"}),
-                                    html.Div(id="chart-4", style={"minHeight": "0"}),
+                                    chart_slot("chart-1"),
+                                    chart_slot("chart-2"),
+                                    chart_slot("chart-3"),
+                                    chart_slot("chart-4"),
                                 ],
                                 style={
                                     "flex": "1 1 auto",
@@ -422,42 +782,276 @@ app.layout = dbc.Container(
         ),
     ],
 )
-@app.callback(
-    Output("kpi-area", "children"),
-    Output("chart-1", "children"),
-    Output("chart-2", "children"),
-    Output("chart-3", "children"),
-    Output("chart-4", "children"),
-    Input("f-year", "value"),
-    Input("f-region", "value"),
-    Input("f-gender", "value"),
-    Input("f-agebin", "value"),
-    Input("f-company", "value"),
-    Input("f-remote", "value"),
-)
+# -----------------------------
+# Spec templates (vega mode): encodings, config and category orders are
+# compiled once; a request only swaps in the aggregated rows
+# -----------------------------
+class SpecTemplate:
+    def __init__(self, chart: alt.Chart, height=CHART_HEIGHT):
+        spec = as_vega_spec(chart, height=height)
+        spec.pop("datasets", None)
+        spec["data"] = {"name": "values"}
+        self.spec = spec
 
+    def fill(self, rows: pd.DataFrame) -> dict:
+        # shallow copy: everything but the dataset is shared with the template
+        spec = dict(self.spec)
+        spec["datasets"] = {"values": rows.to_dict(orient="records")}
+        return spec
 
-def update(year, region, gender, agebin, company, remote):
-    try:
-        print("DATA_PATH:", DATA_PATH)
-        print("df.shape:", df.shape)
-        print("df.columns:", list(df.columns))
+def template_orders(kind, arg, cubes=None) -> tuple:
+    # category orders of a chart, from the domains of the cubes it is built from;
+    # with by_year each year's cubes have their own domains
+    cubes = cubes or CUBES
+    if kind == "treatment_by_group":
+        return (tuple(cubes["treatment"].domains[arg]),)
+    domains = cubes[arg].domains
+    x_order = _order_work_interfere(domains[arg]) if kind == "interfere" else _order_yes_no_unknown(domains[arg])
+    return tuple(x_order), tuple(_order_yes_no_unknown(domains["treatment"]))
+
+@lru_cache(maxsize=64)
+def spec_template(kind, arg, mode, orders) -> SpecTemplate:
+    # keyed on the orders (see template_orders), which cover the whole domain;
+    # Vega-Lite ignores entries missing from the data
+    if kind == "treatment_by_group":
+        g = arg
+        empty = pd.DataFrame({g: [], "gender": [], "n": [], "treat_yes": []})
+        return SpecTemplate(_treatment_by_group_chart(empty, g, list(orders[0]), mode))
+    x_order, treatment_order = (list(o) for o in orders)
+    empty = pd.DataFrame({arg: [], "treatment": [], "count": []})
+    if kind == "interfere":
+        return SpecTemplate(_interfere_heatmap_chart(empty, mode, x_order, treatment_order))
+    return SpecTemplate(_support_vs_treatment_chart(empty, arg, x_order, treatment_order))
+
+def template_for(kind, arg, mode, cubes=None) -> SpecTemplate:
+    return spec_template(kind, arg, mode, template_orders(kind, arg, cubes))
+
+def treatment_by_group_payload(agg, group_by="age_bin", show_as="percent", cubes=None):
+    if CHART_RENDER != "vega" or agg is None or len(agg) == 0:
+        return render_chart(render_treatment_by_group(agg, group_by, show_as))
+    return template_for("treatment_by_group", group_by, show_as, cubes).fill(_treatment_rows(agg))
+
+def interfere_heatmap_payload(counts, metric="row_percent", cubes=None):
+    if CHART_RENDER != "vega" or counts is None or len(counts) == 0:
+        return render_chart(render_interfere_heatmap(counts, metric))
+    return template_for("interfere", "work_interfere", metric, cubes).fill(_heatmap_rows(counts, metric))
 
-        dff = filtered_df(df, year, region, gender, agebin, company, remote)
-        print("filters:", year, region, gender, agebin, company, remote)
-        print("dff.shape:", dff.shape)
-        h=300
-        c1 = as_iframe(chart_treatment_by_group(dff, "age_bin", "percent"), height=h)
-        c2 = as_iframe(chart_interfere_heatmap(dff, "row_percent"), height=h)
-        c3 = as_iframe(chart_support_vs_treatment(dff, "benefits"), height=h)
-        c4 = as_iframe(chart_support_vs_treatment(dff, "seek_help"), height=h)
+def support_vs_treatment_payload(counts, factor="benefits", cubes=None):
+    if CHART_RENDER != "vega" or counts is None or len(counts) == 0:
+        return render_chart(render_support_vs_treatment(counts, factor))
+    return template_for("support", factor, None, cubes).fill(_support_rows(counts, factor))
 
-        return kpi_cards(dff), c1, c2, c3, c4
+class Panel:
+    """One dashboard output: its aggregate and its renderer.
+
+    Both take the cubes the request is answered from (see cubes_for).
+    """
+
+    def __init__(self, pid, output, aggregate, render):
+        self.pid = pid
+        self.output = output
+        self.aggregate = aggregate
+        self.render = render
+
+# Every panel is computed from the filtered respondents, so any filter change can
+# change any panel. A panel is skipped when the hash of its aggregate matches the
+# one the browser already shows (the panel-hashes store).
+PANELS = [
+    Panel("kpi", Output("kpi-area", "children"), agg_kpis,
+          lambda agg, cubes=None: render_kpis(agg)),
+    Panel("chart-1", chart_output("chart-1"),
+          lambda sel, cubes=None: agg_treatment_by_group(sel, "age_bin", cubes),
+          lambda agg, cubes=None: treatment_by_group_payload(agg, "age_bin", "percent", cubes)),
+    Panel("chart-2", chart_output("chart-2"),
+          lambda sel, cubes=None: agg_pair_counts(sel, "work_interfere", cubes),
+          lambda agg, cubes=None: interfere_heatmap_payload(agg, "row_percent", cubes)),
+    Panel("chart-3", chart_output("chart-3"),
+          lambda sel, cubes=None: agg_pair_counts(sel, "benefits", cubes),
+          lambda agg, cubes=None: support_vs_treatment_payload(agg, "benefits", cubes)),
+    Panel("chart-4", chart_output("chart-4"),
+          lambda sel, cubes=None: agg_pair_counts(sel, "seek_help", cubes),
+          lambda agg, cubes=None: support_vs_treatment_payload(agg, "seek_help", cubes)),
+]
+if CHART_RENDER == "vega":
+    # compile the templates of the startup cubes rather than on the first request
+    template_for("treatment_by_group", "age_bin", "percent")
+    template_for("interfere", "work_interfere", "row_percent")
+    template_for("support", "benefits", None)
+    template_for("support", "seek_help", None)
+PANEL_POOL = ThreadPoolExecutor(max_workers=len(PANELS), thread_name_prefix="panel")
+
+def panel_aggregates(dff: pd.DataFrame) -> dict:
+    """Every panel's aggregate for an arbitrary row set, from one counting pass."""
+    cubes = row_cubes(dff)
+    return {p.pid: p.aggregate({}, cubes) for p in PANELS}
+
+def _agg_hash(agg) -> str:
+    if isinstance(agg, pd.DataFrame):
+        payload = agg.to_json(orient="split")
+    else:
+        payload = json.dumps(agg, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def build_panel(panel, key, sel, prev_hash, sampled=False):
+    # returns (aggregate hash, output or no_update)
+    panel_key = key + (panel.pid,)
+    cached = RESULT_CACHE.get(panel_key)
+    if sampled:
+        METRICS.inc("dashboard_panel_cache_total", result="miss" if cached is None else "hit")
+    if cached is not None:
+        h, out = cached
+    else:
+        cubes = cubes_for(sel)
+        # the filter step is the cube slice inside the aggregate, so it is timed with it
+        with METRICS.timer("dashboard_stage_seconds", sampled, stage="aggregate", panel=panel.pid):
+            agg = panel.aggregate(sel, cubes)
+            h = _agg_hash(agg)
+        if h == prev_hash:
+            return h, no_update
+        with METRICS.timer("dashboard_stage_seconds", sampled, stage="spec_build", panel=panel.pid):
+            out = panel.render(agg, cubes)
+        RESULT_CACHE.put(panel_key, [h, out])
+    return h, (no_update if h == prev_hash else out)
+
+def _build_panels(key, sel, prev_hashes, sampled):
+    if BACKGROUND:
+        # a background job is a forked process: the parent's panel threads do not exist there
+        return [build_panel(p, key, sel, prev_hashes.get(p.pid), sampled) for p in PANELS]
+    futures = [
+        PANEL_POOL.submit(build_panel, p, key, sel, prev_hashes.get(p.pid), sampled)
+        for p in PANELS
+    ]
+    return [f.result() for f in futures]
+
+def error_outputs(e) -> tuple:
+    # one value per callback output: the message in the KPI area, empty charts and
+    # no hashes, so the next request rebuilds every panel
+    outputs = tuple(html.Div(f"Callback error: {e}") if p.pid == "kpi" else None for p in PANELS)
+    return (*outputs, {})
+
+def update(filter_state, prev_hashes):
+    # background jobs run outside the Flask request, so they are never sampled
+    sampled = has_request_context() and getattr(g, "metrics_sampled", False)
+    t0 = time.perf_counter()
+    try:
+        if not filter_state:
+            return (*[no_update] * len(PANELS), no_update)
+        year, region, gender, agebin, company, remote = filter_state["values"]
+        sel = filter_selections(year, region, gender, agebin, company, remote)
+        key = normalize_key(year, region, gender, agebin, company, remote, CHART_RENDER) + (served_version(sel),)
+        prev_hashes = prev_hashes or {}
+
+        results = _build_panels(key, sel, prev_hashes, sampled)
+        hashes = {p.pid: h for p, (h, _) in zip(PANELS, results)}
+        if sampled:
+            METRICS.observe("dashboard_filtered_rows", cubes_for(sel)["treatment"].total(sel))
+        return (*[out for _, out in results], hashes)
 
     except Exception as e:
-        print("CALLBACK ERROR:", repr(e))
-        traceback.print_exc()
-        return html.Div(f"Callback error: {e}"), None, None, None, None
+        logger.exception("update callback failed")
+        return error_outputs(e)
+    finally:
+        if sampled:
+            g.callback_done = time.perf_counter()
+            METRICS.observe("dashboard_callback_seconds", g.callback_done - t0)
+
+# -----------------------------
+# Client-side filtering: the page carries one dictionary-encoded count table over
+# the filter and measured columns plus the chart templates; client_filter.js
+# computes the KPIs and chart rows from it, so filter changes never reach the server
+# -----------------------------
+CLIENT_CHARTS = {
+    "chart-1": {"kind": "treatment_by_group", "by": "age_bin",
+                "dims": ["age_bin", "gender", "treatment"]},
+    "chart-2": {"kind": "interfere", "factor": "work_interfere", "metric": "row_percent",
+                "dims": ["work_interfere", "treatment"]},
+    "chart-3": {"kind": "support", "factor": "benefits", "dims": ["benefits", "treatment"]},
+    "chart-4": {"kind": "support", "factor": "seek_help", "dims": ["seek_help", "treatment"]},
+}
+
+def client_payload(frame: pd.DataFrame) -> dict:
+    """The client-table store: sparse counts, chart templates and no-data specs."""
+    payload = sparse_counts(frame, APP_COLUMNS)
+    payload["filters"] = FILTER_COLUMNS
+    payload["kpis"] = KPI_COLUMNS
+    payload["ci_level"] = CI_LEVEL
+    empty = pd.DataFrame()
+    # the templates' category orders come from this frame's domains
+    cubes = CUBES if frame is df else row_cubes(frame)
+    charts = []
+    for cid, chart in CLIENT_CHARTS.items():
+        if chart["kind"] == "treatment_by_group":
+            template = template_for("treatment_by_group", chart["by"], "percent", cubes)
+            no_data = treatment_by_group_payload(empty, chart["by"])
+            missing = treatment_by_group_payload(None, chart["by"])
+        elif chart["kind"] == "interfere":
+            template = template_for("interfere", chart["factor"], chart["metric"], cubes)
+            no_data = interfere_heatmap_payload(empty, chart["metric"])
+            missing = interfere_heatmap_payload(None, chart["metric"])
+        else:
+            template = template_for("support", chart["factor"], None, cubes)
+            no_data = support_vs_treatment_payload(empty, chart["factor"])
+            missing = support_vs_treatment_payload(None, chart["factor"])
+        charts.append({"id": cid, **chart, "template": template.spec, "empty": no_data, "missing": missing})
+    payload["charts"] = charts
+    return payload
+
+# Coalesce rapid dropdown changes: each change restarts a DEBOUNCE_MS timer and
+# only the last one writes the filter state, which drives the server callback or,
+# with client filtering, the re-aggregation and re-embedding of all four charts
+app.clientside_callback(
+    f"""
+    function(...values) {{
+        const ids = {json.dumps(FILTER_IDS)};
+        const st = window._filterDebounce = window._filterDebounce || {{seq: 0}};
+        const seq = ++st.seq;
+        const fire = () => (seq === st.seq ? {{values: values}} : window.dash_clientside.no_update);
+        // the initial load (no dropdown among the triggers) is not delayed
+        const initial = !window.dash_clientside.callback_context.triggered
+            .some(t => ids.includes(t.prop_id.split(".")[0]));
+        if (initial || {DEBOUNCE_MS} <= 0) {{ return fire(); }}
+        return new Promise(resolve => setTimeout(() => resolve(fire()), {DEBOUNCE_MS}));
+    }}
+    """,
+    Output(FILTER_STATE_ID, "data"),
+    *[Input(fid, "value") for fid in FILTER_IDS],
+)
+
+if CLIENT_FILTERING:
+    client_table.data = client_payload(df)
+    app.clientside_callback(
+        ClientsideFunction("clientFilter", "update"),
+        Output("kpi-area", "children"),
+        *[Output(f"{cid}-spec", "data") for cid in CLIENT_CHARTS],
+        Input(FILTER_STATE_ID, "data"),
+        State(CLIENT_TABLE_ID, "data"),
+    )
+else:
+    app.callback(
+        *[p.output for p in PANELS],
+        Output("panel-hashes", "data"),
+        Input(FILTER_STATE_ID, "data"),
+        State("panel-hashes", "data"),
+        background=BACKGROUND,
+        interval=int(os.environ.get("DASH_BACKGROUND_POLL_MS", "100")),
+    )(update)
+
+# Embed each spec in the browser with the cached vega-embed bundle
+if CHART_RENDER == "vega":
+    for _cid in CHART_IDS:
+        app.clientside_callback(
+            f"""
+            function(spec) {{
+                const el = document.getElementById("{_cid}-view");
+                if (!el) {{ return window.dash_clientside.no_update; }}
+                if (!spec) {{ el.innerHTML = ""; return "vega-chart"; }}
+                window.vegaEmbed(el, spec, {{actions: false}}).catch(console.error);
+                return "vega-chart";
+            }}
+            """,
+            Output(f"{_cid}-view", "className"),
+            Input(f"{_cid}-spec", "data"),
+        )
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
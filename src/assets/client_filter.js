@@ -0,0 +1,270 @@
+// Client-side filtering (DASH_CLIENT_FILTERING=1 in src/app.py).
+// The "client-table" store holds the non-zero cells of one count cube over the
+// filter and measured columns (cube.sparse_counts) plus the Vega-Lite templates
+// of the four charts. Every filter change is answered here without a request:
+// the KPIs and chart rows are the same numbers agg_kpis / agg_* compute on the server.
+(function () {
+    const MISSING = "<missing>";
+    const decoded = new WeakMap();
+
+    // flat cell indices -> one code array per dimension, done once per table
+    function decode(table) {
+        let d = decoded.get(table);
+        if (d) {
+            return d;
+        }
+        const n = table.cells.length;
+        const k = table.dims.length;
+        const codes = table.dims.map(() => new Uint16Array(n));
+        for (let i = 0; i < n; i++) {
+            let flat = table.cells[i];
+            for (let j = k - 1; j >= 0; j--) {
+                const size = table.shape[j];
+                codes[j][i] = flat % size;
+                flat = Math.floor(flat / size);
+            }
+        }
+        d = {codes: {}, pos: {}, counts: Float64Array.from(table.counts)};
+        table.dims.forEach((col, j) => {
+            d.codes[col] = codes[j];
+            d.pos[col] = new Map(table.domains[col].map((v, i) => [v, i]));
+        });
+        decoded.set(table, d);
+        return d;
+    }
+
+    // same rules as filter_selections + CountCube: empty means no filter,
+    // null is the <missing> slot and unknown values match nothing
+    function masks(table, d, sel) {
+        const out = [];
+        for (const col of table.filters) {
+            const selected = sel[col];
+            if (!selected || !selected.length || !d.pos[col]) {
+                continue;
+            }
+            const mask = new Uint8Array(table.domains[col].length);
+            for (const v of selected) {
+                const i = d.pos[col].get(v === null || v === undefined ? MISSING : v);
+                if (i !== undefined) {
+                    mask[i] = 1;
+                }
+            }
+            out.push([d.codes[col], mask]);
+        }
+        return out;
+    }
+
+    // counts over the selected cells for each requested dimension tuple
+    function aggregate(table, d, sel, groups) {
+        const ms = masks(table, d, sel);
+        const sums = groups.map(dims => ({
+            dims: dims,
+            codes: dims.map(c => d.codes[c]),
+            strides: dims.map((_, j) => dims.slice(j + 1).reduce((a, c) => a * table.domains[c].length, 1)),
+            values: new Float64Array(dims.reduce((a, c) => a * table.domains[c].length, 1)),
+        }));
+        let total = 0;
+        const n = d.counts.length;
+        cells: for (let i = 0; i < n; i++) {
+            for (const [codes, mask] of ms) {
+                if (!mask[codes[i]]) {
+                    continue cells;
+                }
+            }
+            const c = d.counts[i];
+            total += c;
+            for (const s of sums) {
+                let at = 0;
+                for (let j = 0; j < s.codes.length; j++) {
+                    at += s.codes[j][i] * s.strides[j];
+                }
+                s.values[at] += c;
+            }
+        }
+        return {total: total, sums: sums};
+    }
+
+    // the non-zero entries of a sum, in domain order, like CountCube.table
+    function rows(table, s) {
+        const out = [];
+        s.values.forEach((count, at) => {
+            if (!count) {
+                return;
+            }
+            const row = {};
+            s.dims.forEach((col, j) => {
+                const size = table.domains[col].length;
+                row[col] = table.domains[col][Math.floor(at / s.strides[j]) % size];
+            });
+            row.count = count;
+            out.push(row);
+        });
+        return out;
+    }
+
+    // The server's percentile bootstrap resamples k of n as Binomial(n, k/n) / n
+    // (bootstrap.rate_intervals); here that distribution's percentiles are read off
+    // its exact CDF instead of a few thousand draws, in %
+    function interval(k, n, level) {
+        if (!n) {
+            return [null, null];
+        }
+        const p = k / n;
+        if (p === 0 || p === 1) {
+            return [p * 100, p * 100];
+        }
+        // pmf up to a constant, walked outwards from the mode until it is negligible
+        const ratio = p / (1 - p);
+        const mode = Math.min(n, Math.floor((n + 1) * p));
+        const below = [];
+        const above = [];
+        let total = 1;
+        for (let j = mode, w = 1; j > 0 && w > 1e-16; j--) {
+            w *= j / (n - j + 1) / ratio;
+            below.push(w);
+            total += w;
+        }
+        for (let j = mode, w = 1; j < n && w > 1e-16; j++) {
+            w *= ((n - j) / (j + 1)) * ratio;
+            above.push(w);
+            total += w;
+        }
+        const pmf = below.reverse().concat([1], above);
+        const start = mode - below.length;
+        const tail = (1 - level) / 2;
+        const out = [];
+        let cum = 0;
+        let i = 0;
+        for (const q of [tail, 1 - tail]) {
+            while (i < pmf.length - 1 && cum + pmf[i] / total < q) {
+                cum += pmf[i] / total;
+                i++;
+            }
+            out.push(((start + i) / n) * 100);
+        }
+        return out;
+    }
+
+    function share(counts, by, key, level) {
+        const totals = new Map();
+        for (const r of counts) {
+            totals.set(r[by], (totals.get(r[by]) || 0) + r.count);
+        }
+        return counts.map(r => {
+            const [lo, hi] = interval(r.count, totals.get(r[by]), level);
+            return Object.assign(r, {[key]: (r.count / totals.get(r[by])) * 100, [key + "_lo"]: lo, [key + "_hi"]: hi});
+        });
+    }
+
+    function fill(chart, values) {
+        if (!chart.template) {
+            return chart.missing;
+        }
+        if (!values.length) {
+            return chart.empty;
+        }
+        return Object.assign({}, chart.template, {datasets: {values: values}});
+    }
+
+    function chartRows(table, chart, s) {
+        const counts = rows(table, s);
+        if (chart.kind === "treatment_by_group") {
+            // one row per (group, gender) with n and treat_yes, like agg_treatment_by_group
+            const g = chart.by;
+            const byKey = new Map();
+            for (const r of counts) {
+                const key = JSON.stringify([r[g], r.gender]);
+                if (!byKey.has(key)) {
+                    byKey.set(key, {[g]: r[g], gender: r.gender, n: 0, treat_yes: 0});
+                }
+                const agg = byKey.get(key);
+                agg.n += r.count;
+                agg.treat_yes += r.treatment === "Yes" ? r.count : 0;
+            }
+            return Array.from(byKey.values(), r => {
+                const [lo, hi] = interval(r.treat_yes, r.n, table.ci_level);
+                return Object.assign(r, {rate: (r.treat_yes / r.n) * 100, rate_lo: lo, rate_hi: hi});
+            });
+        }
+        if (chart.kind === "interfere") {
+            if (chart.metric === "count") {
+                return counts.map(r => Object.assign(r, {value: r.count}));
+            }
+            return share(counts, chart.factor, "value", table.ci_level);
+        }
+        return share(counts, chart.factor, "pct", table.ci_level);
+    }
+
+    // mirrors _kpi_row in src/app.py
+    function kpiRow(n, rates, ci) {
+        // Python rounds exact ties to even, toFixed rounds them up: only x.25 differs
+        const round1 = x => (Number.isInteger(x * 4) && (x * 4) % 4 === 1 ? x - 0.05 : x).toFixed(1);
+        const fmt = x => (x === null ? "N/A" : round1(x) + "%");
+        const dbc = (type, props) => ({namespace: "dash_bootstrap_components", type: type, props: props});
+        const html = (type, props) => ({namespace: "dash_html_components", type: type, props: props});
+        const card = body => dbc("Col", {children: dbc("Card", {children: dbc("CardBody", {children: body})})});
+        const rateCard = (label, col) => {
+            const body = [html("Div", {children: label, className: "text-muted"}), html("H4", {children: fmt(rates[col])})];
+            if (ci[col]) {
+                body.push(html("Small", {
+                    children: `95% CI ${round1(ci[col][0])}–${round1(ci[col][1])}%`,
+                    className: "text-muted",
+                    title: "95% percentile bootstrap interval",
+                }));
+            }
+            return card(body);
+        };
+        return dbc("Row", {
+            className: "g-2",
+            children: [
+                card([html("Div", {children: "N", className: "text-muted"}), html("H4", {children: String(n)})]),
+                rateCard("Treatment rate", "treatment"),
+                rateCard("Benefits available", "benefits"),
+                rateCard("Family history", "family_history"),
+            ],
+        });
+    }
+
+    // state is the debounced filter-state store: {values: [year, region, gender, agebin, company, remote]}
+    function update(state, table) {
+        if (!state || !table) {
+            return window.dash_clientside.no_update;
+        }
+        const [year, region, gender, agebin, company, remote] = state.values;
+        const d = decode(table);
+        const sel = {
+            year: year ? [Number(year)] : null,
+            region: region,
+            gender: gender,
+            age_bin: agebin,
+            company_size: company,
+            remote_work: remote,
+        };
+        const has = cols => cols.every(c => d.codes[c]);
+        const charts = table.charts;
+        const groups = charts.map(ch => (ch.template && has(ch.dims) ? ch.dims : []));
+        const kpiCols = table.kpis.filter(c => d.codes[c]);
+        const res = aggregate(table, d, sel, groups.concat(kpiCols.map(c => [c])));
+
+        const n = res.total;
+        const rates = {};
+        const ci = {};
+        for (const col of table.kpis) {
+            rates[col] = null;
+            ci[col] = null;
+        }
+        kpiCols.forEach((col, i) => {
+            if (n) {
+                const code = d.pos[col].get("Yes");
+                const yes = code === undefined ? 0 : res.sums[charts.length + i].values[code];
+                rates[col] = (yes / n) * 100;
+                ci[col] = interval(yes, n, table.ci_level);
+            }
+        });
+        const specs = charts.map((ch, i) => (groups[i].length ? fill(ch, chartRows(table, ch, res.sums[i])) : ch.missing));
+        return [kpiRow(n, rates, ci)].concat(specs);
+    }
+
+    window.dash_clientside = window.dash_clientside || {};
+    window.dash_clientside.clientFilter = {update: update, interval: interval};
+})();
@@ -0,0 +1,82 @@
+from __future__ import annotations
+import hashlib
+import numpy as np
+
+RESAMPLES = 2000
+LEVEL = 0.95
+
+
+def _percentiles(draws: np.ndarray, level: float) -> tuple[np.ndarray, np.ndarray]:
+    # np.percentile's linear interpolation, from one sort of the (integer) draws
+    # along the last axis
+    draws = np.sort(draws, axis=-1)
+    tail = (1 - level) / 2
+    out = []
+    for q in (tail, 1 - tail):
+        pos = q * (draws.shape[-1] - 1)
+        below = int(np.floor(pos))
+        above = min(below + 1, draws.shape[-1] - 1)
+        out.append(draws[..., below] + (pos - below) * (draws[..., above] - draws[..., below]))
+    return out[0], out[1]
+
+
+def _rng(seed: int | None, key: str, *tables: np.ndarray) -> np.random.Generator:
+    # by default the stream is keyed on the call site and the count table itself:
+    # the same table gets the same interval in every worker and on every request,
+    # while different tables and call sites no longer all replay seed 0
+    if seed is None:
+        h = hashlib.blake2b(key.encode("utf-8"), digest_size=8)
+        for t in tables:
+            h.update(repr(t.shape).encode("ascii"))
+            h.update(np.ascontiguousarray(t, dtype=np.int64).tobytes())
+        seed = int.from_bytes(h.digest(), "little")
+    return np.random.default_rng(seed)
+
+
+def rate_intervals(successes, trials, resamples: int = RESAMPLES, level: float = LEVEL,
+                   seed: int | None = None, key: str = "") -> tuple[np.ndarray, np.ndarray]:
+    """Percentile bootstrap interval of successes / trials (in %) for every cell.
+
+    Resampling a cell's respondents with replacement only changes how many of
+    them answered yes, so each resample is one binomial draw; all resamples of
+    all cells come from a single call. Without a `seed`, the draws are seeded
+    from `key` (the call site) and the counts, so a given count table keeps its
+    interval from request to request.
+    """
+    successes = np.asarray(successes, dtype=np.int64)
+    trials = np.asarray(trials, dtype=np.int64)
+    lo = np.full(trials.shape, np.nan)
+    hi = np.full(trials.shape, np.nan)
+    ok = trials > 0
+    if ok.any():
+        n = trials[ok]
+        rng = _rng(seed, key, successes, trials)
+        # cell-major, so consecutive draws share n and p and numpy reuses their setup
+        draws = rng.binomial(n[:, None], (successes[ok] / n)[:, None], size=(n.size, resamples))
+        a, b = _percentiles(draws, level)
+        lo[ok], hi[ok] = a / n * 100, b / n * 100
+    return lo, hi
+
+
+def share_intervals(counts, resamples: int = RESAMPLES, level: float = LEVEL,
+                    seed: int | None = None, key: str = "") -> tuple[np.ndarray, np.ndarray]:
+    """Percentile bootstrap interval (in %) of every cell's share of its row.
+
+    `counts` is a groups x answers table. A resampled group is one multinomial
+    draw over its answers; every group is drawn in the same call. Seeded as in
+    `rate_intervals`.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    lo = np.full(counts.shape, np.nan)
+    hi = np.full(counts.shape, np.nan)
+    totals = counts.sum(axis=1)
+    ok = totals > 0
+    if ok.any():
+        n = totals[ok]
+        rng = _rng(seed, key, counts)
+        pvals = counts[ok] / n[:, None]
+        draws = rng.multinomial(n[:, None], pvals[:, None, :], size=(n.size, resamples))
+        # groups x resamples x answers -> groups x answers x resamples
+        a, b = _percentiles(draws.transpose(0, 2, 1), level)
+        lo[ok], hi[ok] = a / n[:, None] * 100, b / n[:, None] * 100
+    return lo, hi
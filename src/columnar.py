@@ -0,0 +1,221 @@
+from __future__ import annotations
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Sequence
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CODEBOOK = "codebook.json"
+# symlink in the store root naming the version directory readers open
+CURRENT = "current"
+
+
+def read_parquet_frame(path: Path, columns: Sequence[str]) -> pd.DataFrame:
+    """Read `columns` of a processed Parquet file with text columns as categoricals."""
+    schema = pq.read_schema(path)
+    columns = [c for c in columns if c in schema.names]
+    # every text column here is low-cardinality, so read it dictionary-encoded;
+    # age_bin/company_size are stored as ordered categoricals already and keep that order
+    text_cols = [c for c in columns if pa.types.is_string(schema.field(c).type)
+                 or pa.types.is_large_string(schema.field(c).type)]
+    table = pq.read_table(path, columns=columns, read_dictionary=text_cols)
+    return table.to_pandas()
+
+
+def _is_plain(s: pd.Series) -> bool:
+    # numbers (e.g. year) are stored as their own values, so they come back numeric
+    return pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype)
+
+
+def _column_spec(dtype) -> dict:
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes_dtype = pd.Categorical([], dtype=dtype).codes.dtype
+        return {
+            "categories": [v.item() if isinstance(v, np.generic) else v for v in dtype.categories],
+            "ordered": bool(dtype.ordered),
+            "dtype": str(codes_dtype),
+        }
+    return {"categories": None, "ordered": False, "dtype": str(np.dtype(dtype))}
+
+
+def _encode(s: pd.Series, spec: dict, dtype) -> np.ndarray:
+    if spec["categories"] is None:
+        return s.to_numpy(dtype=spec["dtype"])
+    # not s.astype(dtype): unordered dtypes compare equal whatever their order, and
+    # that cast would then keep codes for the batch's own category order
+    return pd.Categorical(s, categories=dtype.categories, ordered=dtype.ordered).codes
+
+
+def _write_codebook(root: Path, state: dict) -> None:
+    # the codebook goes last, so a store is only visible once all its arrays exist
+    tmp = root / (CODEBOOK + ".tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(root / CODEBOOK)
+
+
+def store_dir(root: Path) -> Path:
+    """The version directory `root` currently points at (`root` itself for a flat store)."""
+    root = Path(root)
+    current = root / CURRENT
+    return current.resolve() if current.exists() else root
+
+
+def _new_version(root: Path) -> Path:
+    # names sort by build start, so a version older than the published one is finished or abandoned
+    version = root / f"v-{time.time_ns():016x}-{uuid.uuid4().hex[:6]}"
+    version.mkdir(parents=True)
+    return version
+
+
+def _publish(root: Path, version: Path, keep: int = 2) -> None:
+    """Point `root/current` at a finished version directory, then drop old versions.
+
+    The new symlink replaces the old one in a single rename, so a reader sees
+    one store or the other, never a mix. Nothing is rewritten in place: a
+    process that mapped an older version keeps its pages even after that
+    version is deleted. The previous version is kept for readers that resolved
+    `current` just before the swap.
+    """
+    link = root / f"{CURRENT}.{uuid.uuid4().hex[:6]}.tmp"
+    os.symlink(version.name, link)
+    os.replace(link, root / CURRENT)
+    versions = sorted(p for p in root.glob("v-*") if p.is_dir())
+    finished = [p for p in versions if (p / CODEBOOK).exists() and p.name <= version.name]
+    stale = set(finished[:-keep]) | {p for p in versions if p.name < version.name and p not in finished}
+    for p in stale:
+        shutil.rmtree(p, ignore_errors=True)
+    # arrays of a flat store written before versioned builds
+    for p in [*root.glob("*.npy"), root / CODEBOOK]:
+        p.unlink(missing_ok=True)
+
+
+def write_store(frame: pd.DataFrame, root: Path, data_version: str | None = None) -> None:
+    """Write every column as a `<col>.npy` array plus a codebook.
+
+    Text columns are stored as int8/int16 category codes (-1 for missing),
+    exactly pandas' categorical codes, so `open_store` can wrap the
+    memory-mapped arrays without copying them; non-categorical text is encoded
+    with sorted categories. Numeric columns are stored as their values.
+    Each write goes to a new version directory (see `_publish`).
+    """
+    root = Path(root)
+    version = _new_version(root)
+    columns = {}
+    for col in frame.columns:
+        s = frame[col]
+        dtype = s.dtype
+        if not _is_plain(s) and not isinstance(dtype, pd.CategoricalDtype):
+            dtype = pd.CategoricalDtype(sorted(s.dropna().unique().tolist()))
+        columns[col] = _column_spec(dtype)
+        np.save(version / f"{col}.npy", _encode(s, columns[col], dtype))
+    _write_codebook(version, {"data_version": data_version, "rows": len(frame), "columns": columns})
+    _publish(root, version)
+
+
+def read_codebook(root: Path) -> dict | None:
+    path = store_dir(root) / CODEBOOK
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return None
+
+
+def open_store(root: Path, columns: Sequence[str] | None = None) -> pd.DataFrame:
+    """Frame whose columns are read-only memory maps of the store.
+
+    Text columns come back as categoricals over the mapped codes, numeric ones
+    as the mapped values. Every process that opens the store shares one
+    page-cache copy; only the (small) category lists are per process. The
+    app reads the frame to build its filter index and count cubes, and live
+    callbacks answer from the cubes, so the mapping saves private memory for
+    the frame rather than speeding up the queries. `current` is resolved
+    once, so a rebuild never changes the values of an open frame.
+    """
+    root = store_dir(root)
+    book = read_codebook(root)
+    if book is None:
+        raise FileNotFoundError(f"Missing column store: {root}")
+    names = [c for c in (columns or book["columns"]) if c in book["columns"]]
+    data = {}
+    for col in names:
+        spec = book["columns"][col]
+        codes = np.load(root / f"{col}.npy", mmap_mode="r")
+        if spec["categories"] is None:
+            # a plain ndarray over the same pages, so results of arithmetic are not memmaps
+            data[col] = codes.view(np.ndarray)
+            continue
+        dtype = pd.CategoricalDtype(spec["categories"], ordered=spec["ordered"])
+        data[col] = pd.Categorical.from_codes(codes, dtype=dtype, validate=False)
+    return pd.DataFrame(data, copy=False)
+
+
+def build_store(parquet_path: Path, root: Path, data_version: str | None = None,
+                columns: Sequence[str] | None = None, batch_size: int = 1 << 16) -> int:
+    """Encode `columns` (default: all) of a processed Parquet file into a store at `root`.
+
+    The file is read in record batches, twice: once to collect each column's
+    categories and dtype, once to write the codes into preallocated arrays.
+    Memory stays at one batch however large the file is. The arrays go to a
+    new version directory that is only published once complete (see `_publish`).
+    """
+    root = Path(root)
+    schema = pq.read_schema(parquet_path)
+    names = [c for c in (columns or schema.names) if c in schema.names]
+    plain = {c: schema.field(c).type.to_pandas_dtype() for c in names
+             if pa.types.is_integer(schema.field(c).type) or pa.types.is_floating(schema.field(c).type)}
+    text_cols = [c for c in names if pa.types.is_string(schema.field(c).type)
+                 or pa.types.is_large_string(schema.field(c).type)]
+    pf = pq.ParquetFile(parquet_path, read_dictionary=text_cols)
+    # batches do not carry the pandas metadata, so the categorical order is taken from the file's
+    ordered = {c["name"]: bool((c.get("metadata") or {}).get("ordered"))
+               for c in (schema.pandas_metadata or {}).get("columns", [])}
+
+    def batches():
+        for batch in pf.iter_batches(batch_size=batch_size, columns=names):
+            yield batch.to_pandas()
+
+    # categories in first-seen order (a categorical keeps its own order; anything else
+    # is sorted like write_store does), numeric dtypes promoted across batches as
+    # pd.concat would (int32 + NaN -> float64)
+    categories = {c: {} for c in names if c not in plain}
+    unsorted = set()
+    dtypes = {c: np.dtype(d) for c, d in plain.items()}
+    for part in batches():
+        for col in names:
+            s = part[col]
+            if col in plain:
+                dtypes[col] = np.result_type(dtypes[col], s.dtype)
+            elif isinstance(s.dtype, pd.CategoricalDtype):
+                unsorted.add(col)
+                categories[col].update(dict.fromkeys(s.cat.categories.tolist()))
+            else:
+                categories[col].update(dict.fromkeys(s.dropna().unique().tolist()))
+    for col, values in categories.items():
+        values = list(values) if col in unsorted else sorted(values)
+        dtypes[col] = pd.CategoricalDtype(values, ordered=ordered.get(col, False))
+
+    version = _new_version(root)
+    rows = pf.metadata.num_rows
+    specs = {col: _column_spec(dtypes[col]) for col in names}
+    arrays = {col: np.lib.format.open_memmap(version / f"{col}.npy", mode="w+",
+                                             dtype=specs[col]["dtype"], shape=(rows,))
+              for col in names}
+    start = 0
+    for part in batches():
+        for col in names:
+            arrays[col][start:start + len(part)] = _encode(part[col], specs[col], dtypes[col])
+        start += len(part)
+    for a in arrays.values():
+        a.flush()
+    del arrays
+    _write_codebook(version, {"data_version": data_version, "rows": rows, "columns": specs})
+    _publish(root, version)
+    return rows
@@ -4,3 +4,16 @@ BASE_DIR = Path(__file__).resolve().parents[1]  # repo root
 DATA_RAW = BASE_DIR / "data" / "raw" / "survey.csv"
 DATA_PROCESSED = BASE_DIR / "data" / "processed" / "cleaned.parquet"
 REPORT_EDA = BASE_DIR / "reports" / "eda_summary.md"
+CACHE_DIR = BASE_DIR / ".cache" / "dashboard"
+JOBS_DIR = BASE_DIR / ".cache" / "jobs"
+DATA_METADATA = BASE_DIR / "data" / "processed" / "cleaned.meta.json"
+DATA_RAW_DIR = BASE_DIR / "data" / "raw"
+DATA_BY_YEAR = BASE_DIR / "data" / "processed" / "by_year"
+DATA_BY_YEAR_METADATA = DATA_BY_YEAR / "_metadata.json"
+PIPELINE_CACHE = BASE_DIR / ".cache" / "pipeline"
+DATA_STORE = BASE_DIR / "data" / "processed" / "store"
+
+# Only the columns used by the dashboard's filters, charts and KPIs
+FILTER_COLUMNS = ["year", "region", "gender", "age_bin", "company_size", "remote_work"]
+MEASURE_COLUMNS = ["treatment", "work_interfere", "benefits", "seek_help", "family_history"]
+APP_COLUMNS = FILTER_COLUMNS + MEASURE_COLUMNS
@@ -0,0 +1,120 @@
+from __future__ import annotations
+from typing import Iterable, Mapping, Sequence
+import numpy as np
+import pandas as pd
+
+MISSING = "<missing>"
+
+
+class CountCube:
+    """Dense count tensor over filter dimensions crossed with measured columns.
+
+    Every axis is one column, with one slot per distinct value (plus a
+    `<missing>` slot when the column has nulls). Queries slice the filter
+    axes and sum, so their cost depends on the cube size, not on the
+    number of respondents.
+    """
+
+    def __init__(self, frame: pd.DataFrame, filter_dims: Sequence[str], measures: Sequence[str]):
+        self.filter_dims = [c for c in filter_dims if c in frame.columns]
+        self.measures = [c for c in measures if c in frame.columns]
+        self.dims = self.filter_dims + self.measures
+        self.domains: dict[str, list] = {}
+        self._pos: dict[str, dict] = {}
+
+        codes_list = []
+        for col in self.dims:
+            codes, labels = _encode(frame[col])
+            self.domains[col] = labels
+            self._pos[col] = {lab: i for i, lab in enumerate(labels)}
+            codes_list.append(codes)
+
+        shape = tuple(len(self.domains[c]) for c in self.dims)
+        size = int(np.prod(shape)) if shape else 1
+        if len(frame) and codes_list:
+            flat = np.ravel_multi_index(codes_list, shape)
+            counts = np.bincount(flat, minlength=size)
+        else:
+            counts = np.full(size, len(frame) if not codes_list else 0)
+        self.counts = counts.reshape(shape)
+
+    def _slice(self, selections: Mapping[str, Iterable | None]) -> tuple[np.ndarray, dict[str, list]]:
+        # returns the sliced counts and the labels left on each axis
+        c = self.counts
+        labels = dict(self.domains)
+        for axis, col in enumerate(self.filter_dims):
+            selected = selections.get(col)
+            if not selected:
+                continue
+            pos = self._pos[col]
+            idx = sorted({pos[k] for k in map(_label, selected) if k in pos})
+            c = c.take(idx, axis=axis)
+            labels[col] = [self.domains[col][i] for i in idx]
+        return c, labels
+
+    def total(self, selections: Mapping[str, Iterable | None]) -> int:
+        return int(self._slice(selections)[0].sum())
+
+    def table(self, selections: Mapping[str, Iterable | None], by: Sequence[str]) -> pd.DataFrame:
+        """Long table of non-zero counts for `by`, in domain order."""
+        c, labels = self._slice(selections)
+        keep = [self.dims.index(b) for b in by]
+        drop = tuple(i for i in range(len(self.dims)) if i not in keep)
+        c = c.sum(axis=drop)
+        # sum() keeps the remaining axes in cube order; put them in `by` order
+        c = np.transpose(c, [sorted(keep).index(k) for k in keep])
+        nz = np.nonzero(c)
+        out = {b: np.asarray(labels[b], dtype=object)[nz[i]] for i, b in enumerate(by)}
+        out["count"] = c[nz]
+        return pd.DataFrame(out)
+
+
+def sparse_counts(frame: pd.DataFrame, columns: Sequence[str]) -> dict:
+    """Non-zero counts of every value combination of `columns`, as plain lists.
+
+    Domains are those a CountCube over the same columns would have, and each
+    cell is its row-major flat index into that cube, so the whole table is two
+    integer lists (e.g. for the browser).
+    """
+    columns = [c for c in columns if c in frame.columns]
+    codes_list = []
+    domains = {}
+    for col in columns:
+        codes, labels = _encode(frame[col])
+        codes_list.append(codes)
+        domains[col] = labels
+    shape = tuple(len(domains[c]) for c in columns)
+    if len(frame) and codes_list:
+        cells, counts = np.unique(np.ravel_multi_index(codes_list, shape), return_counts=True)
+    else:
+        cells = counts = np.array([], dtype=np.int64)
+    return {
+        "dims": columns,
+        "domains": domains,
+        "shape": list(shape),
+        "cells": cells.tolist(),
+        "counts": counts.tolist(),
+    }
+
+
+def _label(v):
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return MISSING
+    # numpy scalars and Python scalars of the same value share one label
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def _encode(s: pd.Series) -> tuple[np.ndarray, list]:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # keep the category order (age_bin, company_size) for the axis
+        codes = s.cat.codes.to_numpy().astype(np.int64)
+        labels = [_label(v) for v in s.cat.categories]
+    else:
+        codes, uniques = pd.factorize(s, sort=True, use_na_sentinel=True)
+        labels = [_label(v) for v in uniques]
+    if (codes < 0).any():
+        # nulls share the slot of a literal "<missing>" answer if there is one
+        if MISSING not in labels:
+            labels.append(MISSING)
+        codes = np.where(codes < 0, labels.index(MISSING), codes)
+    return codes, labels
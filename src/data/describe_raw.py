@@ -1,48 +1,76 @@
+import argparse
 import pandas as pd
 # to import functions to load raw datasets
-from src.data.load_raw import load_raw
+from src.data.load_raw import iter_raw, load_raw_inferred
+from src.data.profile import TEXT_DTYPE, profile_chunks
 from src.config import REPORT_EDA
 
-# here the output will be eturned as a string
-def make_eda_report(df: pd.DataFrame) -> str:
-    
-    # to make a list to store lines 
+# to lay out the report; both the in-memory and the streaming version fill it
+def _render_report(rows: int, dtypes: pd.Series, missing: pd.Series, top_values: dict, distinct: pd.Series | None = None) -> str:
+
+    # to make a list to store lines
     lines=[]
-    
+
     # to have the dataset information
     lines.append("# EDA Summary (Raw Data)\n")
-    lines.append(f"- Rows: {df.shape[0]}\n")   
-    lines.append(f"- Columns: {df.shape[1]}\n") 
+    lines.append(f"- Rows: {rows}\n")
+    lines.append(f"- Columns: {len(dtypes)}\n")
 
     # to have the column data types
     lines.append("## Column Types\n")
-    lines.append(df.dtypes.astype(str).to_frame("dtype").to_markdown())
+    types=dtypes.astype(str).to_frame("dtype")
+    if distinct is not None:
+        types["distinct (approx.)"]=distinct
+    lines.append(types.to_markdown())
     lines.append("\n")
-    
+
     # here it is to find the percentage of the missing values per columns
     lines.append("## Missing Rate (Top 20)\n")
-    miss = (df.isna().mean().sort_values(ascending=False)*100).round(2)
-    
+    miss=(missing.sort_values(ascending=False, kind="stable")*100).round(2)
+
     # to add the top 20 columns with highest missing rate
     lines.append(miss.head(20).to_frame("missing_%").to_markdown())
     lines.append("\n")
-    
-    # here it is to add first 10 object-type columns
-    cat_cols=[c for c in df.columns if df[c].dtype == "object"][:10]
+
     lines.append("## Categorical Value Counts (sample)\n")
-    for c in cat_cols:
+    for c, vc in top_values.items():
         lines.append(f"### {c}\n")
+        lines.append(vc.to_markdown(index=False))
+        lines.append("\n")
+    return "\n".join(lines)
+
+# here the output will be eturned as a string
+def make_eda_report(df: pd.DataFrame) -> str:
+    # here it is to add first 10 object-type columns
+    cat_cols=[c for c in df.columns if pd.api.types.is_string_dtype(df[c].dtype)][:10]
+    top_values={}
+    for c in cat_cols:
         # Convert to string type and replace missing with label
         s=df[c].astype("string").fillna("<missing>")
         # Top 10 most frequent values
-        vc = (s.value_counts(dropna=False).head(10).rename_axis("value").reset_index(name="count"))
-        lines.append(vc.to_markdown(index=False))
-        lines.append("\n")
-        return "\n".join(lines)
-def main():
-    df=load_raw()
+        top_values[c]=(s.value_counts(dropna=False).head(10).rename_axis("value").reset_index(name="count"))
+    return _render_report(len(df), df.dtypes, df.isna().mean(), top_values)
+
+# same report from one chunked pass over the raw file, so memory stays fixed
+# per column whatever the file size; distinct counts and top values are sketch estimates
+def make_streaming_eda_report(chunks) -> str:
+    profiles=profile_chunks(chunks)
+    rows=next(iter(profiles.values())).rows if profiles else 0
+    dtypes=pd.Series({c: p.dtype() for c, p in profiles.items()})
+    missing=pd.Series({c: p.missing / p.rows if p.rows else 0.0 for c, p in profiles.items()})
+    distinct=pd.Series({c: p.hll.estimate() for c, p in profiles.items()})
+    cat_cols=[c for c in profiles if dtypes[c] == TEXT_DTYPE][:10]
+    top_values={c: profiles[c].top(10) for c in cat_cols}
+    return _render_report(rows, dtypes, missing, top_values, distinct)
+
+def main(chunksize: int | None = None):
+    report=make_streaming_eda_report(iter_raw(chunksize)) if chunksize else make_eda_report(load_raw_inferred())
     REPORT_EDA.parent.mkdir(parents=True, exist_ok=True)
-    REPORT_EDA.write_text(make_eda_report(df),encoding="utf-8")
+    REPORT_EDA.write_text(report,encoding="utf-8")
     print(f"Wrote: {REPORT_EDA}")
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser=argparse.ArgumentParser(description="Write the raw-data EDA summary.")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="profile the raw CSV in one streaming pass, this many rows at a time")
+    args=parser.parse_args()
+    main(args.chunksize)
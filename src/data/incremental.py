@@ -0,0 +1,121 @@
+from __future__ import annotations
+import shutil
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+import pyarrow.dataset as ds
+from src.config import DATA_BY_YEAR, DATA_BY_YEAR_METADATA, DATA_RAW
+from src.data.load_raw import complete_end, iter_raw
+from src.data.metadata import FILTER_DOMAIN_COLUMNS, dataset_files, filter_domains, read_metadata, write_metadata
+from src.data.multiyear import process_source_chunk, source_for, write_partitioned
+from src.data.process import processed_schema
+from src.data.watermark import Frontier, fingerprint, read_state, select_new_rows, watermark_path, write_state
+
+# new runs are written here first and only moved into the dataset once the watermark
+# covering them is committed; the leading underscore keeps dataset readers out of it
+STAGING_DIR="_staging"
+
+def write_watermark(path: Path, state: dict, pending: str | None = None) -> None:
+    write_state(path, {**state, "pending": pending})
+
+# to move a committed run's staged files into the dataset; safe to repeat after a crash
+def _publish(root: Path, run_id: str) -> None:
+    staged=root / STAGING_DIR / run_id
+    if staged.exists():
+        for f in sorted(staged.rglob("*.parquet")):
+            dest=root / f.relative_to(staged)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            f.replace(dest)
+        shutil.rmtree(staged, ignore_errors=True)
+
+# to finish a committed run interrupted before its files were moved, and drop runs
+# that crashed before their watermark was committed (their rows are read again)
+def _recover(root: Path, state: dict, path: Path) -> None:
+    if state["pending"]:
+        _publish(root, state["pending"])
+        state["pending"]=None
+        write_watermark(path, state)
+    shutil.rmtree(root / STAGING_DIR, ignore_errors=True)
+
+# to bring the dataset's sidecar up to date after a run; `domains` already has the previous
+# domains merged in, and without a current sidecar they are read back from the dataset
+def _update_metadata(root: Path, metadata_path: Path, previous: dict | None, domains: dict, added: int) -> None:
+    if previous is None:
+        dataset=ds.dataset(root, format="parquet", partitioning="hive")
+        columns=[c for c in FILTER_DOMAIN_COLUMNS if c in dataset.schema.names]
+        frame=dataset.to_table(columns=columns).to_pandas()
+        write_metadata(filter_domains(frame), len(frame), root, metadata_path)
+    else:
+        write_metadata(domains, previous["rows"] + added, root, metadata_path)
+
+# to process only the raw rows appended since the last run and add them to the
+# year-partitioned dataset the app serves (see src.data.multiyear)
+# an export whose ingested bytes are unchanged is read from the watermark's byte offset,
+# so a run parses only the appended rows; one that was rewritten is scanned again and
+# only rows past the watermark's Timestamp are taken
+def process_incremental(chunksize: int = 100_000, root: Path = DATA_BY_YEAR, watermark: Path | None = None,
+                        raw_path: Path = DATA_RAW, metadata_path: Path = DATA_BY_YEAR_METADATA) -> int:
+    root=Path(root)
+    path=watermark_path(root, raw_path) if watermark is None else Path(watermark)
+    state=read_state(path)
+    _recover(root, state, path)
+    previous=read_metadata(root, metadata_path)
+    source=source_for(raw_path)
+
+    end=complete_end(raw_path)
+    appended=(state["offset"] > 0 and end >= state["offset"]
+              and fingerprint(raw_path, state["offset"]) == state["fingerprint"])
+    frontier=Frontier(state["timestamp"], state["seen"])
+    if appended:
+        start, since, unmatched=state["offset"], None, None
+    else:
+        if state["offset"] and state["timestamp"] is None:
+            raise ValueError(f"{raw_path} was rewritten since it was ingested and has no Timestamp to "
+                             "find the new rows by; rebuild with python -m src.data.multiyear")
+        start, since, unmatched=0, frontier.timestamp, Counter(state["seen"])
+
+    # one basename per run so appended files never overwrite earlier ones,
+    # even for runs started within the same second
+    run_id=f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    staged=root / STAGING_DIR / run_id
+    schema=processed_schema()
+    added=0
+    dropped=0
+    domains=previous["domains"] if previous else {}
+    for i, chunk in enumerate(iter_raw(chunksize, raw_path, start, end)):
+        new=select_new_rows(chunk, since, unmatched)
+        if len(new) == 0:
+            continue
+        part, table, unplaced=process_source_chunk(new, source, schema)
+        dropped+=unplaced
+        if len(part):
+            write_partitioned(table, staged, f"run-{run_id}-{i}")
+        frontier.update(new)
+        added+=len(part)
+        domains=filter_domains(part, domains)
+
+    # commit the watermark with the staged run marked pending, then publish the files:
+    # a crash before the commit re-reads the rows, one after it only repeats the move
+    state={**state, "offset": end, "fingerprint": fingerprint(raw_path, end), **frontier.state(),
+           "rows": state["rows"] + added, "dropped": state["dropped"] + dropped}
+    if added:
+        write_watermark(path, state, pending=run_id)
+        _publish(root, run_id)
+    write_watermark(path, state)
+    # a recovered run leaves the sidecar behind the dataset even when nothing was added
+    if added or (previous is None and dataset_files(root)):
+        _update_metadata(root, metadata_path, previous, domains, added)
+    return added
+
+def main() -> None:
+    added=process_incremental()
+    print(f"Appended {added} new rows to {DATA_BY_YEAR}")
+    state=read_state(watermark_path(DATA_BY_YEAR, DATA_RAW))
+    print(f"Watermark: {state['timestamp']}")
+    if state["dropped"]:
+        print(f"Left out {state['dropped']} rows with no Timestamp and no year in the file name")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,169 @@
+from __future__ import annotations
+import csv
+import io
+from pathlib import Path
+from typing import Iterator, Sequence
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from src.config import DATA_RAW
+
+# declared types of the known raw survey columns, so nothing is inferred at read time
+# Age is text here as it is in iter_raw: values such as "32.5" or "abc" must not fail
+# the read, and process.clean_age coerces them the same way on both paths
+RAW_SCHEMA=pa.schema(
+    [(c, pa.string()) for c in [
+        "Timestamp", "Age", "Gender", "Country", "state", "self_employed", "family_history", "treatment",
+        "work_interfere", "no_employees", "remote_work", "tech_company", "benefits",
+        "care_options", "wellness_program", "seek_help", "anonymity", "leave",
+        "mental_health_consequence", "phys_health_consequence", "coworkers", "supervisor",
+        "mental_health_interview", "phys_health_interview", "mental_vs_physical",
+        "obs_consequence", "comments",
+    ]]
+)
+# the strings pandas.read_csv reads as missing, so both readers agree on NaN
+NA_VALUES=["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+           "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+
+# the column names of an export; a UTF-8 BOM is dropped from the first name as both CSV readers do
+def read_header(path: Path = DATA_RAW) -> list[str]:
+    with Path(path).open(newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+# to stop before parsing anything when the export's header is not the known layout:
+# a column RAW_SCHEMA does not declare, or a missing column the cleaning needs;
+# `allow_unknown` accepts undeclared columns, which are then read as text
+def check_header(path: Path = DATA_RAW, required: Sequence[str] = (), allow_unknown: bool = False) -> list[str]:
+    header=read_header(path)
+    unexpected=[] if allow_unknown else [c for c in header if c not in RAW_SCHEMA.names]
+    missing=[c for c in required if c not in header]
+    if unexpected or missing:
+        raise ValueError(f"Unexpected raw header in {path}: unknown columns {unexpected}, missing columns {missing}")
+    return header
+
 # to read the raw dataset from disk and returns it as a pandas dataFrame
-def load_raw() -> pd.DataFrame:
-    df = pd.read_csv(DATA_RAW)
-    return df
\ No newline at end of file
+# pyarrow's reader parses blocks on all cores; `columns` keeps only those columns and
+# `dictionary` reads the listed answer columns as categoricals instead of one string per cell
+def load_raw(path: Path = DATA_RAW, columns: Sequence[str] | None = None,
+             dictionary: Sequence[str] = (), allow_unknown: bool = False) -> pd.DataFrame:
+    header=check_header(path, columns or (), allow_unknown)
+    columns=header if columns is None else [c for c in header if c in columns]
+    types={c: RAW_SCHEMA.field(c).type if c in RAW_SCHEMA.names else pa.string() for c in columns}
+    for c in dictionary:
+        if c in types:
+            types[c]=pa.dictionary(pa.int32(), pa.string())
+    table=pacsv.read_csv(
+        path,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types=types,
+            include_columns=columns,
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas()
+
+# to read the raw dataset with pandas' type inference, for reports that describe the
+# export as found (Age as int64 when every answer is a whole number)
+def load_raw_inferred(path: Path = DATA_RAW) -> pd.DataFrame:
+    return pd.read_csv(path)
+
+# to read the raw dataset in fixed-size chunks so memory stays bounded
+# every column is read as text so a chunk's inferred dtypes never depend on which rows it holds;
+# `start`/`end` limit the read to a byte range of whole records (see data_start and
+# complete_end), so an append-only export is read from where the last run stopped
+# without parsing anything before it
+def iter_raw(chunksize: int, path=DATA_RAW, start: int | None = None,
+             end: int | None = None) -> Iterator[pd.DataFrame]:
+    if start is None and end is None:
+        with pd.read_csv(path, dtype=str, chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield chunk
+        return
+    header=read_header(path)
+    start=max(start or 0, data_start(path))
+    end=Path(path).stat().st_size if end is None else end
+    if start >= end:
+        return
+    with Path(path).open("rb") as f:
+        f.seek(start)
+        with pd.read_csv(io.BufferedReader(_ByteRange(f, end)), header=None, names=header, dtype=str,
+                         chunksize=chunksize, encoding="utf-8") as reader:
+            for chunk in reader:
+                yield chunk
+
+# the byte offset of the first record, just past the header line
+def data_start(path: Path = DATA_RAW) -> int:
+    with Path(path).open("rb") as f:
+        f.readline()
+        return f.tell()
+
+# the byte offset just past the last complete line; a trailing line without its
+# newline may still be being written, so it is left for the next read
+def complete_end(path: Path = DATA_RAW, block: int = 1 << 16) -> int:
+    with Path(path).open("rb") as f:
+        end=f.seek(0, 2)
+        pos=end
+        while pos > 0:
+            step=min(block, pos)
+            f.seek(pos - step)
+            data=f.read(step)
+            nl=data.rfind(b"\n")
+            if nl >= 0:
+                return pos - step + nl + 1
+            pos-=step
+    return 0
+
+# to cut the records of a raw export into at most `n` byte ranges of whole records, one per
+# reader of iter_raw; each cut goes at the first line end past an n-th of the file where the
+# double quotes seen so far are balanced, so a quoted answer holding a newline is never split
+# (counting quotes is one pass over the bytes, far cheaper than parsing them)
+def split_ranges(path: Path, n: int, block: int = 1 << 20) -> list[tuple[int, int]]:
+    path=Path(path)
+    start, end=data_start(path), path.stat().st_size
+    if start >= end:
+        return []
+    targets=[start + (end - start) * i // n for i in range(1, n)]
+    cuts=[start]
+    quotes=0
+    with path.open("rb") as f:
+        f.seek(start)
+        pos=start
+        while targets:
+            data=f.read(block)
+            if not data:
+                break
+            i=0
+            while targets:
+                j=data.find(b"\n", max(targets[0] - pos, i))
+                if j < 0:
+                    break
+                quotes+=data.count(b'"', i, j)
+                i=j + 1
+                if quotes % 2 == 0:
+                    cut=pos + i
+                    targets=[t for t in targets if t >= cut]
+                    if cut < end:
+                        cuts.append(cut)
+            quotes+=data.count(b'"', i)
+            pos+=len(data)
+    cuts.append(end)
+    return list(zip(cuts, cuts[1:]))
+
+# a read-only view of bytes [file position, end) so the CSV reader stops at `end`
+class _ByteRange(io.RawIOBase):
+    def __init__(self, f, end: int):
+        self.f=f
+        self.end=end
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n=min(len(b), self.end - self.f.tell())
+        if n <= 0:
+            return 0
+        data=self.f.read(n)
+        b[:len(data)]=data
+        return len(data)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+import hashlib
+import json
+import struct
+from pathlib import Path
+import pandas as pd
+import pyarrow.parquet as pq
+from src.config import DATA_METADATA, DATA_PROCESSED
+
+# columns whose distinct values feed the dashboard dropdowns
+FILTER_DOMAIN_COLUMNS=["year", "region", "gender", "age_bin", "company_size", "remote_work"]
+
+# path -> (stat signature, version) of the partition files read so far, so a
+# partitioned dataset only reads the footers of partitions that changed since the last call
+_FILE_VERSIONS: dict[str, tuple[tuple, str]]={}
+
+# identifies the content of a processed file without reading all of it
+# for Parquet this hashes the footer (schema, row groups, statistics), so a fresh
+# git checkout of the same file keeps its version; other files fall back to mtime/size;
+# a partitioned dataset directory hashes the versions of its Parquet files
+def data_version(path: Path) -> str:
+    path=Path(path)
+    if path.is_dir():
+        parts=dataset_files(path)
+        h=hashlib.sha1()
+        for p in parts:
+            h.update(f"{p.relative_to(path).as_posix()}={_cached_version(p)};".encode())
+        return f"d{len(parts):x}-{h.hexdigest()[:16]}"
+    return _file_version(path)
+
+# the Parquet files a dataset reader sees: like pyarrow.dataset, anything under a name
+# starting with "_" or "." (staged runs, sidecars) is not part of the data
+def dataset_files(path: Path) -> list[Path]:
+    return sorted(p for p in Path(path).rglob("*.parquet")
+                  if not any(n.startswith(("_", ".")) for n in p.relative_to(path).parts))
+
+def _cached_version(path: Path) -> str:
+    key=str(path.resolve())
+    signature=stat_signature(path)
+    hit=_FILE_VERSIONS.get(key)
+    if hit is None or hit[0] != signature:
+        hit=_FILE_VERSIONS[key]=(signature, _file_version(path))
+    return hit[1]
+
+def _file_version(path: Path) -> str:
+    with path.open("rb") as f:
+        f.seek(0, 2)
+        size=f.tell()
+        if size >= 12:
+            f.seek(size - 8)
+            footer_len, magic=struct.unpack("<I4s", f.read(8))
+            if magic == b"PAR1" and footer_len + 8 <= size:
+                f.seek(size - 8 - footer_len)
+                digest=hashlib.sha1(f.read(footer_len)).hexdigest()[:16]
+                return f"{size:x}-{digest}"
+    st=path.stat()
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+# cheap fingerprint of a processed file (or partitioned dataset directory) from stat
+# alone, for callers that check often and only call data_version when it moves
+def stat_signature(path: Path) -> tuple:
+    path=Path(path)
+    if path.is_dir():
+        return tuple((p.relative_to(path).as_posix(), *stat_signature(p)) for p in dataset_files(path))
+    st=path.stat()
+    return (st.st_mtime_ns, st.st_size)
+
+# to list the dropdown values of each filter column
+# ordered categoricals (age_bin, company_size) keep their category order, the rest are sorted;
+# `previous` merges in the domains of earlier chunks when streaming
+def filter_domains(df: pd.DataFrame, previous: dict | None = None) -> dict[str, list]:
+    previous=previous or {}
+    out={}
+    for c in FILTER_DOMAIN_COLUMNS:
+        if c not in df.columns:
+            continue
+        s=df[c]
+        present=set(s.dropna().unique().tolist())
+        if c == "year":
+            present={int(v) for v in present}
+        present|=set(previous.get(c, []))
+        if isinstance(s.dtype, pd.CategoricalDtype) and s.cat.ordered:
+            out[c]=[v for v in s.cat.categories if v in present]
+        else:
+            out[c]=sorted(present)
+    return out
+
+def write_metadata(domains: dict, rows: int, data_path: Path = DATA_PROCESSED,
+                   path: Path = DATA_METADATA) -> None:
+    path=Path(path)
+    state={"data_version": data_version(data_path), "rows": rows, "domains": domains}
+    tmp=path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(path)
+
+# to read the sidecar; None when it is missing or was written for a different data file
+def read_metadata(data_path: Path = DATA_PROCESSED, path: Path = DATA_METADATA) -> dict | None:
+    path=Path(path)
+    if not path.exists():
+        return None
+    try:
+        state=json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return None
+    if state.get("data_version") != data_version(data_path):
+        return None
+    return state
+
+# to rebuild the sidecar for the current processed file without reprocessing
+def main() -> None:
+    columns=[c for c in FILTER_DOMAIN_COLUMNS if c in pq.read_schema(DATA_PROCESSED).names]
+    df=pd.read_parquet(DATA_PROCESSED, columns=columns)
+    write_metadata(filter_domains(df), len(df))
+    print(f"Wrote metadata: {DATA_METADATA}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+import argparse
+import os
+import re
+import shutil
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.config import DATA_BY_YEAR, DATA_BY_YEAR_METADATA, DATA_RAW_DIR
+from src.data.load_raw import iter_raw
+from src.data.metadata import filter_domains, write_metadata
+from src.data.process import (PROCESSED_COLUMNS, SURVEY_COLUMN_MAPS, SURVEY_YES_NO_MAPS, detect_layout,
+                              make_age_bin, process, processed_schema)
+from src.data.watermark import Frontier, fingerprint, read_state, watermark_path, write_state
+
+_YEAR_RE=re.compile(r"(?<!\d)(20\d{2})(?!\d)")
+
+# one raw survey export: its file, the column layout it uses and, when the
+# file name carries one, the survey year used for rows without a Timestamp
+@dataclass(frozen=True)
+class RawSource:
+    path: Path
+    layout: str
+    survey_year: int | None = None
+
+# to find every raw export in data/raw and detect its layout from the header
+def discover_sources(raw_dir: Path = DATA_RAW_DIR) -> list[RawSource]:
+    return [source_for(path) for path in sorted(Path(raw_dir).glob("*.csv"))]
+
+def source_for(path: Path) -> RawSource:
+    path=Path(path)
+    header=pd.read_csv(path, nrows=0).columns
+    try:
+        layout=detect_layout(header)
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from e
+    m=_YEAR_RE.search(path.stem)
+    return RawSource(path, layout, int(m.group(1)) if m else None)
+
+# exports that lack a question still get its column (all missing), so every file
+# in the dataset has the same columns in the same order
+def _conform(part: pd.DataFrame) -> pd.DataFrame:
+    if "age" not in part.columns:
+        part["age"]=pd.Series(float("nan"), index=part.index, dtype="float64")
+        part["age_bin"]=make_age_bin(part["age"])
+    for c in PROCESSED_COLUMNS:
+        if c not in part.columns:
+            part[c]=pd.Series(pd.NA, index=part.index, dtype="str")
+    return part[PROCESSED_COLUMNS]
+
+# to clean one chunk of a raw export into a table with the dataset's schema
+# every file in the dataset shares process()'s declared schema (see processed_schema),
+# so appended runs and exports lacking a question line up with the rest;
+# rows with neither a readable Timestamp nor a year in the file name would land in
+# __HIVE_DEFAULT_PARTITION__, which no reader of the dataset sees, so they are left
+# out and counted (the last value returned)
+def process_source_chunk(chunk: pd.DataFrame, source: RawSource,
+                         schema: pa.Schema) -> tuple[pd.DataFrame, pa.Table, int]:
+    part=_conform(process(chunk, SURVEY_COLUMN_MAPS[source.layout], source.survey_year,
+                          SURVEY_YES_NO_MAPS[source.layout]))
+    placed=part["year"].notna().to_numpy()
+    part=part[placed]
+    return part, pa.Table.from_pandas(part, preserve_index=False).cast(schema), int((~placed).sum())
+
+def write_partitioned(table: pa.Table, root: Path, basename: str) -> None:
+    pq.write_to_dataset(
+        table,
+        root_path=str(root),
+        partition_cols=["year"],
+        basename_template=f"{basename}-{{i}}.parquet",
+    )
+
+# to put a finished build in place of the live dataset
+# a directory can't be renamed over a non-empty one, so the live dataset is moved aside
+# first: readers only miss it between the two renames, and a crash there leaves it
+# whole at <root>.old, where the next ingest finds it
+def _swap_in(build: Path, root: Path) -> None:
+    old=root.with_name(root.name + ".old")
+    if root.exists():
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(root, old)
+    os.replace(build, root)
+    shutil.rmtree(old, ignore_errors=True)
+
+# to rebuild the year-partitioned dataset from all raw exports
+# each export is streamed through process() with its own column map and written under
+# year=<y>/, so the app can read a single year without touching the rest of the history;
+# each export's watermark records how far it was read and how many rows had no year,
+# so src.data.incremental only appends what is added to it afterwards
+# the dataset is built in a hidden sibling directory and swapped in once complete,
+# so a failed run leaves the previous dataset as it was
+def ingest(sources: list[RawSource] | None = None, root: Path = DATA_BY_YEAR,
+           chunksize: int = 100_000, metadata_path: Path = DATA_BY_YEAR_METADATA) -> int:
+    sources=discover_sources() if sources is None else sources
+    root=Path(root)
+    old=root.with_name(root.name + ".old")
+    if old.exists() and not root.exists():
+        os.replace(old, root)
+    for stale in root.parent.glob(f".{root.name}.build-*"):
+        shutil.rmtree(stale, ignore_errors=True)
+    build=root.with_name(f".{root.name}.build-{uuid.uuid4().hex[:8]}")
+    build.mkdir(parents=True)
+    metadata_path=Path(metadata_path)
+    # a sidecar inside the dataset is built and swapped in with it
+    inside=metadata_path.is_relative_to(root)
+    schema=processed_schema()
+    rows=0
+    domains={}
+    for source in sources:
+        end=source.path.stat().st_size
+        frontier=Frontier()
+        added=0
+        dropped=0
+        for i, chunk in enumerate(iter_raw(chunksize, source.path, 0, end)):
+            part, table, unplaced=process_source_chunk(chunk, source, schema)
+            if len(part):
+                write_partitioned(table, build, f"{source.path.stem}-{i}")
+            frontier.update(chunk)
+            added+=len(part)
+            dropped+=unplaced
+            domains=filter_domains(part, domains)
+        write_state(watermark_path(build, source.path),
+                    {"offset": end, "fingerprint": fingerprint(source.path, end), **frontier.state(),
+                     "rows": added, "dropped": dropped, "pending": None})
+        rows+=added
+    if inside:
+        write_metadata(domains, rows, build, build / metadata_path.relative_to(root))
+    _swap_in(build, root)
+    if not inside:
+        write_metadata(domains, rows, root, metadata_path)
+    return rows
+
+def main() -> None:
+    parser=argparse.ArgumentParser(description="Build the year-partitioned dataset from every export in data/raw.")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args=parser.parse_args()
+    sources=discover_sources()
+    for s in sources:
+        print(f"{s.path.name}: layout={s.layout} survey_year={s.survey_year}")
+    rows=ingest(sources, chunksize=args.chunksize)
+    print(f"Wrote {rows} rows to {DATA_BY_YEAR}")
+    for s in sources:
+        dropped=read_state(watermark_path(DATA_BY_YEAR, s.path))["dropped"]
+        if dropped:
+            print(f"{s.path.name}: left out {dropped} rows with no Timestamp and no year in the file name")
+
+
+if __name__ == "__main__":
+    main()
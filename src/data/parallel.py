@@ -0,0 +1,26 @@
+from __future__ import annotations
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+def default_workers() -> int:
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+# to run fn(path, start, end, part, *args) over byte ranges of a file (see load_raw.split_ranges)
+# in a process pool; each worker reads its own range from disk and writes its own part files
+# under `out_dir` (named after `part`), so only offsets, paths and fn's small return values
+# cross between processes; returns (part, result) per range, in range order
+def map_ranges(fn: Callable, path: Path, ranges: list[tuple[int, int]], out_dir: Path, *args,
+               workers: int | None = None) -> list[tuple[Path, object]]:
+    workers=workers or default_workers()
+    parts=[Path(out_dir) / f"part-{i:05d}" for i in range(len(ranges))]
+    starts=[a for a, _ in ranges]
+    ends=[b for _, b in ranges]
+    if workers <= 1 or len(ranges) <= 1:
+        results=[fn(path, a, b, part, *args) for a, b, part in zip(starts, ends, parts)]
+    else:
+        n=len(ranges)
+        with ProcessPoolExecutor(max_workers=min(workers, n)) as pool:
+            results=list(pool.map(fn, [path] * n, starts, ends, parts, *[[a] * n for a in args]))
+    return list(zip(parts, results))
@@ -0,0 +1,202 @@
+from __future__ import annotations
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable
+import pandas as pd
+from src.columnar import CODEBOOK, CURRENT, _column_spec, _encode, _publish, build_store
+from src.config import APP_COLUMNS, DATA_METADATA, DATA_PROCESSED, DATA_RAW, DATA_STORE, PIPELINE_CACHE
+from src.data import process as rules
+from src.data.load_raw import NA_VALUES, RAW_SCHEMA, check_header, load_raw, read_header
+from src.data.metadata import data_version, filter_domains, write_metadata
+
+# the one cleaning pipeline: load -> normalize -> derive -> write -> index / store
+# every stage is cached under a key made of its code/table fingerprint, its input
+# files' content and the keys of the stages it reads, so a rerun only redoes
+# the stages downstream of whatever changed
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: Callable
+    inputs: tuple[str, ...] = ()
+    # functions and lookup tables the stage's result depends on
+    code: tuple = ()
+    # files read from outside the pipeline (content-hashed)
+    files: tuple[Path, ...] = ()
+    # files written outside the cache; a hit also needs them unchanged on disk
+    outputs: tuple[Path, ...] = ()
+
+# to turn tables into a repr that does not depend on set/dict ordering or hash seeds
+def _stable(obj):
+    if isinstance(obj, (dict, MappingProxyType)):
+        return "{" + ",".join(f"{_stable(k)}:{_stable(v)}" for k, v in sorted(obj.items(), key=lambda kv: repr(kv[0]))) + "}"
+    if isinstance(obj, (set, frozenset)):
+        return "{" + ",".join(sorted(_stable(v) for v in obj)) + "}"
+    if isinstance(obj, (list, tuple)):
+        return "[" + ",".join(_stable(v) for v in obj) + "]"
+    if isinstance(obj, re.Pattern):
+        return f"re({obj.pattern!r},{obj.flags})"
+    if callable(obj):
+        return inspect.getsource(obj)
+    return repr(obj)
+
+def code_version(parts) -> str:
+    return hashlib.sha1(_stable(list(parts)).encode("utf-8")).hexdigest()
+
+def file_digest(path: Path) -> str:
+    h=hashlib.sha1()
+    with Path(path).open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def stage_keys(stages: list[Stage]) -> dict[str, str]:
+    keys={}
+    for st in stages:
+        h=hashlib.sha1(st.name.encode())
+        h.update(code_version(st.code).encode())
+        for p in st.files:
+            h.update(file_digest(p).encode())
+        for p in st.outputs:
+            # not resolve(): a symlinked output (the store's `current`) keeps its key across rebuilds
+            h.update(os.path.abspath(p).encode())
+        for name in st.inputs:
+            h.update(keys[name].encode())
+        keys[st.name]=h.hexdigest()[:20]
+    return keys
+
+def build_stages(raw_path: Path = DATA_RAW, parquet_path: Path = DATA_PROCESSED,
+                 metadata_path: Path = DATA_METADATA, store_path: Path = DATA_STORE) -> list[Stage]:
+    raw_path=Path(raw_path)
+    parquet_path=Path(parquet_path)
+    csv_path=parquet_path.with_suffix(".csv")
+    metadata_path=Path(metadata_path)
+    store_path=Path(store_path)
+
+    def write(df: pd.DataFrame) -> dict:
+        parquet_path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(parquet_path, index=False)
+        df.to_csv(csv_path, index=False)
+        return {"rows": len(df), "cols": df.shape[1]}
+
+    def index(df: pd.DataFrame, written: dict) -> dict:
+        write_metadata(filter_domains(df), written["rows"], parquet_path, metadata_path)
+        return {"rows": written["rows"]}
+
+    # the memory-mapped column store the dashboard workers share (only the columns it reads)
+    def store(written: dict) -> dict:
+        return {"rows": build_store(parquet_path, store_path, data_version(parquet_path), APP_COLUMNS)}
+
+    return [
+        Stage("load", partial(load_raw, raw_path, *rules.raw_read_plan()), files=(raw_path,), code=(
+            load_raw, check_header, read_header, RAW_SCHEMA, NA_VALUES, rules.raw_read_plan, rules.COLUMN_MAP,
+            rules.PROCESSED_COLUMNS, rules.YES_NO_COLUMNS,
+        )),
+        Stage("normalize", rules.normalize, ("load",), code=(
+            rules.normalize, rules.COLUMN_MAP, rules.YES_NO_COLUMNS, rules.YES_NO_MAP,
+            rules.COMPANY_SIZE_ORDER, rules._norm_str, rules.normalize_yes_no_unknown,
+            rules.normalize_gender, rules._MALE_RE, rules._FEMALE_RE, rules._NON_BINARY_KEYS,
+            rules._MALE_TYPOS, rules._map_distinct,
+        )),
+        Stage("derive", rules.derive, ("normalize",), code=(
+            rules.derive, rules.PROCESSED_COLUMNS, rules.parse_year_from_timestamp,
+            rules.clean_age, rules.make_age_bin, rules.COUNTRY_TO_REGION,
+            rules.map_country_to_region, rules._norm_str, rules._map_distinct,
+        )),
+        Stage("write", write, ("derive",), code=(write,), outputs=(parquet_path, csv_path)),
+        Stage("index", index, ("derive", "write"), code=(index, filter_domains), outputs=(metadata_path,)),
+        Stage("store", store, ("write",), code=(store, build_store, _column_spec, _encode, _publish, APP_COLUMNS),
+              outputs=(store_path / CURRENT / CODEBOOK,)),
+    ]
+
+class StageCache:
+    """Stage results on disk: frames as Parquet, small results as JSON."""
+
+    def __init__(self, root: Path = PIPELINE_CACHE):
+        self.root=Path(root)
+
+    def _paths(self, name: str, key: str) -> tuple[Path, Path]:
+        return self.root / f"{name}-{key}.parquet", self.root / f"{name}-{key}.json"
+
+    def has(self, stage: Stage, key: str) -> bool:
+        frame_path, json_path=self._paths(stage.name, key)
+        if frame_path.exists():
+            return True
+        if not json_path.exists():
+            return False
+        # outputs written outside the cache must still be the ones this run produced
+        recorded=json.loads(json_path.read_text(encoding="utf-8")).get("outputs", {})
+        for p in stage.outputs:
+            if not Path(p).exists() or recorded.get(str(p)) != data_version(p):
+                return False
+        return True
+
+    def load(self, stage: Stage, key: str):
+        frame_path, json_path=self._paths(stage.name, key)
+        if frame_path.exists():
+            return pd.read_parquet(frame_path)
+        return json.loads(json_path.read_text(encoding="utf-8"))["value"]
+
+    def save(self, stage: Stage, key: str, value) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        frame_path, json_path=self._paths(stage.name, key)
+        if isinstance(value, pd.DataFrame):
+            tmp=frame_path.with_suffix(".tmp")
+            value.to_parquet(tmp, index=False)
+            tmp.replace(frame_path)
+        else:
+            state={"value": value, "outputs": {str(p): data_version(p) for p in stage.outputs}}
+            json_path.write_text(json.dumps(state), encoding="utf-8")
+        # one entry per stage: results for older keys can never be hit again cheaply
+        for old in self.root.glob(f"{stage.name}-*"):
+            if old not in (frame_path, json_path):
+                old.unlink()
+
+# to bring every stage up to date; returns {stage: "cached" | seconds it took}
+def run_pipeline(stages: list[Stage] | None = None, cache: StageCache | None = None,
+                 force: bool = False) -> dict:
+    stages=build_stages() if stages is None else stages
+    cache=StageCache() if cache is None else cache
+    by_name={st.name: st for st in stages}
+    keys=stage_keys(stages)
+    values={}
+    report={}
+
+    def value(name):
+        # a stage's value is only read back from the cache when a rerun downstream needs it
+        if name not in values:
+            st=by_name[name]
+            values[name]=cache.load(st, keys[name])
+        return values[name]
+
+    for st in stages:
+        if not force and cache.has(st, keys[st.name]):
+            report[st.name]="cached"
+            continue
+        t0=time.perf_counter()
+        values[st.name]=st.run(*[value(n) for n in st.inputs])
+        cache.save(st, keys[st.name], values[st.name])
+        report[st.name]=time.perf_counter() - t0
+    return report
+
+def main(force: bool = False) -> None:
+    report=run_pipeline(force=force)
+    for name, r in report.items():
+        print(f"{name:>10}: {r if r == 'cached' else f'{r:.3f}s'}")
+    print(f"Processed data: {DATA_PROCESSED}")
+
+
+if __name__ == "__main__":
+    parser=argparse.ArgumentParser(description="Run the cleaning pipeline, reusing cached stages.")
+    parser.add_argument("--force", action="store_true", help="rerun every stage")
+    args=parser.parse_args()
+    main(args.force)
@@ -1,12 +1,22 @@
 from __future__ import annotations
+import argparse
 import re
+import shutil
+import tempfile
 from pathlib import Path
+from types import MappingProxyType
+import numpy as np
 import pandas as pd
-from src.config import DATA_PROCESSED
-from src.data.load_raw import load_raw
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.columnar import build_store
+from src.config import APP_COLUMNS, DATA_PROCESSED, DATA_RAW, DATA_STORE
+from src.data.load_raw import iter_raw, split_ranges
+from src.data.metadata import FILTER_DOMAIN_COLUMNS, data_version, filter_domains, write_metadata
+from src.data.parallel import default_workers, map_ranges
 
 # Changing all to Yes/No/Unknown
-YES_NO_MAP={
+YES_NO_MAP=MappingProxyType({
     "yes": "Yes",
     "y": "Yes",
     "no": "No",
@@ -16,8 +26,8 @@ YES_NO_MAP={
     "dk": "Don't know",
     "unknown": "Unknown",
     "not sure": "Don't know",
-    "notsure": "Don't know", 
-}
+    "notsure": "Don't know",
+})
 # Creating company size categories
 COMPANY_SIZE_ORDER=["1-5", "6-25", "26-100", "100-500", "500-1000", "More than 1000"]
 
@@ -27,12 +37,18 @@ def _norm_str(x) -> str | None:
     s=str(x).strip()
     return s if s != "" else None
 
-def normalize_yes_no_unknown(x) -> str:
+def normalize_yes_no_unknown(x, mapping=YES_NO_MAP) -> str:
     s= _norm_str(x)
     if s is None:
         return "Unknown"
     key=s.lower()
-    return YES_NO_MAP.get(key, s)
+    return mapping.get(key, s)
+
+# precompiled gender patterns and keyword tables
+_MALE_RE=re.compile(r"\b(male|man|m)\b")
+_FEMALE_RE=re.compile(r"\b(female|woman|f)\b")
+_NON_BINARY_KEYS=("non", "nb", "enby", "genderqueer", "trans", "queer", "fluid", "agender")
+_MALE_TYPOS=frozenset({"make", "mail", "mal"})
 
 # to normalize gender responses
 def normalize_gender(x) -> str:
@@ -41,21 +57,29 @@ def normalize_gender(x) -> str:
         return "Prefer not to say / Unknown"
     t= s.strip().lower()
     # male detection
-    if re.search(r"\b(male|man|m)\b", t) and "female" not in t:
+    if _MALE_RE.search(t) and "female" not in t:
         return "Male"
     # female detection
-    if re.search(r"\b(female|woman|f)\b", t):
+    if _FEMALE_RE.search(t):
         return "Female"
 
     # non-binary
-    if any(k in t for k in ["non", "nb", "enby", "genderqueer", "trans", "queer", "fluid", "agender"]):
+    if any(k in t for k in _NON_BINARY_KEYS):
         return "Non-binary / Other"
 
     # other typos
-    if t in ["make", "mail", "mal"]:
+    if t in _MALE_TYPOS:
         return "Male"
 
     return "Non-binary / Other"
+
+# to apply a scalar normalizer once per distinct value and broadcast back by code
+def _map_distinct(series: pd.Series, fn) -> pd.Series:
+    codes, uniques=pd.factorize(series, use_na_sentinel=True)
+    # the extra trailing slot is what code -1 (missing) picks up
+    lookup=np.array([fn(u) for u in uniques] + [fn(None)], dtype=object)
+    return pd.Series(lookup[codes], index=series.index, name=series.name)
+
 # year from timestamp column
 def parse_year_from_timestamp(series: pd.Series) -> pd.Series:
     ts=pd.to_datetime(series, errors="coerce")
@@ -63,7 +87,7 @@ def parse_year_from_timestamp(series: pd.Series) -> pd.Series:
 
 # to convert to numeric and remove unrealistic values
 def clean_age(series: pd.Series) -> pd.Series:
-    age=pd.to_numeric(series, errors="coerce")
+    age=pd.to_numeric(series, errors="coerce").astype("float64")
     age=age.where((age >= 13) & (age <= 80))
     return age  
 
@@ -73,78 +97,141 @@ def make_age_bin(age: pd.Series) -> pd.Series:
     labels=["<20", "20–29", "30–39", "40–49", "50+"]
     return pd.cut(age, bins=bins, labels=labels, right=False, include_lowest=True)
 
+# country lookup tables, built once at import
+_REGION_COUNTRIES={
+    "North America": frozenset({"united states", "canada", "mexico"}),
+    "Europe": frozenset({"united kingdom", "ireland", "germany", "france", "netherlands", "sweden",
+                         "norway", "denmark", "finland", "belgium", "switzerland", "austria",
+                         "spain", "italy", "portugal", "poland", "czech republic", "romania",
+                         "hungary", "greece", "russia", "ukraine"}),
+    "Oceania": frozenset({"australia", "new zealand"}),
+    "Asia": frozenset({"india", "china", "japan", "singapore", "philippines",
+                       "pakistan", "israel", "taiwan", "south korea"}),
+    "South America": frozenset({"brazil", "argentina", "chile", "colombia", "peru"}),
+    "Africa": frozenset({"south africa", "nigeria", "kenya", "egypt", "morocco"}),
+}
+COUNTRY_TO_REGION=MappingProxyType(
+    {c: region for region, countries in _REGION_COUNTRIES.items() for c in countries}
+)
+
 def map_country_to_region(country: str | None) -> str:
     if country is None:
         return "Unknown"
-
     c=country.strip().lower()
-    north_america = {"united states", "canada", "mexico"}
-    europe={"united kingdom", "ireland", "germany", "france", "netherlands", "sweden",
-              "norway", "denmark", "finland", "belgium", "switzerland", "austria",
-              "spain", "italy", "portugal", "poland", "czech republic", "romania",
-              "hungary", "greece", "russia", "ukraine"}
-    oceania={"australia", "new zealand"}
-    asia={"india", "china", "japan", "singapore", "philippines",
-            "pakistan", "israel", "taiwan", "south korea"}
-    south_america={"brazil", "argentina", "chile", "colombia", "peru"}
-    africa={"south africa", "nigeria", "kenya", "egypt", "morocco"}
-    if c in north_america:
-        return "North America"
-    if c in europe:
-        return "Europe"
-    if c in oceania:
-        return "Oceania"
-    if c in asia:
-        return "Asia"
-    if c in south_america:
-        return "South America"
-    if c in africa:
-        return "Africa"
-
-    return "Other / Unknown"
-def process(df: pd.DataFrame) -> pd.DataFrame:
-    col_map={
-        "Timestamp": "timestamp",
-        "Age": "age",
-        "Gender": "gender_raw",
-        "Country": "country",
-        "state": "state",
-        "self_employed": "self_employed",
-        "family_history": "family_history",
-        "treatment": "treatment",
-        "work_interfere": "work_interfere",
-        "no_employees": "company_size",
-        "remote_work": "remote_work",
-        "tech_company": "tech_company",
-        "benefits": "benefits",
-        "care_options": "care_options",
-        "wellness_program": "wellness_program",
-        "seek_help": "seek_help",
-        "anonymity": "anonymity",
-        "leave": "leave",
-        "mental_health_consequence": "mental_health_consequence",
-        "phys_health_consequence": "phys_health_consequence",
-        "coworkers": "coworkers",
-        "supervisor": "supervisor",
-        "mental_health_interview": "mental_health_interview",
-        "phys_health_interview": "phys_health_interview",
-        "mental_vs_physical": "mental_vs_physical",
-        "obs_consequence": "obs_consequence",
-        "comments": "comments",
-    }
+    return COUNTRY_TO_REGION.get(c, "Other / Unknown")
+
+# raw column names of each survey layout -> processed names
+# the 2014 export uses short keys; later OSMI exports use the full question text
+COLUMN_MAP=MappingProxyType({
+    "Timestamp": "timestamp",
+    "Age": "age",
+    "Gender": "gender_raw",
+    "Country": "country",
+    "state": "state",
+    "self_employed": "self_employed",
+    "family_history": "family_history",
+    "treatment": "treatment",
+    "work_interfere": "work_interfere",
+    "no_employees": "company_size",
+    "remote_work": "remote_work",
+    "tech_company": "tech_company",
+    "benefits": "benefits",
+    "care_options": "care_options",
+    "wellness_program": "wellness_program",
+    "seek_help": "seek_help",
+    "anonymity": "anonymity",
+    "leave": "leave",
+    "mental_health_consequence": "mental_health_consequence",
+    "phys_health_consequence": "phys_health_consequence",
+    "coworkers": "coworkers",
+    "supervisor": "supervisor",
+    "mental_health_interview": "mental_health_interview",
+    "phys_health_interview": "phys_health_interview",
+    "mental_vs_physical": "mental_vs_physical",
+    "obs_consequence": "obs_consequence",
+    "comments": "comments",
+})
+SURVEY_COLUMN_MAPS=MappingProxyType({
+    "osmi-2014": COLUMN_MAP,
+    "osmi-2016": MappingProxyType({
+        "What is your age?": "age",
+        "What is your gender?": "gender_raw",
+        "What country do you live in?": "country",
+        "What US state or territory do you live in?": "state",
+        "Are you self-employed?": "self_employed",
+        "Do you have a family history of mental illness?": "family_history",
+        "Have you ever sought treatment for a mental health issue from a mental health professional?": "treatment",
+        "If you have a mental health issue, do you feel that it interferes with your work when being treated effectively?": "work_interfere",
+        "How many employees does your company or organization have?": "company_size",
+        "Do you work remotely?": "remote_work",
+        "Is your employer primarily a tech company/organization?": "tech_company",
+        "Does your employer provide mental health benefits as part of healthcare coverage?": "benefits",
+        "Do you know the options for mental health care available under your employer-provided coverage?": "care_options",
+        "Has your employer ever formally discussed mental health (for example, as part of a wellness campaign or other official communication)?": "wellness_program",
+        "Does your employer offer resources to learn more about mental health concerns and options for seeking help?": "seek_help",
+        "Is your anonymity protected if you choose to take advantage of mental health or substance abuse treatment resources provided by your employer?": "anonymity",
+    }),
+})
+
+# yes/no answer spellings of each survey layout
+SURVEY_YES_NO_MAPS=MappingProxyType({
+    "osmi-2014": YES_NO_MAP,
+    # the 2016 export codes the treatment question as 1/0
+    "osmi-2016": MappingProxyType({**YES_NO_MAP, "1": "Yes", "0": "No"}),
+})
+
+# to chosse need columns for dashboard
+PROCESSED_COLUMNS=[
+    "year", "age", "age_bin", "gender",
+    "country", "region", "state", "company_size",
+    "benefits", "treatment", "work_interfere",
+    "remote_work", "family_history", "self_employed",
+    "tech_company", "care_options", "wellness_program",
+    "seek_help", "anonymity",
+]
+
+# to pick the layout whose raw column names best match a file header
+def detect_layout(columns) -> str:
+    columns=set(columns)
+    overlap={k: len(columns & m.keys()) for k, m in SURVEY_COLUMN_MAPS.items()}
+    best=max(overlap, key=overlap.get)
+    if overlap[best] == 0:
+        raise ValueError(f"No known survey layout matches the header {sorted(columns)}")
+    return best
+
+# yes/no columns
+YES_NO_COLUMNS=[
+    "self_employed", "family_history", "treatment", "remote_work",
+    "tech_company", "benefits", "care_options", "wellness_program",
+    "seek_help", "anonymity", "mental_health_consequence",
+    "phys_health_consequence", "coworkers", "supervisor",
+    "mental_health_interview", "phys_health_interview",
+    "mental_vs_physical", "obs_consequence",
+]
+
+# raw columns process() needs for its output, and those of them that are only
+# normalized (never passed through), which can be read dictionary-encoded
+def raw_read_plan(col_map=None) -> tuple[list[str], list[str]]:
+    col_map=COLUMN_MAP if col_map is None else col_map
+    needed=set(PROCESSED_COLUMNS) | {"timestamp", "gender_raw"}
+    # country is free text with hundreds of spellings and is cast to string by normalize anyway
+    normalized=set(YES_NO_COLUMNS) | {"gender_raw", "company_size"}
+    columns=[k for k, v in col_map.items() if v in needed]
+    return columns, [k for k in columns if col_map[k] in normalized]
+
+# value-level cleaning: rename to processed names and normalize the free-text answers
+# yes_no_map is the layout's entry of SURVEY_YES_NO_MAPS (default: the 2014 spellings)
+def normalize(df: pd.DataFrame, col_map=None, yes_no_map=None) -> pd.DataFrame:
+    col_map=COLUMN_MAP if col_map is None else col_map
+    yes_no_map=YES_NO_MAP if yes_no_map is None else yes_no_map
     df=df.rename(columns={k: v for k, v in col_map.items() if k in df.columns}).copy()
-    df["year"]=parse_year_from_timestamp(df["timestamp"]) if "timestamp" in df.columns else pd.NA
-    if "age" in df.columns:
-        df["age"]=clean_age(df["age"])
-        df["age_bin"]=make_age_bin(df["age"])
     if "gender_raw" in df.columns:
-        df["gender"] = df["gender_raw"].apply(normalize_gender)
+        df["gender"] = _map_distinct(df["gender_raw"], normalize_gender)
     else:
         df["gender"] = "Prefer not to say / Unknown"
 
     if "country" in df.columns:
         df["country"] = df["country"].astype("string")
-        df["region"] = df["country"].apply(lambda x: map_country_to_region(_norm_str(x)))
 
     # company size categorical ordering
     if "company_size" in df.columns:
@@ -163,44 +250,175 @@ def process(df: pd.DataFrame) -> pd.DataFrame:
             categories=COMPANY_SIZE_ORDER + ["Unknown"],
             ordered=True,
         )
-    # yes/no columns
-    yn_cols=[
-        "self_employed", "family_history", "treatment", "remote_work",
-        "tech_company", "benefits", "care_options", "wellness_program",
-        "seek_help", "anonymity", "mental_health_consequence",
-        "phys_health_consequence", "coworkers", "supervisor",
-        "mental_health_interview", "phys_health_interview",
-        "mental_vs_physical", "obs_consequence",
-    ]
-    for c in yn_cols:
+    for c in YES_NO_COLUMNS:
         if c in df.columns:
-            df[c]=df[c].apply(normalize_yes_no_unknown)
+            df[c]=_map_distinct(df[c], lambda x: normalize_yes_no_unknown(x, yes_no_map))
     if "comments" in df.columns:
         df=df.drop(columns=["comments"])
+    return df
+
+# derived columns (year, age bins, region) and the dashboard column selection
+# survey_year fills the year of rows without a readable Timestamp
+# (later exports have no Timestamp column at all)
+def derive(df: pd.DataFrame, survey_year: int | None = None) -> pd.DataFrame:
+    df=df.copy()
+    df["year"]=parse_year_from_timestamp(df["timestamp"]) if "timestamp" in df.columns else pd.NA
+    if survey_year is not None:
+        df["year"]=pd.to_numeric(df["year"], errors="coerce").fillna(survey_year).astype("int32")
+    if "age" in df.columns:
+        df["age"]=clean_age(df["age"])
+        df["age_bin"]=make_age_bin(df["age"])
+    if "country" in df.columns:
+        df["region"] = _map_distinct(df["country"], lambda x: map_country_to_region(_norm_str(x)))
     # to chosse need columns for dashboard
-    keep=[
-        "year", "age", "age_bin", "gender",
-        "country", "region", "state", "company_size",
-        "benefits", "treatment", "work_interfere",
-        "remote_work", "family_history", "self_employed",
-        "tech_company", "care_options", "wellness_program",
-        "seek_help", "anonymity",
-    ]
-    keep=[c for c in keep if c in df.columns]
+    keep=[c for c in PROCESSED_COLUMNS if c in df.columns]
     out=df[keep].copy()
 
     return out
-def main() -> None:
-    df_raw=load_raw()
-    df_clean=process(df_raw)
-    DATA_PROCESSED.parent.mkdir(parents=True, exist_ok=True)
-    df_clean.to_parquet(DATA_PROCESSED, index=False)
+
+# col_map and yes_no_map default to the 2014 layout
+def process(df: pd.DataFrame, col_map=None, survey_year: int | None = None, yes_no_map=None) -> pd.DataFrame:
+    return derive(normalize(df, col_map, yes_no_map), survey_year)
+
+# integer columns with missing values stay integers when a cast chunk goes back to pandas
+_NULLABLE_INTS={pa.int32(): pd.Int32Dtype(), pa.int64(): pd.Int64Dtype()}
+
+# the Parquet schema of process()'s output, read off a run over an empty frame with every
+# raw column: the dtypes process() declares (year, age, the ordered categoricals) come
+# through as they are, and answers it builds value by value come out untyped and are text
+def processed_schema(col_map=None) -> pa.Schema:
+    col_map=COLUMN_MAP if col_map is None else col_map
+    empty=process(pd.DataFrame({c: pd.Series(dtype=str) for c in col_map}), col_map)
+    schema=pa.Table.from_pandas(empty, preserve_index=False).schema
+    fields=[f.with_type(pa.large_string()) if pa.types.is_null(f.type) else f for f in schema]
+    return pa.schema(fields, metadata=schema.metadata)
+
+# streaming version of main(): each raw chunk goes through process() and is appended
+# as its own Parquet row group, so peak memory is one chunk rather than the whole export
+def process_streaming(chunksize: int, parquet_path: Path = DATA_PROCESSED, raw_path: Path = DATA_RAW) -> int:
+    parquet_path=Path(parquet_path)
+    parquet_path.parent.mkdir(parents=True, exist_ok=True)
+    csv_path=parquet_path.with_suffix(".csv")
+    # every chunk is cast onto the declared schema; one taken from the first chunk would
+    # type a column that chunk has no values in as null, and fail on the next chunk
+    schema=processed_schema()
+    writer=None
+    rows=0
+    domains={}
+    try:
+        for chunk in iter_raw(chunksize, raw_path):
+            part=process(chunk)
+            if len(part) == 0:
+                continue
+            table=pa.Table.from_pandas(part, preserve_index=False).cast(schema)
+            if writer is None:
+                writer=pq.ParquetWriter(parquet_path, schema)
+            writer.write_table(table)
+            # the CSV follows the same schema, so e.g. year never turns into 2014.0 mid-file
+            part=table.to_pandas(types_mapper=_NULLABLE_INTS.get)
+            part.to_csv(csv_path, index=False, header=rows == 0, mode="w" if rows == 0 else "a")
+            rows+=len(part)
+            domains=filter_domains(part, domains)
+    finally:
+        if writer is not None:
+            writer.close()
+    if rows == 0:
+        raise ValueError(f"No data rows in {raw_path}; nothing was written")
+    write_metadata(domains, rows, parquet_path, parquet_path.with_suffix(".meta.json"))
+    return rows
+
+# rows per row group of the merged Parquet file, whatever the ranges were
+ROW_GROUP_ROWS=1 << 20
+
+# one byte range of the raw export for process_parallel, cleaned chunk by chunk as in
+# process_streaming into `part`.parquet and a headerless `part`.csv; returns its row count
+def _clean_range(raw_path: Path, start: int, end: int, part: Path, chunksize: int) -> int:
+    schema=processed_schema()
+    writer=None
+    rows=0
+    try:
+        for chunk in iter_raw(chunksize, raw_path, start, end):
+            table=pa.Table.from_pandas(process(chunk), preserve_index=False).cast(schema)
+            if table.num_rows == 0:
+                continue
+            if writer is None:
+                writer=pq.ParquetWriter(part.with_suffix(".parquet"), schema)
+            writer.write_table(table)
+            table.to_pandas(types_mapper=_NULLABLE_INTS.get).to_csv(
+                part.with_suffix(".csv"), index=False, header=False, mode="a")
+            rows+=table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+# to copy the parts into one Parquet file cut into ROW_GROUP_ROWS row groups, so the file
+# is the same bytes however many ranges the rows came from
+def _merge_parquet(parts: list[Path], path: Path, schema: pa.Schema) -> None:
+    with pq.ParquetWriter(path, schema) as writer:
+        pending=schema.empty_table()
+        for part in parts:
+            for batch in pq.ParquetFile(part).iter_batches(ROW_GROUP_ROWS):
+                # Parquet hands dictionary values back as large_string; cast them to the schema's
+                pending=pa.concat_tables([pending, pa.Table.from_batches([batch]).cast(schema)])
+                while pending.num_rows >= ROW_GROUP_ROWS:
+                    writer.write_table(pending.slice(0, ROW_GROUP_ROWS).combine_chunks())
+                    pending=pending.slice(ROW_GROUP_ROWS)
+        if pending.num_rows:
+            writer.write_table(pending.combine_chunks())
+
+# parallel version of process_streaming(): the raw CSV is cut into byte ranges of whole
+# records and each worker process reads, cleans and writes its own ranges as part files;
+# the parent only copies the parts, in order, into the Parquet and CSV files
+def process_parallel(workers: int = 0, parquet_path: Path = DATA_PROCESSED, raw_path: Path = DATA_RAW,
+                     chunksize: int = 100_000, parts_per_worker: int = 2) -> int:
+    workers=workers or default_workers()
+    parquet_path=Path(parquet_path)
+    parquet_path.parent.mkdir(parents=True, exist_ok=True)
+    csv_path=parquet_path.with_suffix(".csv")
+    schema=processed_schema()
+    ranges=split_ranges(raw_path, workers * parts_per_worker)
+    with tempfile.TemporaryDirectory(prefix=f".{parquet_path.stem}.parts-", dir=parquet_path.parent) as tmp:
+        done=map_ranges(_clean_range, raw_path, ranges, tmp, chunksize, workers=workers)
+        parts=[part for part, n in done if n]
+        rows=sum(n for _, n in done)
+        if rows == 0:
+            raise ValueError(f"No data rows in {raw_path}; nothing was written")
+        _merge_parquet([p.with_suffix(".parquet") for p in parts], parquet_path, schema)
+        with csv_path.open("wb") as out:
+            out.write(pd.DataFrame(columns=schema.names).to_csv(index=False).encode("utf-8"))
+            for part in parts:
+                with part.with_suffix(".csv").open("rb") as f:
+                    shutil.copyfileobj(f, out)
+    columns=[c for c in FILTER_DOMAIN_COLUMNS if c in schema.names]
+    domains=filter_domains(pd.read_parquet(parquet_path, columns=columns))
+    write_metadata(domains, rows, parquet_path, parquet_path.with_suffix(".meta.json"))
+    return rows
+
+def main(chunksize: int | None = None, workers: int = 1) -> None:
     csv_path=Path(str(DATA_PROCESSED)).with_suffix(".csv")
-    df_clean.to_csv(csv_path, index=False)
+    if chunksize or workers != 1:
+        if workers == 1:
+            rows=process_streaming(chunksize)
+        else:
+            rows=process_parallel(workers, chunksize=chunksize or 100_000)
+        # the store is built batch by batch as well, so memory stays at one chunk
+        build_store(DATA_PROCESSED, DATA_STORE, data_version(DATA_PROCESSED), APP_COLUMNS)
+        print(f"Wrote processed data: {DATA_PROCESSED} (rows={rows}, chunksize={chunksize})")
+        print(f"Wrote processed data: {csv_path}")
+        return
 
-    print(f"Wrote processed data: {DATA_PROCESSED} (rows={len(df_clean)}, cols={df_clean.shape[1]})")
+    # the batch path runs through the staged pipeline, which skips stages whose
+    # inputs and rules have not changed since the last run
+    from src.data.pipeline import main as run_pipeline
+    run_pipeline()
     print(f"Wrote processed data: {csv_path}")
 
-
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser=argparse.ArgumentParser(description="Clean the raw survey into data/processed.")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="stream the raw CSV in chunks of this many rows")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="clean byte ranges of the raw CSV in this many processes (0 = one per core)")
+    args=parser.parse_args()
+    main(args.chunksize, args.workers)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+from typing import Iterable
+import numpy as np
+import pandas as pd
+
+MISSING="<missing>"
+_INT_RE=r"[+-]?\d+"
+# what read_csv calls a text column: "object" on pandas 2, "str" on pandas 3
+TEXT_DTYPE=str(pd.Series(["a"]).dtype)
+_BOOL_VALUES=frozenset({"True", "False", "TRUE", "FALSE", "true", "false"})
+
+# 64-bit hashes of text values; stable across chunks and runs
+def _hash(values: pd.Series) -> np.ndarray:
+    return pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+
+# to count distinct values in fixed memory (2**p one-byte registers, ~1.04/sqrt(2**p) error)
+class HyperLogLog:
+    def __init__(self, p: int = 14):
+        self.p=p
+        self.m=1 << p
+        self.registers=np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, h: np.ndarray) -> None:
+        if len(h) == 0:
+            return
+        idx=(h >> np.uint64(64 - self.p)).astype(np.intp)
+        rest=h << np.uint64(self.p)
+        # rank = leading zeros of the remaining bits + 1, from the bit length of each 32-bit half
+        hi=(rest >> np.uint64(32)).astype(np.float64)
+        lo=(rest & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        bits=np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+        rank=np.minimum(64 - bits, 64 - self.p) + 1
+        np.maximum.at(self.registers, idx, rank.astype(np.uint8))
+
+    def estimate(self) -> int:
+        m=self.m
+        alpha=0.7213 / (1 + 1.079 / m)
+        e=alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros=int(np.count_nonzero(self.registers == 0))
+        # small cardinalities: linear counting is exact enough and unbiased
+        if e <= 2.5 * m and zeros:
+            e=m * np.log(m / zeros)
+        return int(round(e))
+
+# to estimate the count of any value in fixed memory (never an underestimate)
+class CountMinSketch:
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width=width
+        self.depth=depth
+        self.table=np.zeros((depth, width), dtype=np.int64)
+
+    def _rows(self, h: np.ndarray):
+        # double hashing: row i uses h1 + i*h2
+        h1=h & np.uint64(0xFFFFFFFF)
+        h2=(h >> np.uint64(32)) | np.uint64(1)
+        for i in range(self.depth):
+            yield i, ((h1 + np.uint64(i) * h2) % np.uint64(self.width)).astype(np.intp)
+
+    def add_hashes(self, h: np.ndarray, counts: np.ndarray) -> None:
+        for i, idx in self._rows(h):
+            np.add.at(self.table[i], idx, counts)
+
+    def estimate_hashes(self, h: np.ndarray) -> np.ndarray:
+        return np.min([self.table[i, idx] for i, idx in self._rows(h)], axis=0)
+
+# to keep the heavy hitters in at most k counters (Misra-Gries, merged one chunk at a time)
+# every kept count is at most `error` below the true count
+class MisraGries:
+    def __init__(self, k: int = 256):
+        self.k=k
+        self.counts: dict[str, int]={}
+        self.error=0
+
+    def update(self, value_counts: pd.Series) -> None:
+        merged=dict(self.counts)
+        for v, n in zip(value_counts.index, value_counts.to_numpy()):
+            merged[v]=merged.get(v, 0) + int(n)
+        if len(merged) > self.k:
+            # subtract the (k+1)-th largest count and drop what falls to zero
+            cut=sorted(merged.values(), reverse=True)[self.k]
+            merged={v: n - cut for v, n in merged.items() if n > cut}
+            self.error+=cut
+        self.counts=merged
+
+# one column's running summary: missing count, type flags and the three sketches
+class ColumnProfile:
+    def __init__(self, name: str, k: int = 256, hll_p: int = 14):
+        self.name=name
+        self.rows=0
+        self.missing=0
+        self.all_int=True
+        self.all_num=True
+        self.all_bool=True
+        self.hll=HyperLogLog(hll_p)
+        self.cms=CountMinSketch()
+        self.mg=MisraGries(k)
+
+    def update(self, s: pd.Series) -> None:
+        self.rows+=len(s)
+        present=s.dropna()
+        self.missing+=len(s) - len(present)
+        if len(present):
+            if self.all_bool:
+                self.all_bool=bool(present.isin(_BOOL_VALUES).all())
+            if self.all_num:
+                self.all_num=bool(pd.to_numeric(present, errors="coerce").notna().all())
+            if self.all_int:
+                self.all_int=self.all_num and bool(present.str.fullmatch(_INT_RE).all())
+        # value counts use the report's "<missing>" label, like the in-memory report
+        vc=s.fillna(MISSING).value_counts(sort=False)
+        h=_hash(pd.Series(vc.index, dtype=object))
+        self.hll.add_hashes(h[vc.index != MISSING])
+        self.cms.add_hashes(h, vc.to_numpy())
+        self.mg.update(vc)
+
+    # the dtype pandas.read_csv would have inferred for the whole column
+    def dtype(self) -> str:
+        if self.missing == self.rows:
+            return "float64"
+        if self.all_bool:
+            return "bool" if self.missing == 0 else "object"
+        if self.all_int:
+            return "int64" if self.missing == 0 else "float64"
+        return "float64" if self.all_num else TEXT_DTYPE
+
+    def top(self, n: int = 10) -> pd.DataFrame:
+        values=list(self.mg.counts)
+        if not values:
+            return pd.DataFrame({"value": [], "count": []})
+        # both bounds are upper bounds on the true count; take the tighter one
+        mg=np.array([self.mg.counts[v] for v in values]) + self.mg.error
+        cms=self.cms.estimate_hashes(_hash(pd.Series(values, dtype=object)))
+        out=pd.DataFrame({"value": values, "count": np.minimum(mg, cms)})
+        return out.sort_values("count", ascending=False, kind="stable").head(n).reset_index(drop=True)
+
+# to profile a raw export in one pass over its chunks; memory is fixed per column
+def profile_chunks(chunks: Iterable[pd.DataFrame], k: int = 256) -> dict[str, ColumnProfile]:
+    profiles: dict[str, ColumnProfile]={}
+    for chunk in chunks:
+        for c in chunk.columns:
+            if c not in profiles:
+                profiles[c]=ColumnProfile(c, k)
+            profiles[c].update(chunk[c])
+    return profiles
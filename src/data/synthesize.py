@@ -0,0 +1,75 @@
+from __future__ import annotations
+import argparse
+from pathlib import Path
+from typing import Iterator
+import numpy as np
+import pandas as pd
+from src.config import BASE_DIR, DATA_RAW
+
+DATA_SYNTHETIC = BASE_DIR / "data" / "synthetic"
+
+# to learn each raw column's value distribution (missing values included)
+# columns are sampled independently, so cross-column correlations are not kept
+def raw_distributions(path: Path = DATA_RAW) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    raw=pd.read_csv(path, dtype=str, keep_default_na=False, na_values=["NA", ""])
+    dists={}
+    for c in raw.columns:
+        if c == "Timestamp":
+            continue
+        vc=raw[c].value_counts(dropna=False)
+        values=np.array([None if pd.isna(v) else v for v in vc.index], dtype=object)
+        dists[c]=(values, (vc.to_numpy() / vc.sum()).astype(float))
+    return dists
+
+def sorted_timestamps(path: Path = DATA_RAW) -> np.ndarray:
+    ts=pd.to_datetime(pd.read_csv(path, usecols=["Timestamp"])["Timestamp"], errors="coerce")
+    return np.sort(ts.dropna().to_numpy().astype("datetime64[ns]").astype("int64"))
+
+# to generate `rows` synthetic raw responses in chunks with the raw column set
+# the real gender/country spellings (typos included) are kept; Timestamps follow the real
+# distribution through its quantiles but increase row by row, like an append-only export
+def iter_synthetic(rows: int, chunksize: int = 500_000, seed: int = 0,
+                   source: Path = DATA_RAW) -> Iterator[pd.DataFrame]:
+    rng=np.random.default_rng(seed)
+    dists=raw_distributions(source)
+    columns=pd.read_csv(source, nrows=0).columns.tolist()
+    real_ts=sorted_timestamps(source)
+    quantile_pos=np.linspace(0.0, 1.0, len(real_ts))
+    for start in range(0, rows, chunksize):
+        n=min(chunksize, rows - start)
+        chunk={}
+        for c in columns:
+            if c == "Timestamp":
+                pos=(np.arange(start, start + n) + rng.random(n)) / max(rows, 1)
+                ns=np.interp(pos, quantile_pos, real_ts).astype("int64")
+                chunk[c]=pd.DatetimeIndex(ns).strftime("%Y-%m-%d %H:%M:%S")
+            else:
+                values, probs=dists[c]
+                chunk[c]=values[rng.choice(len(values), size=n, p=probs)]
+        yield pd.DataFrame(chunk, columns=columns)
+
+def synthesize(rows: int, seed: int = 0) -> pd.DataFrame:
+    parts=list(iter_synthetic(rows, seed=seed))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+def write_synthetic(rows: int, out: Path, chunksize: int = 500_000, seed: int = 0) -> Path:
+    out=Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    for i, chunk in enumerate(iter_synthetic(rows, chunksize, seed)):
+        chunk.to_csv(out, index=False, header=i == 0, mode="w" if i == 0 else "a", na_rep="NA")
+    return out
+
+def main() -> None:
+    parser=argparse.ArgumentParser(description="Write a synthetic raw survey sampled from data/raw/survey.csv.")
+    parser.add_argument("rows", type=int, help="number of responses (e.g. 10000 to 50000000)")
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    args=parser.parse_args()
+    out=args.out or DATA_SYNTHETIC / f"survey_{args.rows}.csv"
+    write_synthetic(args.rows, out, args.chunksize, args.seed)
+    print(f"Wrote synthetic survey: {out} (rows={args.rows})")
+
+
+if __name__ == "__main__":
+    main()
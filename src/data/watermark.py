@@ -0,0 +1,99 @@
+from __future__ import annotations
+import hashlib
+import json
+from collections import Counter
+from pathlib import Path
+import pandas as pd
+
+# bytes hashed at each end of the ingested part of a raw export (see fingerprint)
+FINGERPRINT_BYTES=1 << 16
+
+# each raw export's ingest progress is kept next to the dataset it feeds, one file
+# per export; the leading underscore keeps dataset readers out of it
+def watermark_path(root: Path, raw_path: Path) -> Path:
+    return Path(root) / f"_watermark.{Path(raw_path).stem}.json"
+
+# to read a watermark state: how far into the raw file the dataset goes (`offset`, a byte
+# offset past the last ingested record, and the `fingerprint` of the bytes before it),
+# the last processed raw Timestamp (None on the first run or for exports without one),
+# the keys of the rows already taken at exactly that Timestamp, the row count, the rows
+# left out for having no year and the run whose files are committed but not yet moved
+# into the dataset
+def read_state(path: Path) -> dict:
+    path=Path(path)
+    state={"offset": 0, "fingerprint": None, "timestamp": None, "seen": {}, "rows": 0, "dropped": 0,
+           "pending": None}
+    if path.exists():
+        state.update(json.loads(path.read_text(encoding="utf-8")))
+    return state
+
+def write_state(path: Path, state: dict) -> None:
+    path=Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # write to a temp file first so a crash never leaves a half-written watermark
+    tmp=path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+# to tell whether the first `offset` bytes of a raw export are still the ones ingested
+# an appended export keeps them; a replaced, truncated or re-sorted one changes its header,
+# its first rows or the rows at the offset, which are the bytes hashed here, so the
+# check costs two small reads instead of a pass over the whole history
+def fingerprint(path: Path, offset: int) -> str | None:
+    path=Path(path)
+    if offset <= 0 or path.stat().st_size < offset:
+        return None
+    h=hashlib.sha1(str(offset).encode())
+    with path.open("rb") as f:
+        h.update(f.read(min(FINGERPRINT_BYTES, offset)))
+        tail=max(FINGERPRINT_BYTES, offset - FINGERPRINT_BYTES)
+        if tail < offset:
+            f.seek(tail)
+            h.update(f.read(offset - tail))
+    return h.hexdigest()[:16]
+
+# to identify a raw row by its content, for rows sharing the watermark's Timestamp
+def row_keys(chunk: pd.DataFrame) -> list[str]:
+    return [hashlib.sha1("\x1f".join("" if pd.isna(v) else str(v) for v in row).encode("utf-8")).hexdigest()[:16]
+            for row in chunk.itertuples(index=False)]
+
+# to keep only raw rows not yet processed: newer than the watermark, or at the watermark
+# second but not among the rows already taken there (`seen`, key -> count, used up in
+# place as rows match, so one Counter is passed for every chunk of a run)
+# rows with an unreadable Timestamp can't be ordered, so they are only taken on the first run
+def select_new_rows(chunk: pd.DataFrame, watermark: pd.Timestamp | None,
+                    seen: Counter | None = None) -> pd.DataFrame:
+    if watermark is None:
+        return chunk
+    ts=pd.to_datetime(chunk["Timestamp"], errors="coerce")
+    mask=(ts >= watermark).to_numpy(copy=True)
+    tied=(ts == watermark).to_numpy()
+    if seen and tied.any():
+        for i, key in zip(tied.nonzero()[0], row_keys(chunk[tied])):
+            if seen[key] > 0:
+                seen[key]-=1
+                mask[i]=False
+    return chunk[mask]
+
+# the latest raw Timestamp taken so far and the keys of the rows taken at exactly that
+# second, which is what a re-scan of a rewritten export needs to skip what it already has
+class Frontier:
+    def __init__(self, timestamp: str | None = None, seen: dict | None = None):
+        self.timestamp=pd.Timestamp(timestamp) if timestamp else None
+        self.seen=Counter(seen or {})
+
+    def update(self, rows: pd.DataFrame) -> None:
+        if "Timestamp" not in rows.columns or len(rows) == 0:
+            return
+        ts=pd.to_datetime(rows["Timestamp"], errors="coerce")
+        latest=ts.max()
+        if pd.isna(latest):
+            return
+        if self.timestamp is None or latest > self.timestamp:
+            self.timestamp, self.seen=latest, Counter()
+        if latest == self.timestamp:
+            self.seen.update(row_keys(rows[(ts == latest).to_numpy()]))
+
+    def state(self) -> dict:
+        return {"timestamp": None if self.timestamp is None else self.timestamp.isoformat(sep=" "),
+                "seen": dict(self.seen)}
@@ -0,0 +1,174 @@
+"""Render static snapshots of the dashboard charts over a grid of filters.
+
+    python -m src.export_charts                          # year x region x company_size, PNG
+    python -m src.export_charts --format svg --region "Europe,North America"
+    python -m src.export_charts --gender each --company-size "" --workers 4
+
+Each filter takes `each` (one combination per value), a comma-separated list
+of values (one combination per value) or an empty string (not filtered).
+Charts come from `filtered_df` and the same `chart_*` builders as the app;
+specs are built in this process and rendered with vl-convert in a process
+pool. `manifest.json` in the output directory records a hash of every
+rendered spec, so combinations whose chart data is unchanged are skipped.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import itertools
+import json
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+from src.config import BASE_DIR
+from src.data.parallel import default_workers
+
+EXPORT_DIR = BASE_DIR / "reports" / "charts"
+MANIFEST = "manifest.json"
+# filter name -> (CLI flag, dropdown domain attribute in src.app)
+GRID_FILTERS = {
+    "year": ("--year", "years"),
+    "region": ("--region", "regions"),
+    "gender": ("--gender", "genders"),
+    "age_bin": ("--age-bin", "age_bins"),
+    "company_size": ("--company-size", "company_sizes"),
+    "remote_work": ("--remote-work", "remote_vals"),
+}
+DEFAULT_GRID = {"year": "each", "region": "each", "company_size": "each"}
+
+
+def chart_builders(app) -> dict:
+    # the four dashboard charts, with the options the dashboard shows by default
+    return {
+        "chart-1": lambda dff: app.chart_treatment_by_group(dff, "age_bin", "percent"),
+        "chart-2": lambda dff: app.chart_interfere_heatmap(dff, "row_percent"),
+        "chart-3": lambda dff: app.chart_support_vs_treatment(dff, "benefits"),
+        "chart-4": lambda dff: app.chart_support_vs_treatment(dff, "seek_help"),
+    }
+
+
+def grid(app, spec: dict[str, str]) -> list[dict]:
+    """Every filter combination: {filter: value} with unfiltered columns left out."""
+    axes = []
+    for name, raw in spec.items():
+        raw = (raw or "").strip()
+        if not raw:
+            continue
+        domain = list(getattr(app, GRID_FILTERS[name][1]))
+        if raw == "each":
+            values = domain
+        else:
+            by_text = {str(v): v for v in domain}
+            values = []
+            for text in (t.strip() for t in raw.split(",")):
+                if text not in by_text:
+                    raise SystemExit(f"Unknown {name} value {text!r}; choose from {list(by_text)}")
+                values.append(by_text[text])
+        axes.append([(name, v) for v in values])
+    return [dict(combo) for combo in itertools.product(*axes)]
+
+
+def _slug(combo: dict) -> str:
+    if not combo:
+        return "all"
+    parts = []
+    for k, v in combo.items():
+        parts.append(f"{k}=" + re.sub(r"[^\w.-]+", "-", str(v)).strip("-"))
+    return "_".join(parts)
+
+
+def _spec_hash(spec: dict, fmt: str, scale: float) -> str:
+    payload = json.dumps(spec, sort_keys=True, default=str) + f"|{fmt}|{scale}"
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _render(path: str, spec: dict, fmt: str, scale: float, vl_version: str) -> str:
+    import vl_convert as vlc
+    if fmt == "svg":
+        Path(path).write_text(vlc.vegalite_to_svg(spec, vl_version=vl_version), encoding="utf-8")
+    else:
+        Path(path).write_bytes(vlc.vegalite_to_png(spec, scale=scale, vl_version=vl_version))
+    return path
+
+
+def build_jobs(app, combos: list[dict], out_dir: Path, fmt: str, scale: float,
+               width: int, manifest: dict) -> tuple[list[tuple], dict, int]:
+    """(render jobs, new manifest, number skipped) for every combination x chart."""
+    builders = chart_builders(app)
+    height = max(120, app.CHART_HEIGHT - 130)
+    jobs = []
+    new_manifest = {}
+    skipped = 0
+    for combo in combos:
+        sel = [combo.get(k) for k in GRID_FILTERS]
+        # filtered_df takes the year as a scalar and the rest as lists
+        args = [sel[0]] + [None if v is None else [v] for v in sel[1:]]
+        dff = app.filtered_df(app.df, *args)
+        for cid, build in builders.items():
+            spec = build(dff).properties(width=width, height=height).to_dict()
+            rel = f"{_slug(combo)}/{cid}.{fmt}"
+            h = _spec_hash(spec, fmt, scale)
+            new_manifest[rel] = h
+            if manifest.get(rel) == h and (out_dir / rel).exists():
+                skipped += 1
+                continue
+            jobs.append((str(out_dir / rel), spec, fmt, scale, app.VL_VERSION))
+    return jobs, new_manifest, skipped
+
+
+def export(grid_spec: dict[str, str], out_dir: Path = EXPORT_DIR, fmt: str = "png",
+           scale: float = 2.0, width: int = 480, workers: int = 0) -> dict:
+    from src import app
+
+    out_dir = Path(out_dir)
+    manifest_path = out_dir / MANIFEST
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else {}
+    combos = grid(app, grid_spec)
+    jobs, new_manifest, skipped = build_jobs(app, combos, out_dir, fmt, scale, width, manifest)
+    for job in jobs:
+        Path(job[0]).parent.mkdir(parents=True, exist_ok=True)
+
+    workers = workers or default_workers()
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            _render(*job)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_render, *zip(*jobs)))
+
+    # earlier entries for combinations outside this grid stay valid
+    manifest.update(new_manifest)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tmp = manifest_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(manifest_path)
+    return {"combinations": len(combos), "rendered": len(jobs), "skipped": skipped}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Export the dashboard charts for a grid of filters.")
+    for name, (flag, _) in GRID_FILTERS.items():
+        parser.add_argument(flag, dest=name, default=DEFAULT_GRID.get(name, ""),
+                            help=f"'each', a comma-separated list, or '' for no {name} filter "
+                                 f"(default: {DEFAULT_GRID.get(name, '') or 'no filter'!r})")
+    parser.add_argument("--format", choices=["png", "svg"], default="png")
+    parser.add_argument("--scale", type=float, default=2.0, help="PNG pixel ratio")
+    parser.add_argument("--width", type=int, default=480, help="chart width in pixels")
+    parser.add_argument("--out", type=Path, default=EXPORT_DIR)
+    parser.add_argument("--workers", type=int, default=0, help="render processes (0 = one per core)")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    result = export({name: getattr(args, name) for name in GRID_FILTERS}, args.out,
+                    args.format, args.scale, args.width, args.workers)
+    print(f"{result['combinations']} combinations: rendered {result['rendered']} charts, "
+          f"skipped {result['skipped']} unchanged ({time.perf_counter() - t0:.1f}s) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
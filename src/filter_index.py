@@ -0,0 +1,106 @@
+from __future__ import annotations
+from typing import Iterable, Mapping
+import numpy as np
+import pandas as pd
+
+
+class FilterIndex:
+    """Inverted index from (column, value) to a packed row bitset.
+
+    Built once per frame. A filter request ORs the bitsets of the selected
+    values within a column, ANDs across columns, and only unpacks at the end.
+
+    The packed work is one pass over n/8 bytes per extra selected value and
+    per filtered column (about 1 ms at 10M rows, see `bits`). Selections
+    covering a whole column are skipped and large ones are complemented.
+    Unpacking to a boolean mask writes n bytes and `rows` a further index
+    per match, so at 10M rows those are bound by memory bandwidth (a few
+    ms) rather than by the index.
+    """
+
+    def __init__(self, frame: pd.DataFrame, columns: Iterable[str]):
+        columns = list(columns)
+        missing = [c for c in columns if c not in frame.columns]
+        if missing:
+            raise KeyError(f"Cannot index missing columns: {missing}")
+        self.n_rows = len(frame)
+        self._bits: dict[str, dict[object, np.ndarray]] = {}
+        # columns without missing values: every row is in exactly one of their bitsets
+        self._complete: dict[str, bool] = {}
+        for col in columns:
+            codes, uniques = pd.factorize(frame[col], use_na_sentinel=True)
+            self._bits[col] = {
+                _key(v): np.packbits(codes == i) for i, v in enumerate(uniques)
+            }
+            self._complete[col] = bool((codes >= 0).all())
+        self._empty = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+
+    def values(self, col: str) -> list:
+        return list(self._bits.get(col, {}))
+
+    def _column_bits(self, col: str, selected: Iterable) -> tuple[np.ndarray | None, bool]:
+        # (bits, owned): bits is None when the selection covers every value of the
+        # column (no filter); owned is False when bits is the index's own array.
+        # A selection of most values ORs the few left out and inverts, which only
+        # works when no row is missing from every bitset.
+        lookup = self._bits[col]
+        wanted = {_key(v) for v in selected} & lookup.keys()
+        complete = self._complete[col]
+        if complete and len(wanted) == len(lookup):
+            return None, False
+        invert = complete and 2 * len(wanted) > len(lookup)
+        values = list(lookup.keys() - wanted if invert else wanted)
+        if not values:
+            out, owned = self._empty, False
+        else:
+            out, owned = lookup[values[0]], False
+            for v in values[1:]:
+                if owned:
+                    np.bitwise_or(out, lookup[v], out=out)
+                else:
+                    out, owned = np.bitwise_or(out, lookup[v]), True
+        if invert:
+            out, owned = np.invert(out), True
+        return out, owned
+
+    def bits(self, selections: Mapping[str, Iterable | None]) -> np.ndarray | None:
+        """Packed row bitset for the selections, or None when nothing is filtered.
+
+        A falsy selection leaves its column unfiltered, like the chained
+        `isin` masks this replaces. Selecting a column that is not indexed
+        raises KeyError. The result may be one of the index's own arrays, so
+        it must not be modified; bits past `n_rows` in the last byte are
+        unspecified.
+        """
+        acc, owned = None, False
+        for col, selected in selections.items():
+            if not selected:
+                continue
+            if col not in self._bits:
+                raise KeyError(f"Column not indexed: {col!r}")
+            bits, bits_owned = self._column_bits(col, selected)
+            if bits is None:
+                continue
+            if acc is None:
+                acc, owned = bits, bits_owned
+            elif owned:
+                np.bitwise_and(acc, bits, out=acc)
+            else:
+                acc, owned = np.bitwise_and(acc, bits), True
+        return acc
+
+    def mask(self, selections: Mapping[str, Iterable | None]) -> np.ndarray | None:
+        """Boolean row mask for the selections, or None when nothing is filtered."""
+        acc = self.bits(selections)
+        if acc is None:
+            return None
+        return np.unpackbits(acc, count=self.n_rows).view(bool)
+
+    def rows(self, selections: Mapping[str, Iterable | None]) -> np.ndarray | None:
+        m = self.mask(selections)
+        return None if m is None else np.flatnonzero(m)
+
+
+def _key(v):
+    # numpy scalars and Python scalars of the same value share one key
+    return v.item() if isinstance(v, np.generic) else v
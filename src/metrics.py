@@ -0,0 +1,131 @@
+from __future__ import annotations
+import bisect
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# seconds; covers sub-millisecond cache hits up to multi-second cold renders
+TIME_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROW_BUCKETS = (0, 10, 100, 1000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """In-process histograms and counters, rendered in Prometheus text format.
+
+    Each gunicorn worker keeps its own numbers; `/metrics` reports the worker
+    that served the scrape, labelled with its pid.
+    """
+
+    enabled = True
+
+    def __init__(self, sample_rate: float = 1.0):
+        self.sample_rate = sample_rate
+        self._hist: dict[tuple, Histogram] = {}
+        self._counters: dict[tuple, float] = {}
+        self._buckets: dict[str, tuple] = {}
+        self._help: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, buckets) -> None:
+        self._buckets[name] = tuple(buckets)
+        self._help[name] = help_text
+
+    def counter(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def sample(self) -> bool:
+        # decided once per request, so all of a request's stages are kept or dropped together
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self._hist.get(key)
+            if h is None:
+                h = self._hist[key] = Histogram(self._buckets[name])
+            h.observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    @contextmanager
+    def timer(self, name: str, sampled: bool = True, **labels):
+        if not sampled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def render(self) -> str:
+        # read at render time: under --preload the object is created before the fork
+        base = {"pid": str(os.getpid())}
+        lines = []
+        with self._lock:
+            hist = sorted(self._hist.items())
+            counters = sorted(self._counters.items())
+        for name in sorted(self._help):
+            rows_h = [(lab, h) for (n, lab), h in hist if n == name]
+            rows_c = [(lab, v) for (n, lab), v in counters if n == name]
+            if not rows_h and not rows_c:
+                continue
+            lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {'histogram' if name in self._buckets else 'counter'}")
+            for lab, h in rows_h:
+                labels = {**base, **dict(lab)}
+                cum = 0
+                for le, c in zip([*map(_fmt, h.buckets), "+Inf"], h.counts):
+                    cum += c
+                    lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cum}")
+                lines.append(f"{name}_sum{_labels(labels)} {h.sum}")
+                lines.append(f"{name}_count{_labels(labels)} {h.count}")
+            for lab, v in rows_c:
+                lines.append(f"{name}{_labels({**base, **dict(lab)})} {v}")
+        return "\n".join(lines) + "\n"
+
+
+class NoopMetrics(Metrics):
+    """Same interface, records nothing."""
+
+    enabled = False
+
+    def sample(self) -> bool:
+        return False
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        pass
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        pass
+
+
+def _fmt(v) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"' for k, v in labels.items())
+    return "{" + body + "}"
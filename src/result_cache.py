@@ -0,0 +1,125 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from plotly.utils import PlotlyJSONEncoder
+
+
+def normalize_key(*filters) -> tuple:
+    """Canonical cache key for a filter state.
+
+    Multi-select values are sorted and de-duplicated, and None and empty
+    selections are treated the same, so equivalent views share one entry.
+    """
+    key = []
+    for f in filters:
+        if f is None or (isinstance(f, (list, tuple, set)) and len(f) == 0) or f == "":
+            key.append(None)
+        elif isinstance(f, (list, tuple, set)):
+            key.append(tuple(sorted({str(v) for v in f})))
+        else:
+            key.append(str(f))
+    return tuple(key)
+
+
+class ResultCache:
+    """Two-tier cache for callback outputs.
+
+    Tier 1 is a per-process LRU holding the output objects. Tier 2 is a
+    directory shared by all gunicorn workers on the box, holding the
+    outputs as Dash JSON; it is evicted oldest-first once it grows past
+    `max_disk_bytes`. Entries are filed under `version`, which names the
+    data the process loaded and the code that builds the outputs (see
+    `app.CACHE_VERSION`), never the data file as it is now: a worker that
+    still serves old data keeps writing to its own directory, which workers
+    started on new data never read. Directories of other versions are
+    dropped when a cache is created.
+    """
+
+    def __init__(self, version: str, cache_dir: Path | None, max_entries: int = 256,
+                 max_disk_bytes: int = 64 * 1024 * 1024):
+        self._version = version
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._mem: OrderedDict[tuple, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._drop_stale_dirs()
+
+    def _version_dir(self) -> Path | None:
+        return None if self.cache_dir is None else self.cache_dir / self._version
+
+    def _drop_stale_dirs(self) -> None:
+        if self.cache_dir is None or not self.cache_dir.exists():
+            return
+        for d in self.cache_dir.iterdir():
+            if d.is_dir() and d.name != self._version:
+                shutil.rmtree(d, ignore_errors=True)
+
+    def _disk_path(self, key: tuple) -> Path | None:
+        vdir = self._version_dir()
+        if vdir is None:
+            return None
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return vdir / f"{digest}.json"
+
+    def get(self, key: tuple):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                return self._mem[key]
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            value = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)  # mark as recently used for eviction
+        except (OSError, ValueError):
+            # unreadable, or evicted by another worker in between
+            return None
+        self._remember(key, value)
+        return value
+
+    def put(self, key: tuple, value) -> None:
+        self._remember(key, value)
+        path = self._disk_path(key)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps(value, cls=PlotlyJSONEncoder)
+        # a unique temp name per writer, so threads and workers never share one
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent,
+                                         suffix=".tmp", delete=False) as f:
+            f.write(payload)
+        os.replace(f.name, path)
+        self._evict_disk()
+
+    def _remember(self, key: tuple, value) -> None:
+        with self._lock:
+            self._mem[key] = value
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        vdir = self._version_dir()
+        files = []
+        for p in vdir.glob("*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue  # removed by another worker
+            files.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in files)
+        for _, size, p in sorted(files, key=lambda f: f[0]):
+            if total <= self.max_disk_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,12 @@
+import os
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# src.app reads these at import: keep the result cache in memory and
+# the metrics on, so tests never touch .cache/ and can read /metrics
+os.environ.setdefault("DASH_CACHE_DIR", "")
+os.environ.setdefault("DASH_METRICS", "1")
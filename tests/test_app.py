@@ -0,0 +1,229 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src import app
+
+SELECTIONS = [
+    (None, None, None, None, None, None),
+    (2014, ["North America"], None, None, None, None),
+    (2014, ["Europe", "North America"], ["Female"], ["20–29", "30–39"], None, None),
+    (2014, None, None, None, ["1-5", "6-25"], ["Yes"]),
+    (2014, ["Atlantis"], None, None, None, None),
+]
+
+
+@pytest.mark.parametrize("filters", SELECTIONS)
+def test_cube_aggregates_match_row_filtering(filters):
+    sel = app.filter_selections(*filters)
+    rows = app.row_cubes(app.filtered_df(app.df, *filters))
+    assert app.agg_kpis(sel) == app.agg_kpis({}, rows)
+    pd.testing.assert_frame_equal(app.agg_treatment_by_group(sel, "age_bin"),
+                                  app.agg_treatment_by_group({}, "age_bin", rows), check_dtype=False)
+    for factor in ["work_interfere", "benefits", "seek_help"]:
+        pd.testing.assert_frame_equal(app.agg_pair_counts(sel, factor),
+                                      app.agg_pair_counts({}, factor, rows), check_dtype=False)
+
+
+def test_vega_spec_is_plain_vega_lite():
+    chart = app.chart_treatment_by_group(app.filtered_df(app.df, *SELECTIONS[1]), "age_bin")
+    spec = app.as_vega_spec(chart, height=300)
+    assert spec["$schema"].startswith("https://vega.github.io/schema/vega-lite/")
+    assert spec["height"] == 170 and spec["width"] == "container"
+    json.dumps(spec)  # goes into a dcc.Store as is
+    frame = app.as_iframe(chart, height=300)
+    assert "<html" in frame.srcDoc and frame.style["height"] == "300px"
+
+
+def test_vega_bundle_is_served_with_long_cache_headers():
+    response = app.server.test_client().get(app.VEGA_BUNDLE_URL)
+    assert response.status_code == 200
+    assert response.mimetype == "application/javascript"
+    assert "immutable" in response.headers["Cache-Control"]
+    assert b"vegaEmbed" in response.data
+
+
+def _state(*filters):
+    return {"values": list(filters)}
+
+
+def _update_outputs():
+    # the output list of the callback registered for update()
+    for key, cb in app.app.callback_map.items():
+        if [i["id"] for i in cb["inputs"]] == [app.FILTER_STATE_ID]:
+            return key.strip(".").split("...")
+    raise AssertionError("update callback not registered")
+
+
+def test_update_returns_one_value_per_output():
+    out = app.update(_state(*SELECTIONS[1]), None)
+    assert len(out) == len(_update_outputs()) == len(app.PANELS) + 1
+    assert set(out[-1]) == {p.pid for p in app.PANELS}
+
+
+def test_update_error_path_matches_the_outputs(monkeypatch):
+    def boom(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(app, "_build_panels", boom)
+    out = app.update(_state(*SELECTIONS[1]), None)
+    assert len(out) == len(_update_outputs())
+    assert "boom" in out[0].children
+    assert out[1:-1] == (None,) * (len(app.PANELS) - 1)
+    assert out[-1] == {}
+
+
+def test_unchanged_aggregates_are_skipped():
+    first = app.update(_state(*SELECTIONS[1]), None)
+    hashes = first[-1]
+    assert app.no_update not in first
+    again = app.update(_state(*SELECTIONS[1]), hashes)
+    assert again[:-1] == (app.no_update,) * len(app.PANELS)
+    # selecting every remote_work answer leaves every aggregate as it was
+    everything = list(app.CUBES["treatment"].domains["remote_work"])
+    same = app.update(_state(*SELECTIONS[1][:5], everything), hashes)
+    assert same[:-1] == (app.no_update,) * len(app.PANELS)
+    assert same[-1] == hashes
+    changed = app.update(_state(*SELECTIONS[2]), hashes)
+    assert all(o is not app.no_update for o in changed[:-1])
+
+
+def test_cache_keys_follow_the_data_loaded_at_startup(monkeypatch):
+    keys = []
+    monkeypatch.setattr(app.RESULT_CACHE, "get", lambda key: keys.append(key))
+    # the file on disk moves on; this process still serves what it loaded
+    monkeypatch.setattr(app, "data_version", lambda path: "rewritten")
+    app.update(_state(*SELECTIONS[1]), None)
+    assert keys and all(k[-2] == app.DATA_VERSION for k in keys)
+    assert app.RESULT_CACHE._version == app.CACHE_VERSION
+    assert app.CACHE_VERSION.startswith(app.DATA_VERSION)
+
+
+def test_load_versioned_reloads_when_the_file_changes_mid_load(monkeypatch):
+    versions = iter(["a", "b", "b", "b"])
+    loads = []
+    monkeypatch.setattr(app, "data_version", lambda path: next(versions))
+    monkeypatch.setattr(app, "load_dashboard_data", lambda path, year: loads.append(year) or app.df)
+    frame, version = app.load_versioned()
+    assert frame is app.df and version == "b" and len(loads) == 2
+
+
+def test_code_fingerprint_covers_the_bootstrap_resamples(monkeypatch):
+    before = app.code_fingerprint()
+    assert app.code_fingerprint() == before
+    monkeypatch.setattr(app, "BOOTSTRAP_RESAMPLES", app.BOOTSTRAP_RESAMPLES + 1)
+    assert app.code_fingerprint() != before
+
+
+def test_templates_follow_the_domains_of_the_cubes_in_use():
+    # e.g. a by_year partition whose answers are a subset of the startup domains
+    frame = app.df[app.df["work_interfere"].isin(["Never", "Often"])].astype({"work_interfere": str})
+    cubes = app.build_cubes(frame)
+    assert app.template_orders("interfere", "work_interfere", cubes)[0] == ("Never", "Often")
+    counts = app.agg_pair_counts({}, "work_interfere", cubes)
+    spec = app.interfere_heatmap_payload(counts, "row_percent", cubes)
+    assert spec["encoding"]["x"]["sort"] == ["Never", "Often"]
+    startup = app.interfere_heatmap_payload(app.agg_pair_counts({}, "work_interfere"), "row_percent")
+    assert startup["encoding"]["x"]["sort"] == list(app.template_orders("interfere", "work_interfere")[0])
+    assert len(startup["encoding"]["x"]["sort"]) > 2
+
+
+def test_panel_aggregates_match_pandas_grouping():
+    dff = app.filtered_df(app.df, *SELECTIONS[2])
+    aggs = app.panel_aggregates(dff)
+    assert set(aggs) == {p.pid for p in app.PANELS}
+    assert aggs["kpi"]["n"] == len(dff)
+    assert aggs["kpi"]["rates"]["treatment"] == pytest.approx((dff["treatment"] == "Yes").mean() * 100)
+    for pid, factor in [("chart-2", "work_interfere"), ("chart-3", "benefits"), ("chart-4", "seek_help")]:
+        expected = dff.groupby([factor, "treatment"], observed=True).size()
+        got = aggs[pid].set_index([factor, "treatment"])["count"]
+        assert got.to_dict() == expected[expected > 0].to_dict()
+    by_group = aggs["chart-1"].set_index(["age_bin", "gender"])
+    expected = dff.groupby(["age_bin", "gender"], observed=True)["treatment"]
+    assert by_group["n"].to_dict() == expected.size().to_dict()
+    assert by_group["treat_yes"].to_dict() == expected.apply(lambda s: int((s == "Yes").sum())).to_dict()
+
+
+def _post_update(client, filters, hashes=None):
+    dep = next(d for d in client.get("/_dash-dependencies").get_json()
+               if [i["id"] for i in d["inputs"]] == [app.FILTER_STATE_ID])
+    outputs = [{"id": o.rsplit(".", 1)[0], "property": o.rsplit(".", 1)[1]}
+               for o in dep["output"].strip(".").split("...")]
+    body = {
+        "output": dep["output"],
+        "outputs": outputs,
+        "inputs": [{"id": app.FILTER_STATE_ID, "property": "data", "value": _state(*filters)}],
+        "state": [{"id": "panel-hashes", "property": "data", "value": hashes}],
+        "changedPropIds": [f"{app.FILTER_STATE_ID}.data"],
+    }
+    return client.post("/_dash-update-component", json=body)
+
+
+def test_metrics_cover_the_stages_of_a_real_request():
+    client = app.server.test_client()
+    response = _post_update(client, (2014, ["Europe"], ["Male"], None, None, None))
+    assert response.status_code == 200
+    text = client.get("/metrics").get_data(as_text=True)
+    for stage in ["aggregate", "spec_build", "serialize"]:
+        assert f'stage="{stage}"' in text
+    assert 'stage="filter"' not in text
+    assert "dashboard_callback_seconds_count" in text
+    assert "dashboard_request_seconds_count" in text
+
+
+def test_update_runs_outside_a_request_context():
+    # as in a background job or a direct call: nothing is sampled, nothing raises
+    from flask import has_request_context
+
+    assert not has_request_context()
+    before = app.METRICS.render()
+    out = app.update(_state(2014, ["Asia"], None, None, None, None), None)
+    assert "Callback error" not in str(out[0])
+    assert app.METRICS.render() == before
+
+
+DEBOUNCE_RUN = """
+global.window = {dash_clientside: {no_update: "NO_UPDATE", callback_context: {triggered: []}}};
+// a global eval: the scripts' own top-level names stay out of this scope
+(0, eval)(require("fs").readFileSync(0, "utf8"));
+const funcs = window.dash_clientside._dashprivate_clientside_funcs;
+const fn = Object.values(funcs).find(f => String(f).includes("_filterDebounce"));
+const ctx = window.dash_clientside.callback_context;
+ctx.triggered = [{prop_id: "."}];
+const initial = fn(2014, null, null, null, null, null);
+ctx.triggered = [{prop_id: "f-gender.value"}];
+const first = fn(2014, null, ["Male"], null, null, null);
+ctx.triggered = [{prop_id: "f-company.value"}];
+const last = fn(2014, null, ["Male"], null, ["1-5"], null);
+Promise.all([first, last]).then(r => console.log(JSON.stringify({initial: initial, burst: r})));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_debounce_keeps_only_the_last_change_of_a_burst():
+    script = "\n".join(app.app._inline_scripts)
+    out = subprocess.run(["node", "-e", DEBOUNCE_RUN], input=script, capture_output=True,
+                         text=True, check=True).stdout
+    result = json.loads(out)
+    # the initial load is answered at once, a burst only by its last change
+    assert result["initial"] == {"values": [2014, None, None, None, None, None]}
+    assert result["burst"] == ["NO_UPDATE", {"values": [2014, None, ["Male"], None, ["1-5"], None]}]
+
+
+def test_client_filtering_reads_the_debounced_filter_state():
+    code = ("import json; from src import app; "
+            "print(json.dumps([[i['id'] for i in cb['inputs']] for cb in app.app.callback_map.values()]))")
+    env = {**os.environ, "DASH_CLIENT_FILTERING": "1"}
+    out = subprocess.run([sys.executable, "-c", code], env=env, cwd=Path(__file__).resolve().parents[1],
+                         capture_output=True, text=True, check=True).stdout
+    inputs = json.loads(out.splitlines()[-1])
+    assert app.FILTER_IDS in inputs
+    # the dropdowns only feed the debounce; the client-side update reads its store
+    assert [app.FILTER_STATE_ID] in inputs
+    assert sum(app.FILTER_IDS[0] in ids for ids in inputs) == 1
@@ -0,0 +1,87 @@
+import json
+import random
+
+import pytest
+
+from benchmarks import load, run
+
+
+def _args(path, *extra):
+    return ["--sizes", "500", "--repeat", "1", "--only", "filter_index_bits",
+            "--baselines", str(path), *extra]
+
+
+def test_compare_flags_slowdowns_past_the_tolerance():
+    base = {"a@10": {"seconds": 1.0, "peak_mb": 10.0}}
+    assert run.compare({"a@10": {"seconds": 1.4, "peak_mb": 10.0}}, base, 0.5) == []
+    failures = run.compare({"a@10": {"seconds": 1.6, "peak_mb": 16.0}, "b@10": {"seconds": 9, "peak_mb": 9}},
+                           base, 0.5)
+    assert len(failures) == 2 and all(f.startswith("a@10") for f in failures)
+
+
+def test_baselines_record_their_environment(tmp_path):
+    path = tmp_path / "baselines.json"
+    assert run.main(_args(path, "--update")) == 0
+    state = json.loads(path.read_text())
+    assert state["environment"] == run.environment()
+    assert set(state["results"]) == {"filter_index_bits@500"}
+    assert run.main(_args(path, "--tolerance", "1000")) == 0
+
+    # a baseline this run cannot meet fails the comparison
+    state["results"]["filter_index_bits@500"]["seconds"] = 1e-12
+    path.write_text(json.dumps(state))
+    assert run.main(_args(path)) == 1
+
+
+def test_baselines_from_another_environment_are_not_compared(tmp_path, capsys):
+    path = tmp_path / "baselines.json"
+    other = {**run.environment(), "cpus": -1}
+    path.write_text(json.dumps({"environment": other,
+                                "results": {"filter_index_bits@500": {"seconds": 1e-12, "peak_mb": 0}}}))
+    assert run.main(_args(path)) == 0
+    assert "not comparing" in capsys.readouterr().out
+    # --update starts over instead of mixing in the other machine's numbers
+    assert run.main(_args(path, "--update")) == 0
+    assert json.loads(path.read_text())["environment"] == run.environment()
+
+
+def test_check_fails_without_a_baseline_to_compare(tmp_path, capsys):
+    path = tmp_path / "baselines.json"
+    assert run.main(_args(path)) == 0
+    assert run.main(_args(path, "--check")) == 2
+    path.write_text(json.dumps({"environment": {**run.environment(), "cpus": -1}, "results": {}}))
+    assert run.main(_args(path, "--check")) == 2
+    path.write_text(json.dumps({"environment": run.environment(), "results": {}}))
+    assert run.main(_args(path, "--check")) == 2
+    assert "filter_index_bits@500" in capsys.readouterr().out
+    assert run.main(_args(path, "--update")) == 0
+    assert run.main(_args(path, "--check", "--tolerance", "1000")) == 0
+
+
+def test_sizes_are_prepared_chunk_by_chunk(monkeypatch):
+    from src.data import synthesize
+
+    monkeypatch.setattr(synthesize, "synthesize", lambda *a, **k: pytest.fail("whole survey built in memory"))
+    monkeypatch.setattr(run, "CHUNK_ROWS", 200)
+    monkeypatch.setattr(run, "RAW_SAMPLE_ROWS", 300)
+    results = run.run([500], repeat=1, seed=0, only={"process", "process_streaming", "filter_index_rows"})
+    assert {k: r["rows"] for k, r in results.items()} == {
+        "process@500": 300, "process_streaming@500": 500, "filter_index_rows@500": 500}
+
+
+def test_load_harness_drives_the_real_callback():
+    report = load.run(load.InProcessTarget(), concurrency=2, requests=12, duration=None, seed=0)
+    assert report["requests"] == 12 and report["errors"] == 0
+    assert report["p50_ms"] <= report["p99_ms"]
+    assert report["max_payload_bytes"] > 0
+
+
+def test_virtual_user_changes_one_filter_per_request():
+    options = {fid: ["a", "b", "c"] for fid in load.FILTER_IDS}
+    dep = {"output": "..x.y..", "state": [{"id": "panel-hashes", "property": "data"}]}
+    user = load.VirtualUser(options, dep, random.Random(3))
+    values = user.next_body()["inputs"][0]["value"]["values"]
+    for _ in range(10):
+        nxt = user.next_body()["inputs"][0]["value"]["values"]
+        assert sum(a != b for a, b in zip(values, nxt)) <= 1
+        values = nxt
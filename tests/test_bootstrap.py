@@ -0,0 +1,56 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.bootstrap import rate_intervals, share_intervals
+
+CLIENT_JS = Path(__file__).resolve().parents[1] / "src" / "assets" / "client_filter.js"
+
+
+def test_edge_cases():
+    lo, hi = rate_intervals([0, 0, 7, 3], [0, 5, 7, 6])
+    assert np.isnan(lo[0]) and np.isnan(hi[0])  # n = 0
+    assert (lo[1], hi[1]) == (0, 0)  # p = 0
+    assert (lo[2], hi[2]) == (100, 100)  # p = 1
+    assert lo[3] < 50 < hi[3]
+    lo, hi = share_intervals([[0, 0], [4, 0], [2, 2]])
+    assert np.isnan(lo[0]).all()
+    assert lo[1].tolist() == [100, 0] and hi[1].tolist() == [100, 0]
+    assert lo[2, 0] < 50 < hi[2, 0]
+
+
+def test_same_counts_same_interval_but_not_one_stream_for_all():
+    counts = ([480, 530], [1001, 1001])
+    assert np.array_equal(rate_intervals(*counts, key="kpi"), rate_intervals(*counts, key="kpi"))
+    # each call site and count table has its own draws instead of replaying seed 0
+    assert not np.array_equal(rate_intervals(*counts, key="kpi"), rate_intervals(*counts, key="chart"))
+    assert not np.array_equal(rate_intervals(*counts, seed=1), rate_intervals(*counts, seed=2))
+    assert np.array_equal(rate_intervals(*counts, seed=1), rate_intervals(*counts, seed=1))
+    table = [[480, 521], [530, 471]]
+    assert np.array_equal(share_intervals(table, key="a"), share_intervals(table, key="a"))
+    assert not np.array_equal(share_intervals(table, key="a"), share_intervals(table, key="b"))
+
+
+INTERVALS_RUN = """
+global.window = {dash_clientside: {}};
+(0, eval)(require("fs").readFileSync(process.argv[1], "utf8"));
+const cases = JSON.parse(require("fs").readFileSync(0, "utf8"));
+console.log(JSON.stringify(cases.map(([k, n]) => window.dash_clientside.clientFilter.interval(k, n, 0.95))));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_browser_intervals_are_within_one_respondent_at_small_n():
+    cases = [(k, n) for n in range(1, 31) for k in range(n + 1)]
+    out = subprocess.run(["node", "-e", INTERVALS_RUN, str(CLIENT_JS)], input=json.dumps(cases),
+                         capture_output=True, text=True, check=True).stdout
+    browser = np.array(json.loads(out), dtype=float)
+    k, n = np.array(cases).T
+    lo, hi = rate_intervals(k, n)
+    respondents = np.maximum(abs(lo - browser[:, 0]), abs(hi - browser[:, 1])) * n / 100
+    assert respondents.max() <= 1 + 1e-9
+    assert (respondents < 1e-9).mean() > 0.8
@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src import app
+from src.config import DATA_RAW
+from src.data.multiyear import discover_sources, ingest
+
+from test_app import SELECTIONS
+
+ROOT = Path(__file__).resolve().parents[1]
+CLIENT_JS = ROOT / "src" / "assets" / "client_filter.js"
+
+
+@pytest.fixture(scope="module")
+def payload():
+    # through JSON, as the browser receives it
+    return json.loads(json.dumps(app.client_payload(app.df)))
+
+
+def _cells(payload):
+    # the sparse table back as one row per non-zero cell
+    dims, shape = payload["dims"], payload["shape"]
+    rows = []
+    for cell, count in zip(payload["cells"], payload["counts"]):
+        codes = []
+        for size in reversed(shape):
+            codes.append(cell % size)
+            cell //= size
+        row = {d: payload["domains"][d][c] for d, c in zip(dims, reversed(codes))}
+        row["count"] = count
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _select(cells, filters):
+    year, *lists = filters
+    wanted = dict(zip(app.FILTER_COLUMNS[1:], lists))
+    keep = pd.Series(True, index=cells.index)
+    if year is not None:
+        keep &= cells["year"] == year
+    for col, values in wanted.items():
+        if values:
+            keep &= cells[col].isin(values)
+    return cells[keep]
+
+
+@pytest.mark.parametrize("filters", SELECTIONS)
+def test_payload_counts_match_the_server_aggregates(payload, filters):
+    sel = app.filter_selections(*filters)
+    picked = _select(_cells(payload), filters)
+    kpis = app.agg_kpis(sel)
+    assert picked["count"].sum() == kpis["n"]
+    for col in app.KPI_COLUMNS:
+        yes = picked.loc[picked[col] == "Yes", "count"].sum()
+        assert (yes / kpis["n"] * 100 if kpis["n"] else None) == pytest.approx(kpis["rates"][col])
+    for factor in ["work_interfere", "benefits", "seek_help"]:
+        expected = app.agg_pair_counts(sel, factor).set_index([factor, "treatment"])["count"]
+        got = picked.groupby([factor, "treatment"])["count"].sum()
+        assert got[got > 0].to_dict() == expected.to_dict()
+
+
+def _strip(obj):
+    # interval endpoints may differ by one respondent (exact percentiles vs bootstrap)
+    if isinstance(obj, dict):
+        if obj.get("type") == "Small":
+            return None
+        return {k: _strip(v) for k, v in obj.items() if not k.endswith(("_lo", "_hi"))}
+    if isinstance(obj, list):
+        return [_strip(v) for v in obj]
+    return obj
+
+
+NODE_RUN = """
+global.window = {dash_clientside: {no_update: "NO_UPDATE"}};
+(0, eval)(require("fs").readFileSync(process.argv[1], "utf8"));
+const input = JSON.parse(require("fs").readFileSync(0, "utf8"));
+const out = input.selections.map(v => window.dash_clientside.clientFilter.update({values: v}, input.table));
+console.log(JSON.stringify(out));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_browser_update_matches_the_server_callback(payload):
+    stdin = json.dumps({"selections": SELECTIONS, "table": payload})
+    out = subprocess.run(["node", "-e", NODE_RUN, str(CLIENT_JS)], input=stdin, capture_output=True,
+                         text=True, check=True).stdout
+    for filters, client in zip(SELECTIONS, json.loads(out)):
+        server = app.update({"values": list(filters)}, None)
+        kpi = json.loads(json.dumps(server[0].to_plotly_json(), default=lambda c: c.to_plotly_json()))
+        assert _strip(client[0]) == _strip(kpi)
+        for spec, expected in zip(client[1:], server[1:-1]):
+            assert _strip(spec) == _strip(json.loads(json.dumps(expected)))
+
+
+def test_by_year_layout_turns_client_filtering_off(tmp_path):
+    root = tmp_path / "by_year"
+    pd.read_csv(DATA_RAW, dtype=str).iloc[:100].to_csv(tmp_path / "survey.csv", index=False)
+    ingest(discover_sources(tmp_path), root, chunksize=100, metadata_path=tmp_path / "meta.json")
+    code = ("import sys; from pathlib import Path; import src.config as c; "
+            "c.DATA_BY_YEAR = Path(sys.argv[1]); c.DATA_BY_YEAR_METADATA = Path(sys.argv[2]); "
+            "from src import app; print(app.CLIENT_FILTERING, getattr(app.client_table, 'data', None) is None)")
+    env = {**os.environ, "DASH_CLIENT_FILTERING": "1", "DASH_DATA_LAYOUT": "by_year"}
+    result = subprocess.run([sys.executable, "-c", code, str(root), str(tmp_path / "meta.json")], env=env,
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["False", "True"]
+    assert "does not support DASH_DATA_LAYOUT=by_year" in result.stderr
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.columnar import CURRENT, build_store, open_store, read_codebook, read_parquet_frame, store_dir, write_store
+from src.config import APP_COLUMNS, DATA_RAW
+from src.data.process import process, process_streaming
+
+
+@pytest.fixture(scope="module")
+def processed(tmp_path_factory):
+    frame = process(pd.read_csv(DATA_RAW, dtype=str))
+    path = tmp_path_factory.mktemp("columnar") / "cleaned.parquet"
+    frame.to_parquet(path, index=False)
+    return frame, path
+
+
+def test_read_parquet_frame_reads_text_as_categoricals(processed):
+    frame, path = processed
+    out = read_parquet_frame(path, ["year", "region", "treatment", "age_bin", "company_size", "nope"])
+    assert list(out.columns) == ["year", "region", "treatment", "age_bin", "company_size"]
+    assert pd.api.types.is_integer_dtype(out["year"])
+    for col in ["region", "treatment", "age_bin", "company_size"]:
+        assert isinstance(out[col].dtype, pd.CategoricalDtype)
+        assert out[col].astype(object).tolist() == frame[col].astype(object).tolist()
+    # the stored category order survives, not an alphabetical one
+    assert out["company_size"].cat.ordered
+    assert list(out["company_size"].cat.categories) == list(frame["company_size"].cat.categories)
+
+
+def _same_values(store, parquet):
+    # same values and dtypes; the category order of unordered text may differ
+    pd.testing.assert_frame_equal(store, parquet, check_categorical=False)
+    for col in parquet.select_dtypes("category"):
+        assert store[col].cat.ordered == parquet[col].cat.ordered
+
+
+def test_store_holds_the_app_columns_batch_by_batch(processed, tmp_path):
+    _, path = processed
+    root = tmp_path / "store"
+    assert build_store(path, root, "v1", APP_COLUMNS, batch_size=100) == len(processed[0])
+    assert sorted(p.stem for p in store_dir(root).glob("*.npy")) == sorted(APP_COLUMNS)
+    assert read_codebook(root)["data_version"] == "v1"
+    store = open_store(root, APP_COLUMNS)
+    _same_values(store, read_parquet_frame(path, APP_COLUMNS))
+    assert store["year"].dtype == "int32"
+    assert list(store["age_bin"].cat.categories) == list(processed[0]["age_bin"].cat.categories)
+
+
+def test_store_of_a_streamed_file_matches_its_frame(tmp_path):
+    # row groups with their own dictionaries, and a late chunk whose years are missing
+    raw = pd.read_csv(DATA_RAW, dtype=str).iloc[:300].copy()
+    raw.loc[250:, "Timestamp"] = "not a date"
+    raw_path = tmp_path / "survey.csv"
+    raw.to_csv(raw_path, index=False)
+    path = tmp_path / "cleaned.parquet"
+    process_streaming(120, path, raw_path)
+    build_store(path, tmp_path / "store", None, APP_COLUMNS, batch_size=64)
+    store = open_store(tmp_path / "store")
+    parquet = read_parquet_frame(path, APP_COLUMNS)
+    _same_values(store, parquet)
+    assert store["year"].isna().sum() == 50
+
+
+def test_write_store_keeps_numbers_numeric(tmp_path):
+    frame = pd.DataFrame({"year": [2014, 2016], "region": ["Europe", None]})
+    write_store(frame, tmp_path)
+    store = open_store(tmp_path)
+    assert store["year"].tolist() == [2014, 2016] and store["year"].dtype == "int64"
+    assert store["region"].cat.codes.tolist() == [0, -1]
+
+
+def test_rebuild_swaps_in_a_new_version_without_touching_open_stores(tmp_path):
+    root = tmp_path / "store"
+    # a flat store from before versioned builds is replaced on the first build
+    root.mkdir()
+    np.save(root / "old.npy", np.zeros(3))
+    write_store(pd.DataFrame({"year": [2014, 2014]}), root, "v1")
+    assert not (root / "old.npy").exists() and (root / CURRENT).is_symlink()
+    first = open_store(root)
+    for i in range(3):
+        write_store(pd.DataFrame({"year": [2016 + i] * 3}), root, f"v{i + 2}")
+    # the open frame still maps the arrays it opened, now unlinked
+    assert first["year"].tolist() == [2014, 2014]
+    assert open_store(root)["year"].tolist() == [2018] * 3
+    assert read_codebook(root)["data_version"] == "v4"
+    # the current version and the one before it are kept
+    assert len(list(root.glob("v-*"))) == 2
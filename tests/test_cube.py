@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cube import MISSING, CountCube, sparse_counts
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(2)
+    n = 2000
+    treatment = rng.choice(["Yes", "No"], n).astype(object)
+    treatment[rng.random(n) < 0.03] = None
+    return pd.DataFrame({
+        "year": rng.choice([2014, 2016], n),
+        "region": rng.choice(["Europe", "Asia", "North America"], n),
+        "age_bin": pd.Categorical(rng.choice(["<20", "20–29", "30–39"], n),
+                                  categories=["<20", "20–29", "30–39", "50+"], ordered=True),
+        "treatment": treatment,
+        "benefits": rng.choice(["Yes", "No", "Don't know"], n),
+    })
+
+
+def _rows(frame, sel):
+    mask = np.ones(len(frame), dtype=bool)
+    for col, selected in sel.items():
+        if selected:
+            mask &= frame[col].isin(selected).to_numpy()
+    return frame[mask]
+
+
+SELECTIONS = [
+    {},
+    {"year": [2014]},
+    {"year": [2016], "region": ["Europe", "Asia"]},
+    {"region": ["North America"], "age_bin": ["30–39", "50+"]},
+    {"region": ["Atlantis"]},
+]
+
+
+@pytest.mark.parametrize("sel", SELECTIONS)
+def test_table_matches_groupby(frame, sel):
+    cube = CountCube(frame, ["year", "region", "age_bin"], ["treatment", "benefits"])
+    rows = _rows(frame, sel)
+    assert cube.total(sel) == len(rows)
+    got = cube.table(sel, ["benefits", "treatment"])
+    expected = (rows.fillna({"treatment": MISSING})
+                .groupby(["benefits", "treatment"]).size().rename("count").reset_index())
+    got = got.sort_values(["benefits", "treatment"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_table_keeps_category_order_and_drops_empty_cells(frame):
+    cube = CountCube(frame, ["year"], ["age_bin"])
+    assert cube.domains["age_bin"] == ["<20", "20–29", "30–39", "50+"]
+    # "50+" has no rows, so it has no row in the table either
+    assert cube.table({}, ["age_bin"])["age_bin"].tolist() == ["<20", "20–29", "30–39"]
+
+
+def test_missing_values_get_their_own_slot(frame):
+    cube = CountCube(frame, [], ["treatment"])
+    t = cube.table({}, ["treatment"]).set_index("treatment")["count"]
+    assert t[MISSING] == frame["treatment"].isna().sum()
+
+
+def test_sparse_counts_rebuild_the_cube(frame):
+    cols = ["year", "region", "age_bin", "treatment", "benefits"]
+    cube = CountCube(frame, cols[:3], cols[3:])
+    table = sparse_counts(frame, cols)
+    assert table["dims"] == cols
+    assert table["domains"] == cube.domains
+    dense = np.zeros(int(np.prod(table["shape"])), dtype=np.int64)
+    dense[table["cells"]] = table["counts"]
+    np.testing.assert_array_equal(dense.reshape(table["shape"]), cube.counts)
+    assert all(c > 0 for c in table["counts"])
@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from src import app, export_charts
+
+
+def test_grid_expands_each_lists_and_blanks():
+    combos = export_charts.grid(app, {"year": "each", "region": "Europe,Asia", "gender": ""})
+    assert len(combos) == 2 * len(app.years)
+    assert combos[0] == {"year": app.years[0], "region": "Europe"}
+    assert export_charts.grid(app, {}) == [{}]
+    with pytest.raises(SystemExit, match="Atlantis"):
+        export_charts.grid(app, {"region": "Atlantis"})
+
+
+def test_slug_is_a_safe_directory_name():
+    assert export_charts._slug({}) == "all"
+    assert export_charts._slug({"year": 2014, "company_size": "More than 1000"}) == \
+        "year=2014_company_size=More-than-1000"
+
+
+def test_export_renders_once_and_skips_unchanged_charts(tmp_path):
+    grid = {"year": str(app.years[0]), "region": "Europe"}
+    first = export_charts.export(grid, tmp_path, fmt="svg", workers=1)
+    assert first == {"combinations": 1, "rendered": 4, "skipped": 0}
+    manifest = json.loads((tmp_path / export_charts.MANIFEST).read_text())
+    assert len(manifest) == 4
+    for rel in manifest:
+        assert (tmp_path / rel).read_text().lstrip().startswith("<svg")
+    assert export_charts.export(grid, tmp_path, fmt="svg", workers=1)["skipped"] == 4
+    # a missing file is rendered again even though its spec is unchanged
+    (tmp_path / sorted(manifest)[0]).unlink()
+    assert export_charts.export(grid, tmp_path, fmt="svg", workers=1)["rendered"] == 1
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.filter_index import FilterIndex
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(1)
+    n = 1003  # not a multiple of 8, so the padding bits matter
+    region = rng.choice(["North America", "Europe", "Asia", "Oceania"], n).astype(object)
+    region[rng.random(n) < 0.05] = None
+    return pd.DataFrame({
+        "year": rng.choice([2014, 2016], n),
+        "region": pd.Categorical(region),
+        "gender": rng.choice(["Male", "Female", "Non-binary / Other"], n),
+        "age_bin": pd.Categorical(rng.choice(["<20", "20–29", "30–39", "40–49", "50+"], n)),
+    })
+
+
+def _expected(frame, sel):
+    mask = np.ones(len(frame), dtype=bool)
+    for col, selected in sel.items():
+        if selected:
+            mask &= frame[col].isin(selected).to_numpy()
+    return mask
+
+
+SELECTIONS = [
+    {"year": [2014]},
+    {"year": [np.int64(2016)], "gender": ["Male"]},
+    {"region": ["Europe", "Asia"], "age_bin": ["20–29", "30–39", "40–49", "50+"]},
+    # every value of a column with missing rows still drops those rows
+    {"region": ["North America", "Europe", "Asia", "Oceania"]},
+    # every value of a complete column is no filter at all
+    {"gender": ["Male", "Female", "Non-binary / Other"], "age_bin": ["<20"]},
+    {"gender": ["Male", "Female"], "region": None, "age_bin": []},
+    {"region": ["Atlantis"]},
+    {"region": ["Atlantis", "Europe"], "year": [2014, 2016]},
+]
+
+
+@pytest.mark.parametrize("sel", SELECTIONS)
+def test_mask_matches_chained_isin(frame, sel):
+    index = FilterIndex(frame, frame.columns)
+    expected = _expected(frame, sel)
+    mask = index.mask(sel)
+    if mask is None:
+        assert expected.all()
+    else:
+        np.testing.assert_array_equal(mask, expected)
+        np.testing.assert_array_equal(index.rows(sel), np.flatnonzero(expected))
+
+
+def test_repeated_lookups_do_not_touch_the_index(frame):
+    index = FilterIndex(frame, frame.columns)
+    before = [index.mask(sel) for sel in SELECTIONS]
+    after = [index.mask(sel) for sel in SELECTIONS]
+    for a, b in zip(before, after):
+        assert (a is None and b is None) or np.array_equal(a, b)
+
+
+def test_no_selection_is_no_filter(frame):
+    index = FilterIndex(frame, frame.columns)
+    assert index.mask({"year": None, "gender": []}) is None
+    assert index.rows({}) is None
+
+
+def test_missing_column_raises(frame):
+    with pytest.raises(KeyError, match="remote_work"):
+        FilterIndex(frame, ["year", "remote_work"])
+    index = FilterIndex(frame, ["year"])
+    with pytest.raises(KeyError, match="gender"):
+        index.mask({"gender": ["Male"]})
+    # an empty selection of an unindexed column filters nothing, so it is allowed
+    assert index.mask({"gender": None}) is None
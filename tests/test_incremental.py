@@ -0,0 +1,143 @@
+import pandas as pd
+import pyarrow.dataset as ds
+import pytest
+
+from src.config import DATA_RAW
+from src.data import incremental
+from src.data.load_raw import data_start, iter_raw
+from src.data.metadata import read_metadata
+from src.data.multiyear import ingest, source_for
+from src.data.watermark import read_state, watermark_path
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return {"raw": tmp_path / "survey.csv", "root": tmp_path / "by_year", "meta": tmp_path / "meta.json"}
+
+
+@pytest.fixture(scope="module")
+def raw_frame():
+    return pd.read_csv(DATA_RAW, dtype=str).sort_values("Timestamp", kind="stable").reset_index(drop=True)
+
+
+def _run(paths, frame):
+    frame.to_csv(paths["raw"], index=False)
+    return incremental.process_incremental(50, paths["root"], raw_path=paths["raw"], metadata_path=paths["meta"])
+
+
+def _rows(paths):
+    return ds.dataset(paths["root"], format="parquet", partitioning="hive").count_rows()
+
+
+def _state(paths):
+    return read_state(watermark_path(paths["root"], paths["raw"]))
+
+
+def _count_parsed(monkeypatch):
+    parsed = []
+    real = incremental.iter_raw
+
+    def counting(*args, **kwargs):
+        for chunk in real(*args, **kwargs):
+            parsed.append(len(chunk))
+            yield chunk
+
+    monkeypatch.setattr(incremental, "iter_raw", counting)
+    return parsed
+
+
+def test_byte_range_reads_the_same_rows(tmp_path, raw_frame):
+    path = tmp_path / "survey.csv"
+    raw_frame.iloc[:100].to_csv(path, index=False)
+    split = path.stat().st_size
+    raw_frame.iloc[:130].to_csv(path, index=False)
+    head = pd.concat(iter_raw(40, path, 0, split), ignore_index=True)
+    tail = pd.concat(iter_raw(40, path, split), ignore_index=True)
+    pd.testing.assert_frame_equal(head, raw_frame.iloc[:100].reset_index(drop=True))
+    pd.testing.assert_frame_equal(tail, raw_frame.iloc[100:130].reset_index(drop=True))
+    assert list(iter_raw(40, path, data_start(path), data_start(path))) == []
+
+
+def test_second_run_adds_nothing(paths, raw_frame):
+    assert _run(paths, raw_frame.iloc[:200]) == 200
+    assert _run(paths, raw_frame.iloc[:200]) == 0
+    assert _rows(paths) == 200
+    assert _state(paths)["rows"] == 200
+    assert read_metadata(paths["root"], paths["meta"])["rows"] == 200
+
+
+def test_appended_rows_are_read_from_the_watermark_offset(paths, raw_frame, monkeypatch):
+    _run(paths, raw_frame.iloc[:200])
+    parsed = _count_parsed(monkeypatch)
+    assert _run(paths, raw_frame.iloc[:230]) == 30
+    assert sum(parsed) == 30
+    assert _rows(paths) == 230
+    assert read_metadata(paths["root"], paths["meta"])["rows"] == 230
+
+
+def test_rewritten_export_is_rescanned_past_the_watermark(paths, raw_frame, monkeypatch):
+    _run(paths, raw_frame.iloc[:100])
+    parsed = _count_parsed(monkeypatch)
+    # the same rows re-exported in another order, with 20 newer ones
+    rewritten = pd.concat([raw_frame.iloc[:100].iloc[::-1], raw_frame.iloc[100:120]])
+    assert _run(paths, rewritten) == 20
+    assert sum(parsed) == 120
+    assert _rows(paths) == 120
+
+
+def test_rows_sharing_the_watermark_second_are_picked_up(paths, raw_frame):
+    first = raw_frame.iloc[:100]
+    _run(paths, first)
+    # two rows land in the same second as the last processed one, and the export is rewritten
+    late = raw_frame.iloc[[100, 101]].assign(Timestamp=first["Timestamp"].iloc[-1])
+    assert _run(paths, pd.concat([late, first])) == 2
+    assert _run(paths, pd.concat([late, first])) == 0
+    assert _rows(paths) == 102
+
+
+def test_identical_rows_at_the_watermark_are_counted(paths, raw_frame):
+    first = pd.concat([raw_frame.iloc[:10], raw_frame.iloc[[9]]])
+    _run(paths, first)
+    assert _run(paths, pd.concat([raw_frame.iloc[[9]], first])) == 1
+    assert _rows(paths) == 12
+
+
+def test_runs_append_to_the_ingested_dataset(paths, raw_frame):
+    raw_frame.iloc[:150].to_csv(paths["raw"], index=False)
+    assert ingest([source_for(paths["raw"])], paths["root"], chunksize=50, metadata_path=paths["meta"]) == 150
+    assert _run(paths, raw_frame.iloc[:150]) == 0
+    assert _run(paths, raw_frame.iloc[:180]) == 30
+    assert _rows(paths) == 180
+    assert read_metadata(paths["root"], paths["meta"])["rows"] == 180
+
+
+def test_crash_before_commit_does_not_duplicate(paths, raw_frame, monkeypatch):
+    _run(paths, raw_frame.iloc[:100])
+    real = incremental.write_watermark
+
+    def crash(*args, pending=None, **kwargs):
+        if pending:
+            raise OSError("disk full")
+        real(*args, pending=pending, **kwargs)
+
+    monkeypatch.setattr(incremental, "write_watermark", crash)
+    with pytest.raises(OSError):
+        _run(paths, raw_frame.iloc[:300])
+    monkeypatch.setattr(incremental, "write_watermark", real)
+    assert _rows(paths) == 100
+    assert _run(paths, raw_frame.iloc[:300]) == 200
+    assert _rows(paths) == 300
+
+
+def test_crash_after_commit_publishes_on_next_run(paths, raw_frame, monkeypatch):
+    _run(paths, raw_frame.iloc[:100])
+    real = incremental._publish
+    monkeypatch.setattr(incremental, "_publish", lambda root, run_id: (_ for _ in ()).throw(OSError("killed")))
+    with pytest.raises(OSError):
+        _run(paths, raw_frame.iloc[:300])
+    monkeypatch.setattr(incremental, "_publish", real)
+    assert _state(paths)["pending"]
+    assert _run(paths, raw_frame.iloc[:300]) == 0
+    assert _rows(paths) == 300
+    assert not (paths["root"] / incremental.STAGING_DIR).exists()
+    assert read_metadata(paths["root"], paths["meta"])["rows"] == 300
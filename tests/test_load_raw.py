@@ -0,0 +1,53 @@
+import re
+
+import pandas as pd
+import pytest
+
+from src.config import DATA_RAW
+from src.data.describe_raw import make_eda_report
+from src.data.load_raw import RAW_SCHEMA, check_header, iter_raw, load_raw, load_raw_inferred
+from src.data.process import process, raw_read_plan
+
+
+@pytest.fixture
+def messy(tmp_path):
+    # a BOM before the first name, an extra column and ages that are not integers
+    raw = pd.read_csv(DATA_RAW, dtype=str).iloc[:50].copy()
+    raw["Extra"] = "x"
+    raw.loc[0, "Age"] = "32.5"
+    raw.loc[1, "Age"] = "abc"
+    path = tmp_path / "survey.csv"
+    path.write_bytes(b"\xef\xbb\xbf" + raw.to_csv(index=False).encode("utf-8"))
+    return path
+
+
+def test_check_header_rejects_unknown_and_missing_columns(messy):
+    with pytest.raises(ValueError, match=r"unknown columns \['Extra'\]"):
+        check_header(messy)
+    header = check_header(messy, ["Timestamp", "Age"], allow_unknown=True)
+    assert header[0] == "Timestamp" and "Extra" in header
+    with pytest.raises(ValueError, match="Nope"):
+        check_header(messy, ["Timestamp", "Nope"], allow_unknown=True)
+    assert check_header(DATA_RAW) == RAW_SCHEMA.names
+
+
+def test_both_readers_clean_to_the_same_frame(messy):
+    columns, dictionary = raw_read_plan()
+    loaded = load_raw(messy, columns, dictionary, allow_unknown=True)
+    assert "Timestamp" in loaded.columns and "Extra" not in loaded.columns
+    fast = process(loaded)
+    batch = process(pd.concat(iter_raw(20, messy), ignore_index=True))
+    pd.testing.assert_frame_equal(fast, batch)
+    assert fast["age"][0] == 32.5 and pd.isna(fast["age"][1])
+
+
+def test_eda_report_keeps_inferred_types():
+    assert pd.api.types.is_string_dtype(load_raw()["Age"])
+    report = make_eda_report(load_raw_inferred())
+    assert re.search(r"\| Age +\| int64 +\|", report)
+
+
+def test_free_text_country_is_not_dictionary_encoded():
+    columns, dictionary = raw_read_plan()
+    assert "Country" in columns and "Country" not in dictionary
+    assert "treatment" in dictionary
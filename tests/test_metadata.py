@@ -0,0 +1,47 @@
+import pandas as pd
+
+from src.data.metadata import data_version, filter_domains, read_metadata, stat_signature, write_metadata
+
+
+def _frame():
+    return pd.DataFrame({
+        "year": [2016, 2014, 2014],
+        "region": ["Europe", "Asia", None],
+        "age_bin": pd.Categorical(["30–39", "<20", "30–39"],
+                                  categories=["<20", "20–29", "30–39"], ordered=True),
+        "treatment": ["Yes", "No", "Yes"],
+    })
+
+
+def test_filter_domains_sort_values_and_keep_category_order():
+    domains = filter_domains(_frame())
+    assert domains == {"year": [2014, 2016], "region": ["Asia", "Europe"], "age_bin": ["<20", "30–39"]}
+    merged = filter_domains(_frame().iloc[:1], {"region": ["Oceania"], "year": [2015]})
+    assert merged["region"] == ["Europe", "Oceania"] and merged["year"] == [2015, 2016]
+
+
+def test_sidecar_is_ignored_once_the_data_changes(tmp_path):
+    data = tmp_path / "cleaned.parquet"
+    meta = tmp_path / "cleaned.meta.json"
+    _frame().to_parquet(data, index=False)
+    write_metadata(filter_domains(_frame()), 3, data, meta)
+    assert read_metadata(data, meta)["rows"] == 3
+    _frame().iloc[:2].to_parquet(data, index=False)
+    assert read_metadata(data, meta) is None
+
+
+def test_parquet_version_survives_a_rewrite_of_the_same_bytes(tmp_path):
+    data = tmp_path / "cleaned.parquet"
+    _frame().to_parquet(data, index=False)
+    version = data_version(data)
+    data.write_bytes(data.read_bytes())  # e.g. a fresh checkout: new mtime, same footer
+    assert data_version(data) == version
+
+
+def test_stat_signature_moves_with_the_file(tmp_path):
+    data = tmp_path / "cleaned.parquet"
+    _frame().to_parquet(data, index=False)
+    signature = stat_signature(data)
+    assert stat_signature(data) == signature
+    _frame().iloc[:1].to_parquet(data, index=False)
+    assert stat_signature(data) != signature
@@ -0,0 +1,132 @@
+import pandas as pd
+import pytest
+
+from src import app
+from src.config import DATA_RAW
+from src.data import metadata, multiyear
+from src.data.multiyear import discover_sources, ingest
+from src.data.process import COLUMN_MAP, SURVEY_COLUMN_MAPS, SURVEY_YES_NO_MAPS, detect_layout, process
+from src.data.watermark import read_state, watermark_path
+
+
+COLUMN_MAP_BY_NAME = {v: k for k, v in COLUMN_MAP.items()}
+
+
+@pytest.fixture(scope="module")
+def raw_2014():
+    return pd.read_csv(DATA_RAW, dtype=str).iloc[:300]
+
+
+def _as_2016(raw):
+    # the 2014 rows under the 2016 question texts, treatment coded 1/0 and no Timestamp
+    to_2016 = {COLUMN_MAP_BY_NAME[v]: k for k, v in SURVEY_COLUMN_MAPS["osmi-2016"].items()}
+    out = raw[list(to_2016)].rename(columns=to_2016)
+    treatment = to_2016["treatment"]
+    out[treatment] = out[treatment].map({"Yes": "1", "No": "0"})
+    return out
+
+
+@pytest.fixture
+def raw_dir(tmp_path, raw_2014):
+    d = tmp_path / "raw"
+    d.mkdir()
+    raw_2014.to_csv(d / "survey.csv", index=False)
+    _as_2016(raw_2014).to_csv(d / "osmi-2016.csv", index=False)
+    return d
+
+
+def test_detect_layout(raw_2014):
+    assert detect_layout(raw_2014.columns) == "osmi-2014"
+    assert detect_layout(_as_2016(raw_2014).columns) == "osmi-2016"
+    with pytest.raises(ValueError, match="No known survey layout"):
+        detect_layout(["id", "score"])
+
+
+def test_discover_sources_names_the_file_it_cannot_place(raw_dir):
+    pd.DataFrame({"id": [1]}).to_csv(raw_dir / "other.csv", index=False)
+    with pytest.raises(ValueError, match="other.csv"):
+        discover_sources(raw_dir)
+
+
+def test_numeric_answers_only_map_for_the_2016_layout():
+    raw = pd.DataFrame({"treatment": ["1", "0", "Yes"], "Timestamp": ["2014-08-27 11:29:31"] * 3})
+    assert process(raw)["treatment"].tolist() == ["1", "0", "Yes"]
+    col_map = {"treatment": "treatment", "Timestamp": "timestamp"}
+    out = process(raw, col_map, yes_no_map=SURVEY_YES_NO_MAPS["osmi-2016"])
+    assert out["treatment"].tolist() == ["Yes", "No", "Yes"]
+
+
+def test_ingest_partitions_by_year_and_reads_one_year(raw_dir, tmp_path, raw_2014):
+    root = tmp_path / "by_year"
+    sources = discover_sources(raw_dir)
+    assert [(s.path.name, s.layout, s.survey_year) for s in sources] == [
+        ("osmi-2016.csv", "osmi-2016", 2016), ("survey.csv", "osmi-2014", None)]
+    rows = ingest(sources, root, chunksize=100, metadata_path=tmp_path / "meta.json")
+    assert rows == 2 * len(raw_2014)
+    assert app.dataset_years(root) == [2014, 2016]
+    year_2016 = app.load_dashboard_data(root, year=2016)
+    assert len(year_2016) == len(raw_2014)
+    expected = process(raw_2014)["treatment"]
+    assert year_2016["treatment"].astype(str).tolist() == expected.tolist()
+
+
+def test_failed_ingest_leaves_the_live_dataset(raw_dir, tmp_path, monkeypatch, raw_2014):
+    root = tmp_path / "by_year"
+    ingest(discover_sources(raw_dir), root, chunksize=100, metadata_path=root / "_metadata.json")
+    version = metadata.data_version(root)
+    calls = []
+
+    def crash(table, build, basename):
+        calls.append(basename)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        real(table, build, basename)
+
+    real = multiyear.write_partitioned
+    monkeypatch.setattr(multiyear, "write_partitioned", crash)
+    with pytest.raises(OSError):
+        ingest(discover_sources(raw_dir), root, chunksize=100, metadata_path=root / "_metadata.json")
+    monkeypatch.setattr(multiyear, "write_partitioned", real)
+    assert metadata.data_version(root) == version
+    assert app.dataset_years(root) == [2014, 2016]
+    assert metadata.read_metadata(root, root / "_metadata.json")["rows"] == 2 * len(raw_2014)
+    # the abandoned build is cleared by the next run
+    assert ingest(discover_sources(raw_dir), root, chunksize=100, metadata_path=root / "_metadata.json")
+    assert [p.name for p in tmp_path.iterdir() if "by_year" in p.name] == ["by_year"]
+    assert metadata.read_metadata(root, root / "_metadata.json")["rows"] == 2 * len(raw_2014)
+
+
+def test_rows_without_a_year_are_left_out_and_counted(tmp_path, raw_2014):
+    # no Timestamp column and no year in the file name
+    path = tmp_path / "osmi.csv"
+    _as_2016(raw_2014).to_csv(path, index=False)
+    source = multiyear.source_for(path)
+    assert source.survey_year is None
+    root = tmp_path / "by_year"
+    assert ingest([source], root, chunksize=100, metadata_path=tmp_path / "meta.json") == 0
+    assert read_state(watermark_path(root, path))["dropped"] == len(raw_2014)
+    assert not list(root.glob("year=*"))
+
+
+def test_dataset_version_only_rereads_changed_partitions(raw_dir, tmp_path, monkeypatch):
+    root = tmp_path / "by_year"
+    ingest(discover_sources(raw_dir), root, chunksize=100, metadata_path=tmp_path / "meta.json")
+    reads = []
+    real = metadata._file_version
+    monkeypatch.setattr(metadata, "_file_version", lambda p: reads.append(p) or real(p))
+    version = metadata.data_version(root)
+    reads.clear()
+    assert metadata.data_version(root) == version
+    assert reads == []
+    changed = sorted((root / "year=2016").glob("*.parquet"))[0]
+    pd.read_parquet(changed).iloc[:5].to_parquet(changed)
+    assert metadata.data_version(root) != version
+    assert reads == [changed]
+
+
+def test_missing_dataset_names_the_command_that_builds_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "DATA_BY_YEAR", tmp_path / "by_year")
+    with pytest.raises(FileNotFoundError, match="src.data.multiyear"):
+        app.load_dashboard_data(tmp_path / "by_year")
+    with pytest.raises(FileNotFoundError, match="src.data.process"):
+        app.load_dashboard_data(tmp_path / "cleaned.parquet")
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from src.config import DATA_RAW
+from src.data import parallel, process
+from src.data.load_raw import iter_raw, split_ranges
+
+
+@pytest.fixture(scope="module")
+def raw():
+    raw = pd.read_csv(DATA_RAW, dtype=str).iloc[:400].copy()
+    # unparseable timestamps in one row range only: that range's years are all missing
+    raw.loc[350:, "Timestamp"] = "not a date"
+    return raw
+
+
+@pytest.fixture
+def raw_path(raw, tmp_path):
+    path = tmp_path / "survey.csv"
+    raw.to_csv(path, index=False)
+    return path
+
+
+def test_ranges_cover_every_record_once(raw, tmp_path):
+    path = tmp_path / "survey.csv"
+    # answers spanning lines, so some of the cuts fall inside one and must move past it
+    quoted = raw.assign(comments=raw["comments"].where(raw.index % 2 == 1, "a \"quoted\"\nanswer\non\nfive\nlines"))
+    quoted.to_csv(path, index=False)
+    ranges = split_ranges(path, 9)
+    assert len(ranges) == 9
+    assert all(a < b for a, b in ranges)
+    assert all(b == a for (_, b), (a, _) in zip(ranges, ranges[1:]))
+    parts = pd.concat([pd.concat(iter_raw(50, path, a, b)) for a, b in ranges], ignore_index=True)
+    pd.testing.assert_frame_equal(parts, quoted.reset_index(drop=True))
+
+
+def test_workers_write_their_own_parts(raw_path, tmp_path, monkeypatch):
+    seen = []
+    real = process._clean_range
+
+    def record(path, start, end, part, *args):
+        seen.append((start, end, part))
+        return real(path, start, end, part, *args)
+
+    # the parent hands out offsets and paths only, and reads nothing back but row counts
+    monkeypatch.setattr(process, "_clean_range", record)
+    monkeypatch.setattr(parallel, "ProcessPoolExecutor", None)
+    assert process.process_parallel(1, tmp_path / "out" / "cleaned.parquet", raw_path, chunksize=60) == 400
+    assert len(seen) == 2
+    assert [p.name for _, _, p in seen] == ["part-00000", "part-00001"]
+
+
+def test_parallel_output_is_byte_identical_for_any_worker_count(raw, raw_path, tmp_path):
+    outputs = {}
+    for workers in (1, 2, 3):
+        out = tmp_path / f"w{workers}" / "cleaned.parquet"
+        assert process.process_parallel(workers, out, raw_path, chunksize=60) == 400
+        outputs[workers] = out
+        assert not list(out.parent.glob(".*"))
+    for name in ["cleaned.parquet", "cleaned.csv", "cleaned.meta.json"]:
+        assert len({(o.parent / name).read_bytes() for o in outputs.values()}) == 1
+    # the same rows and types as the serial streaming path
+    serial = tmp_path / "serial" / "cleaned.parquet"
+    process.process_streaming(60, serial, raw_path)
+    pd.testing.assert_frame_equal(pd.read_parquet(outputs[2]), pd.read_parquet(serial))
+    assert outputs[2].with_suffix(".csv").read_bytes() == serial.with_suffix(".csv").read_bytes()
@@ -0,0 +1,66 @@
+from dataclasses import replace
+
+import pandas as pd
+import pytest
+
+from src.config import DATA_RAW
+from src.data import process
+from src.data.pipeline import StageCache, build_stages, run_pipeline, stage_keys
+
+
+@pytest.fixture
+def paths(tmp_path):
+    raw = tmp_path / "survey.csv"
+    pd.read_csv(DATA_RAW, dtype=str).iloc[:200].to_csv(raw, index=False)
+    return {"raw_path": raw, "parquet_path": tmp_path / "cleaned.parquet",
+            "metadata_path": tmp_path / "cleaned.meta.json", "store_path": tmp_path / "store"}
+
+
+def _run(paths, tmp_path, **kwargs):
+    return run_pipeline(build_stages(**paths), StageCache(tmp_path / "cache"), **kwargs)
+
+
+def test_pipeline_output_matches_the_batch_cleaning(paths, tmp_path):
+    report = _run(paths, tmp_path)
+    assert list(report) == ["load", "normalize", "derive", "write", "index", "store"]
+    assert "cached" not in report.values()
+    expected = process.process(pd.read_csv(paths["raw_path"], dtype=str))
+    got = pd.read_parquet(paths["parquet_path"])
+    pd.testing.assert_frame_equal(got, expected.reset_index(drop=True))
+
+
+def test_rerun_reuses_every_stage(paths, tmp_path):
+    _run(paths, tmp_path)
+    assert set(_run(paths, tmp_path).values()) == {"cached"}
+    assert "cached" not in _run(paths, tmp_path, force=True).values()
+
+
+def test_changed_raw_file_reruns_from_load(paths, tmp_path):
+    _run(paths, tmp_path)
+    raw = pd.read_csv(paths["raw_path"], dtype=str)
+    raw.iloc[:150].to_csv(paths["raw_path"], index=False)
+    assert "cached" not in _run(paths, tmp_path).values()
+    assert len(pd.read_parquet(paths["parquet_path"])) == 150
+
+
+def test_changed_code_reruns_only_downstream_stages(paths, tmp_path):
+    stages = build_stages(**paths)
+    changed = [replace(st, code=st.code + ("v2",)) if st.name == "derive" else st for st in stages]
+    before, after = stage_keys(stages), stage_keys(changed)
+    assert [n for n in before if before[n] != after[n]] == ["derive", "write", "index", "store"]
+    cache = StageCache(tmp_path / "cache")
+    run_pipeline(stages, cache)
+    report = run_pipeline(changed, cache)
+    assert [n for n, r in report.items() if r == "cached"] == ["load", "normalize"]
+
+
+def test_missing_output_reruns_the_stage_that_writes_it(paths, tmp_path):
+    _run(paths, tmp_path)
+    paths["metadata_path"].unlink()
+    report = _run(paths, tmp_path)
+    assert report["index"] != "cached"
+    assert paths["metadata_path"].exists()
+    assert all(report[n] == "cached" for n in ["load", "normalize", "derive", "write", "store"])
+    # one cache entry per stage
+    names = [p.name.split("-")[0] for p in (tmp_path / "cache").iterdir()]
+    assert sorted(names) == sorted(set(names))
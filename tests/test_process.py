@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.config import DATA_RAW
+from src.data.process import (
+    _map_distinct,
+    normalize_gender,
+    normalize_yes_no_unknown,
+    process,
+    process_streaming,
+    processed_schema,
+)
+from src.data import process as process_module
+
+
+def test_map_distinct_matches_elementwise_apply():
+    s = pd.Series(["Yes", " no", None, "Don't know", "yes", np.nan, "maybe", "Yes"])
+    out = _map_distinct(s, normalize_yes_no_unknown)
+    assert out.tolist() == [normalize_yes_no_unknown(v) for v in s]
+    assert out.index.equals(s.index)
+
+
+def test_map_distinct_keeps_index_and_name():
+    s = pd.Series(["Male", "f", "Woman", None], index=[10, 11, 12, 13], name="gender_raw")
+    out = _map_distinct(s, normalize_gender)
+    assert out.name == "gender_raw"
+    assert out.to_dict() == {10: "Male", 11: "Female", 12: "Female", 13: "Prefer not to say / Unknown"}
+
+
+def test_map_distinct_calls_normalizer_once_per_value():
+    calls = []
+
+    def fn(v):
+        calls.append(v)
+        return v
+
+    _map_distinct(pd.Series(["a", "b", "a", None, "b", None]), fn)
+    # the distinct values plus one call for the missing slot
+    assert calls == ["a", "b", None]
+
+
+def _raw(tmp_path, frame):
+    path = tmp_path / "survey.csv"
+    frame.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture(scope="module")
+def raw_frame():
+    return pd.read_csv(DATA_RAW, dtype=str)
+
+
+def test_streaming_matches_batch(tmp_path, raw_frame):
+    raw = _raw(tmp_path, raw_frame)
+    rows = process_streaming(300, tmp_path / "out.parquet", raw)
+    batch = process(pd.read_csv(raw, dtype=str))
+    assert rows == len(batch)
+    streamed = pd.read_parquet(tmp_path / "out.parquet")
+    pd.testing.assert_frame_equal(streamed, batch.reset_index(drop=True), check_dtype=False,
+                                  check_categorical=False)
+    assert (tmp_path / "out.csv").read_text() == batch.to_csv(index=False)
+    assert (tmp_path / "out.meta.json").exists()
+
+
+def test_streaming_csv_follows_the_declared_schema(tmp_path, raw_frame):
+    frame = raw_frame.copy()
+    # a later chunk with an unreadable Timestamp gets a float year from pandas
+    frame.loc[700, "Timestamp"] = "not a date"
+    process_streaming(300, tmp_path / "out.parquet", _raw(tmp_path, frame))
+    years = pd.read_csv(tmp_path / "out.csv", dtype=str, keep_default_na=False)["year"]
+    assert years.iloc[700] == ""
+    assert set(years.drop(index=700)) <= {"2014", "2015", "2016"}
+
+
+def test_streaming_empty_input_raises(tmp_path, raw_frame):
+    raw = _raw(tmp_path, raw_frame.iloc[:0])
+    with pytest.raises(ValueError, match="No data rows"):
+        process_streaming(100, tmp_path / "out.parquet", raw)
+    assert not (tmp_path / "out.meta.json").exists()
+
+
+def test_processed_schema_has_no_untyped_columns():
+    schema = processed_schema()
+    assert schema.names == [c for c in process_module.PROCESSED_COLUMNS if c in schema.names]
+    assert not any(str(f.type) == "null" for f in schema)
+    assert str(schema.field("year").type) == "int32"
+
+
+def test_streaming_survives_a_first_chunk_with_an_all_null_column(tmp_path, raw_frame, monkeypatch):
+    # the first chunk is all outside the US, so its state column has no values; as object
+    # columns (what pandas 2 reads) that chunk alone would type state as null
+    frame = pd.concat([raw_frame[raw_frame["state"].isna()].iloc[:100],
+                       raw_frame[raw_frame["state"].notna()].iloc[:200]], ignore_index=True)
+    raw = _raw(tmp_path, frame)
+    real = process_module.iter_raw
+    monkeypatch.setattr(process_module, "iter_raw", lambda *a: (c.astype(object) for c in real(*a)))
+    assert process_streaming(100, tmp_path / "out.parquet", raw) == 300
+    streamed = pd.read_parquet(tmp_path / "out.parquet")
+    assert streamed["state"].iloc[:100].isna().all()
+    assert streamed["state"].iloc[100:].tolist() == process(frame)["state"].iloc[100:].tolist()
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.config import DATA_RAW
+from src.data.profile import MISSING, CountMinSketch, HyperLogLog, MisraGries, _hash, profile_chunks
+
+
+def test_hyperloglog_is_close_to_the_distinct_count():
+    for n in [10, 1000, 50_000]:
+        hll = HyperLogLog(14)
+        values = pd.Series([f"v{i}" for i in range(n)] * 2, dtype=object)
+        hll.add_hashes(_hash(values))
+        assert abs(hll.estimate() - n) <= max(1, 0.03 * n)
+
+
+def test_count_min_never_underestimates():
+    rng = np.random.default_rng(0)
+    counts = pd.Series(rng.integers(1, 50, 5000), index=[f"k{i}" for i in range(5000)])
+    cms = CountMinSketch(width=512, depth=4)
+    h = _hash(pd.Series(counts.index, dtype=object))
+    cms.add_hashes(h, counts.to_numpy())
+    assert (cms.estimate_hashes(h) >= counts.to_numpy()).all()
+
+
+def test_misra_gries_keeps_heavy_hitters_within_its_error():
+    rng = np.random.default_rng(1)
+    values = np.concatenate([np.repeat(["a", "b", "c"], [3000, 2000, 1000]),
+                             [f"noise{i}" for i in rng.integers(0, 5000, 4000)]])
+    rng.shuffle(values)
+    truth = pd.Series(values).value_counts()
+    mg = MisraGries(k=16)
+    for chunk in np.array_split(values, 7):
+        mg.update(pd.Series(chunk).value_counts())
+    for v in ["a", "b", "c"]:
+        assert truth[v] - mg.error <= mg.counts[v] <= truth[v]
+
+
+@pytest.fixture(scope="module")
+def raw():
+    return pd.read_csv(DATA_RAW, dtype=str)
+
+
+def test_streaming_profile_matches_the_in_memory_frame(raw):
+    profiles = profile_chunks(raw.iloc[i:i + 300] for i in range(0, len(raw), 300))
+    inferred = pd.read_csv(DATA_RAW)
+    for col in ["Age", "Gender", "Country", "treatment", "comments"]:
+        p = profiles[col]
+        assert p.rows == len(raw)
+        assert p.missing == raw[col].isna().sum()
+        assert p.dtype() == str(inferred[col].dtype)
+        assert abs(p.hll.estimate() - raw[col].nunique()) <= max(2, 0.03 * raw[col].nunique())
+        expected = raw[col].fillna(MISSING).value_counts()
+        top = p.top(3).set_index("value")["count"]
+        # every count is an upper bound; the heaviest values are never pushed out
+        assert all(top[v] >= expected[v] for v in top.index)
+        assert expected.index[0] in top.index
+        # low-cardinality columns fit in the counters, so their counts are exact
+        if raw[col].nunique() < 64:
+            assert top.to_dict() == {v: expected[v] for v in top.index}
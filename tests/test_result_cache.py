@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+
+from src import result_cache
+from src.result_cache import ResultCache, normalize_key
+
+
+def test_normalize_key_treats_equivalent_states_alike():
+    assert normalize_key(2014, ["b", "a", "a"], None) == normalize_key("2014", ("a", "b"), [])
+    assert normalize_key(None, "", []) == (None, None, None)
+    assert normalize_key(["a"]) != normalize_key(["a", "b"])
+
+
+def test_memory_tier_is_lru():
+    cache = ResultCache("v1", None, max_entries=2)
+    cache.put(("a",), 1)
+    cache.put(("b",), 2)
+    assert cache.get(("a",)) == 1
+    cache.put(("c",), 3)
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == 1 and cache.get(("c",)) == 3
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    writer = ResultCache("v1", tmp_path / "cache")
+    reader = ResultCache("v1", tmp_path / "cache")
+    writer.put(("k",), {"x": [1, 2]})
+    assert reader.get(("k",)) == {"x": [1, 2]}
+
+
+def test_versions_never_share_entries(tmp_path):
+    old = ResultCache("v1", tmp_path / "cache")
+    old.put(("k",), "old data")
+    new = ResultCache("v2", tmp_path / "cache")
+    assert new.get(("k",)) is None
+    assert not (tmp_path / "cache" / "v1").exists()
+    # a worker still serving v1 keeps writing under v1, which v2 never reads
+    old.put(("j",), "old data")
+    assert new.get(("j",)) is None
+    new.put(("k",), "new data")
+    assert ResultCache("v2", tmp_path / "cache").get(("k",)) == "new data"
+
+
+def test_entry_evicted_during_get_is_a_miss(tmp_path, monkeypatch):
+    cache = ResultCache("v1", tmp_path / "cache")
+    cache.put(("k",), 1)
+    other = ResultCache("v1", tmp_path / "cache")
+
+    def evicted(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(result_cache.os, "utime", evicted)
+    assert other.get(("k",)) is None
+
+
+def test_concurrent_puts_of_one_key(tmp_path):
+    cache = ResultCache("v1", tmp_path / "cache")
+    errors = []
+
+    def put(i):
+        try:
+            for _ in range(20):
+                cache.put(("same",), {"writer": i, "pad": "x" * 5000})
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    threads = [threading.Thread(target=put, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    vdir = tmp_path / "cache" / cache._version
+    assert [p.suffix for p in vdir.iterdir()] == [".json"]
+    assert json.loads(next(vdir.iterdir()).read_text())["writer"] in range(8)
+
+
+def test_disk_tier_evicts_oldest_first(tmp_path):
+    cache = ResultCache("v1", tmp_path / "cache", max_disk_bytes=2500)
+    for i in range(5):
+        cache.put((i,), "x" * 1000)
+        path = cache._disk_path((i,))
+        os.utime(path, (i, i))
+    files = sorted(p.name for p in (tmp_path / "cache" / cache._version).iterdir())
+    assert files == sorted([cache._disk_path((3,)).name, cache._disk_path((4,)).name])